@@ -0,0 +1,61 @@
+# bench_batch.py — inference throughput vs batch size on CPU
+#
+#   python -m bench.bench_batch [--batches 1 2 4 8 16] [--seconds 5] [--res 1920x1080] [--threads N]
+#
+# Runs InferenceEngine.infer_masks (what ModelWorker's batched mode and
+# tools.batch_infer call) on synthetic frames of --res, for every batch size,
+# for about --seconds each. The model comes from the same checkpoint env vars as
+# the GUI; without one the edge-mask dummy is measured (and says so).
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from src.gui.model_worker import InferenceEngine, import_torch
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="frames/s as a function of batch size")
+    ap.add_argument("--batches", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    ap.add_argument("--seconds", type=float, default=5.0, help="measured time per batch size")
+    ap.add_argument("--res", default="1920x1080", help="frame size fed to preprocessing")
+    ap.add_argument("--input-size", type=int, nargs=2, default=(512, 512), metavar=("W", "H"))
+    ap.add_argument("--backend", default=None, help="torch | onnx (default: MODEL_BACKEND)")
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = ap.parse_args(argv)
+
+    if args.threads and import_torch():
+        import torch
+        torch.set_num_threads(args.threads)
+    engine = InferenceEngine(device="cpu", input_size=tuple(args.input_size), backend=args.backend,
+                             warmup_iters=2, log=lambda s: None)
+    engine.load()
+    w, h = (int(v) for v in args.res.split("x"))
+    rng = np.random.default_rng(0)
+    pool = [rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8) for _ in range(max(args.batches))]
+
+    print(f"backend {engine.backend}{' (no model loaded — dummy)' if engine.dummy else ''}, "
+          f"frames {w}x{h} → {args.input_size[0]}x{args.input_size[1]}")
+    print(f"{'B':>3} {'frames/s':>9} {'ms/batch':>9} {'ms/frame':>9} {'speed-up':>9}")
+    base = None
+    for b in args.batches:
+        frames = pool[:b]
+        engine.infer_masks(frames)   # first call at this shape: allocator / kernel selection
+        n, t0 = 0, time.perf_counter()
+        per_batch = []
+        while time.perf_counter() - t0 < args.seconds or n < 2 * b:
+            t1 = time.perf_counter()
+            engine.infer_masks(frames)
+            per_batch.append(time.perf_counter() - t1)
+            n += b
+        fps = n / (time.perf_counter() - t0)
+        base = base or fps
+        print(f"{b:>3} {fps:>9.1f} {np.median(per_batch) * 1000:>9.1f} {np.median(per_batch) * 1000 / b:>9.1f} "
+              f"{fps / base:>8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
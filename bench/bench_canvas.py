@@ -0,0 +1,124 @@
+# bench_canvas.py — paint time of the QPainter VideoCanvas (with / without render cache) vs GLVideoCanvas
+#
+#   QT_QPA_PLATFORM=offscreen python -m bench.bench_canvas [--sizes 960x540 1920x1080]
+#                                                          [--frame 1920x1080] [--mask 512x512] [--iters 60]
+#
+# Per canvas and widget size, three cases on the GUI thread:
+#   new frame   set_frame + set_overlay (Indexed8 mask at model resolution) + repaint
+#   opacity     only the overlay opacity changes + repaint
+#   marker      a marker is added (images and opacity unchanged) + repaint
+# For the GL canvas the time includes glFinish, i.e. the GPU (or llvmpipe) work.
+# Without an OpenGL context (e.g. the offscreen platform, which has none) GL is
+# reported as unavailable; run under xcb / eglfs (LIBGL_ALWAYS_SOFTWARE=1 for
+# Mesa llvmpipe) to compare.
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+import numpy as np
+from PySide6.QtGui import QImage
+from PySide6.QtWidgets import QApplication
+
+from src.gui.colors import overlay_palette
+from src.gui.widgets import VideoCanvas
+
+
+def _frames(w: int, h: int, n: int = 4) -> list:
+    rng = np.random.default_rng(0)
+    out = []
+    for _ in range(n):
+        a = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        out.append((a, QImage(a.data, w, h, 3 * w, QImage.Format_BGR888)))
+    return out
+
+
+def _masks(w: int, h: int, n: int = 4) -> list:
+    out = []
+    yy, xx = np.mgrid[0:h, 0:w]
+    for k in range(n):
+        m = (((xx - w / 2 - 10 * k) ** 2 + (yy - h / 2) ** 2) < (min(w, h) / 3) ** 2).astype(np.uint8)
+        img = QImage(m.data, w, h, w, QImage.Format_Indexed8)
+        img.setColorTable(overlay_palette())
+        out.append((m, img))
+    return out
+
+
+def _measure(app, canvas, frames, masks, iters: int, finish) -> tuple[float, float, float]:
+    def paint():
+        canvas.repaint()
+        finish()
+
+    canvas.set_frame(frames[0][1])
+    canvas.set_overlay(masks[0][1])
+    paint()
+    app.processEvents()
+    new, opa, mark = [], [], []
+    for i in range(iters):
+        t0 = time.perf_counter()
+        canvas.set_frame(frames[i % len(frames)][1])
+        canvas.set_overlay(masks[i % len(masks)][1])
+        paint()
+        new.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        canvas.set_overlay_opacity(0.5 + 0.2 * (i % 2))
+        paint()
+        opa.append(time.perf_counter() - t0)
+        if i % 8 == 0:
+            canvas.clear_markers()
+        t0 = time.perf_counter()
+        canvas.add_marker(50 + 10 * i, 60)
+        paint()
+        mark.append(time.perf_counter() - t0)
+    return tuple(float(np.median(v) * 1000) for v in (new, opa, mark))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="VideoCanvas paint time: QPainter vs OpenGL")
+    ap.add_argument("--sizes", nargs="+", default=["960x540", "1920x1080"], help="widget sizes")
+    ap.add_argument("--frame", default="1920x1080")
+    ap.add_argument("--mask", default="512x512", help="overlay size (model resolution)")
+    ap.add_argument("--iters", type=int, default=60)
+    args = ap.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    fw, fh = (int(v) for v in args.frame.split("x"))
+    mw, mh = (int(v) for v in args.mask.split("x"))
+    frames, masks = _frames(fw, fh), _masks(mw, mh)
+
+    no_finish = lambda c: (lambda: None)
+    kinds = [("qpainter", lambda: VideoCanvas(cache=False), no_finish),
+             ("cached", lambda: VideoCanvas(cache=True), no_finish)]
+    from src.gui.gl_canvas import GLVideoCanvas, gl_available
+    if gl_available():
+        def gl_finish(c):
+            def finish():
+                c.makeCurrent()
+                c.context().functions().glFinish()
+                c.doneCurrent()
+            return finish
+        kinds.append(("opengl", GLVideoCanvas, gl_finish))
+
+    print(f"platform {app.platformName()}, frame {fw}x{fh}, mask {mw}x{mh}")
+    print(f"{'canvas':<9} {'widget':>10} {'new frame ms':>13} {'opacity ms':>11} {'marker ms':>10}")
+    for name, cls, finisher in kinds:
+        for size in args.sizes:
+            w, h = (int(v) for v in size.split("x"))
+            canvas = cls()
+            canvas.resize(w, h)
+            canvas.show()
+            app.processEvents()
+            if getattr(canvas, "gl_error", ""):
+                print(f"{name:<9} {size:>10}   shader setup failed: {canvas.gl_error}")
+            new, opa, mark = _measure(app, canvas, frames, masks, args.iters, finisher(canvas))
+            print(f"{name:<9} {size:>10} {new:>13.2f} {opa:>11.2f} {mark:>10.2f}")
+            canvas.close()
+            canvas.deleteLater()
+            app.processEvents()
+    if len(kinds) == 2:
+        print(f"opengl    unavailable (no OpenGL context on platform '{app.platformName()}')")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# bench_e2e.py — headless end-to-end benchmark: camera → VideoThread → MainWindow → ModelWorker → VideoCanvas
+#
+#   python -m bench.bench_e2e [--res 640x360 1280x720 1920x1080] [--model dummy ckpt]
+#                             [--seconds 10] [--fps 30] [--policy strict] [--out report.json]
+#
+# Each (model, resolution) runs in its own offscreen process with the real
+# MainWindow. The source is a synthetic camera that paints its frame number into
+# the image as a barcode; a sampler renders the video canvas (what the surgeon
+# would see) at --sample-hz, decodes the barcode and takes
+# glass-to-glass latency = sample time − time the camera produced that frame.
+#
+# "ckpt" uses the checkpoint env vars the GUI uses (MODEL_CKPT/MODEL_PATH, …) and
+# is skipped if none is set; "dummy" clears them so the edge-mask fallback runs.
+# The JSON report has fps, dropped frames, latency percentiles, GUI-thread CPU
+# per captured frame (the sampler's own reads excluded) and peak RSS per run.
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+BITS = 20
+_CKPT_VARS = ("MODEL_CKPT", "MODEL_PATH", "ATTN_CKPT", "ATTN_PATH", "UNET_CKPT", "UNET_PATH")
+
+
+# ---------------- synthetic camera ----------------
+class SyntheticCamera:
+    """
+    cv2.VideoCapture stand-in that behaves like a camera: read() blocks until the
+    next frame is due and always returns the newest one (frames the consumer was
+    too slow for are lost, counted in `missed`). Frame n carries n as a barcode in
+    the top band: one row of bit blocks over a row of their complements.
+    """
+    is_live = True
+
+    def __init__(self, width: int, height: int, fps: float = 30.0):
+        self.width, self.height, self.fps = int(width), int(height), float(fps)
+        self.period = 1.0 / self.fps
+        self.t_gen: dict = {}         # frame number → perf_counter when it was "exposed"
+        self.missed = 0
+        self._n = 0
+        self._t0: Optional[float] = None
+        self._open = True
+        yy, xx = np.mgrid[0:self.height, 0:self.width]
+        bg = np.dstack([(xx * 255 // max(1, self.width - 1)), (yy * 255 // max(1, self.height - 1)),
+                        np.full_like(xx, 90)]).astype(np.uint8)
+        self._bg = bg
+        self._band = max(8, self.height // 12)
+        self._block = self.width // BITS
+
+    # cv2.VideoCapture API used by VideoThread
+    def isOpened(self) -> bool:
+        return self._open
+
+    def get(self, prop) -> float:
+        return {cv2.CAP_PROP_FPS: self.fps, cv2.CAP_PROP_FRAME_WIDTH: self.width,
+                cv2.CAP_PROP_FRAME_HEIGHT: self.height}.get(prop, 0.0)
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def grab(self) -> bool:
+        return self.read()[0]
+
+    def release(self) -> None:
+        self._open = False
+
+    def read(self, image: Optional[np.ndarray] = None):
+        now = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = now
+        due = int((now - self._t0) / self.period) + 1   # newest frame that exists by now
+        if due <= self._n:
+            time.sleep(max(0.0, self._t0 + self._n * self.period - now))
+            due = self._n + 1
+        self.missed += due - self._n - 1
+        self._n = due
+        out = image if image is not None and image.shape == self._bg.shape else np.empty_like(self._bg)
+        np.copyto(out, self._bg)
+        cx = int((0.5 + 0.4 * np.sin(due * 0.05)) * self.width)   # something for the model to see
+        cv2.circle(out, (cx, self.height // 2), self.height // 6, (0, 160, 255), -1)
+        self._draw_code(out, due)
+        self.t_gen[due] = time.perf_counter()
+        return True, out
+
+    def _draw_code(self, img: np.ndarray, n: int) -> None:
+        b, bw = self._band, self._block
+        for k in range(BITS):
+            on = (n >> k) & 1
+            img[0:b, k * bw:(k + 1) * bw] = 255 if on else 0
+            img[b:2 * b, k * bw:(k + 1) * bw] = 0 if on else 255
+
+    @staticmethod
+    def decode(rgb: np.ndarray) -> Optional[int]:
+        """Frame number from a rendered frame (RGB, already cropped to the video rect)."""
+        h, w = rgb.shape[:2]
+        b = max(2, h // 12)
+        bw = w / BITS
+        gray = rgb.mean(axis=2)
+        n = 0
+        for k in range(BITS):
+            x0, x1 = int(k * bw + bw * 0.3), int((k + 1) * bw - bw * 0.3)
+            top = gray[int(b * 0.3):int(b * 0.7), x0:x1].mean()
+            bot = gray[int(b * 1.3):int(b * 1.7), x0:x1].mean()
+            if abs(top - bot) < 40:
+                return None   # not a clean code (mid-update, overlay on top, …)
+            if top > bot:
+                n |= 1 << k
+        return n or None
+
+
+# ---------------- one run (child process) ----------------
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+    except Exception:
+        pass
+    try:
+        import psutil  # type: ignore
+        mi = psutil.Process().memory_info()
+        return getattr(mi, "peak_wset", mi.rss) / (1024.0 * 1024.0)
+    except Exception:
+        return None
+
+
+def _pct(values) -> Optional[dict]:
+    if not len(values):
+        return None
+    a = np.asarray(values, float)
+    p50, p95, p99 = np.percentile(a, (50, 95, 99))
+    return {"n": int(a.size), "mean_ms": float(a.mean()), "p50_ms": float(p50),
+            "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(a.max())}
+
+
+def run_one(width: int, height: int, fps: float, seconds: float, warmup: float,
+            sample_hz: float, load_timeout: float) -> dict:
+    from PySide6.QtCore import QTimer
+    from PySide6.QtGui import QImage
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    from src.gui.main_window import MainWindow
+    from src.gui.tracing import TRACE
+
+    cam = SyntheticCamera(width, height, fps)
+    win = MainWindow()
+    win.resize(1280, 800)
+    win.show()
+    win._pending_video_src = cam
+
+    st = {"phase": "loading", "t_ready": None, "painted": 0, "overlays": 0, "g2g": [], "undecoded": 0, "sample_cpu": 0.0}
+    base: dict = {}
+    t_start = time.perf_counter()
+
+    def on_painted(_fid, _lat):
+        if st["phase"] == "measure":
+            st["painted"] += 1
+
+    def on_overlay(_img, _fid):
+        if st["phase"] == "measure":
+            st["overlays"] += 1
+
+    def sample():
+        if st["phase"] != "measure":
+            return
+        c0 = time.thread_time()
+        try:
+            _sample()
+        finally:
+            st["sample_cpu"] += time.thread_time() - c0   # not part of the GUI's own per-frame cost
+
+    def _sample():
+        canvas = win.video_label
+        img = canvas.grab().toImage().convertToFormat(QImage.Format_RGB888)
+        t = time.perf_counter()
+        r = canvas._calc_draw_rect(width, height)
+        if r.width() <= 0 or img.isNull():
+            return
+        a = np.frombuffer(img.constBits(), np.uint8, img.sizeInBytes()).reshape(img.height(), img.bytesPerLine())
+        a = a[:, :img.width() * 3].reshape(img.height(), img.width(), 3)
+        dpr = img.width() / max(1, canvas.width())
+        crop = a[int(r.y() * dpr):int((r.y() + r.height()) * dpr), int(r.x() * dpr):int((r.x() + r.width()) * dpr)]
+        n = SyntheticCamera.decode(crop) if crop.size else None
+        if n is None or n not in cam.t_gen:
+            st["undecoded"] += 1
+            return
+        st["g2g"].append((t - cam.t_gen[n]) * 1000.0)
+
+    def tick():
+        now = time.perf_counter()
+        if st["phase"] == "loading":
+            if win._model_ready:
+                st["phase"], st["t_ready"] = "warmup", now
+            elif now - t_start > load_timeout:
+                st["phase"] = "done"
+                app.quit()
+        elif st["phase"] == "warmup" and now - st["t_ready"] >= warmup:
+            vt = win.vthread
+            base.update(vt.stats(), missed=cam.missed, t=now, cpu=time.thread_time())
+            TRACE.clear()
+            st["phase"] = "measure"
+        elif st["phase"] == "measure" and now - base["t"] >= seconds:
+            st["phase"] = "done"
+            app.quit()
+
+    win.video_label.framePainted.connect(on_painted)
+    win.model_worker.overlay_ready.connect(on_overlay)
+    ticker = QTimer()
+    ticker.timeout.connect(tick)
+    ticker.start(50)
+    sampler = QTimer()
+    sampler.timeout.connect(sample)
+    sampler.start(max(1, int(1000 / sample_hz)))
+    app.exec()
+    ticker.stop()
+    sampler.stop()
+
+    out = {"resolution": f"{width}x{height}", "source_fps": fps, "policy": win._policy,
+           "backend": getattr(getattr(win.model_worker, "engine", None), "backend", None)}
+    if not base:
+        out["error"] = "model did not become ready" if not win._model_ready else "no measurement"
+    else:
+        dur = time.perf_counter() - base["t"]
+        vs = win.vthread.stats()
+        captured = vs["captured"] - base["captured"]
+        gui_cpu = time.thread_time() - base["cpu"] - st["sample_cpu"]   # this is the GUI thread
+        out.update({
+            "seconds": dur,
+            "captured_fps": captured / dur,
+            "displayed_fps": st["painted"] / dur,
+            "overlay_fps": st["overlays"] / dur,
+            "dropped_frames": (vs["dropped"] - base["dropped"]) + (cam.missed - base["missed"]),
+            "glass_to_glass": _pct(st["g2g"]),
+            "undecoded_samples": st["undecoded"],
+            "gui_cpu_ms_per_frame": gui_cpu * 1000.0 / max(1, captured),
+            "gui_cpu_pct": 100.0 * gui_cpu / dur,
+            "capture_to_paint": TRACE.summary().get("capture_to_paint"),
+            "forward": TRACE.summary().get("forward"),
+        })
+    win.close()
+    out["peak_rss_mb"] = _peak_rss_mb()
+    return out
+
+
+# ---------------- driver ----------------
+def _meta() -> dict:
+    m = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "platform": platform.platform(),
+         "python": platform.python_version(), "cpus": os.cpu_count()}
+    try:
+        m["git"] = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                           stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        pass
+    for mod in ("torch", "onnxruntime", "cv2", "PySide6"):
+        try:
+            m[mod] = __import__(mod).__version__
+        except Exception:
+            pass
+    return m
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Headless end-to-end latency/throughput benchmark")
+    ap.add_argument("--res", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    ap.add_argument("--model", nargs="+", default=None, choices=("dummy", "ckpt"),
+                    help="default: dummy, plus ckpt if a checkpoint env var is set")
+    ap.add_argument("--fps", type=float, default=30.0, help="synthetic camera rate")
+    ap.add_argument("--seconds", type=float, default=10.0, help="measured time per run")
+    ap.add_argument("--warmup", type=float, default=2.0, help="seconds after model-ready before measuring")
+    ap.add_argument("--sample-hz", type=float, default=30.0, help="how often the rendered canvas is read")
+    ap.add_argument("--load-timeout", type=float, default=180.0)
+    ap.add_argument("--policy", default=None, help="LATENCY_POLICY for the window (strict/live/live_motion)")
+    ap.add_argument("--out", default=None, help="JSON report path (default bench_e2e_<time>.json)")
+    ap.add_argument("--one", default=None, help=argparse.SUPPRESS)   # child: run a single WxH
+    args = ap.parse_args(argv)
+
+    if args.one:
+        w, h = (int(v) for v in args.one.split("x"))
+        res = run_one(w, h, args.fps, args.seconds, args.warmup, args.sample_hz, args.load_timeout)
+        print("BENCH_RESULT " + json.dumps(res))
+        return 0
+
+    have_ckpt = any(os.environ.get(v) for v in _CKPT_VARS)
+    models = args.model or (["dummy", "ckpt"] if have_ckpt else ["dummy"])
+    runs = []
+    for model in models:
+        if model == "ckpt" and not have_ckpt:
+            print("ckpt: no checkpoint env var set — skipped", file=sys.stderr)
+            continue
+        for res in args.res:
+            env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+            env.pop("TRACE", None)
+            if model == "dummy":
+                for v in _CKPT_VARS:
+                    env.pop(v, None)
+            if args.policy:
+                env["LATENCY_POLICY"] = args.policy
+            cmd = [sys.executable, "-m", "bench.bench_e2e", "--one", res, "--fps", str(args.fps),
+                   "--seconds", str(args.seconds), "--warmup", str(args.warmup),
+                   "--sample-hz", str(args.sample_hz), "--load-timeout", str(args.load_timeout)]
+            print(f"[{model} {res}] running …", file=sys.stderr)
+            p = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            line = next((l for l in p.stdout.splitlines() if l.startswith("BENCH_RESULT ")), None)
+            r = json.loads(line[len("BENCH_RESULT "):]) if line else {"resolution": res, "error": p.stderr[-2000:]}
+            r["model"] = model
+            runs.append(r)
+            g = r.get("glass_to_glass") or {}
+            print(f"[{model} {res}] captured {r.get('captured_fps', 0):5.1f} fps  displayed "
+                  f"{r.get('displayed_fps', 0):5.1f} fps  overlays {r.get('overlay_fps', 0):5.1f}/s  "
+                  f"dropped {r.get('dropped_frames', '–')}  g2g p50 {g.get('p50_ms', float('nan')):6.1f} "
+                  f"p95 {g.get('p95_ms', float('nan')):6.1f} ms  GUI CPU {r.get('gui_cpu_ms_per_frame', float('nan')):5.2f} ms/frame  "
+                  f"peak RSS {r.get('peak_rss_mb') or 0:.0f} MB"
+                  + (f"  ERROR {r['error'][:200]}" if "error" in r else ""), file=sys.stderr)
+
+    out = args.out or f"bench_e2e_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, "w") as f:
+        json.dump({"meta": _meta(), "config": vars(args), "runs": runs}, f, indent=2)
+    print(out)
+    return 0 if runs and not any("error" in r for r in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
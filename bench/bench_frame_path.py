@@ -0,0 +1,74 @@
+# bench_frame_path.py — allocations per frame on the capture → QImage/model path
+#
+#   QT_QPA_PLATFORM=offscreen python -m bench.bench_frame_path [video] [seconds]
+#
+# Without a video argument a synthetic 1080p clip is written to a temp file.
+from __future__ import annotations
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from src.gui.video_thread import VideoThread
+
+
+def _synthetic_clip(path: str, w: int = 1920, h: int = 1080, n: int = 60) -> str:
+    wr = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (w, h))
+    for i in range(n):
+        f = np.full((h, w, 3), 40, np.uint8)
+        cv2.circle(f, (200 + 20 * i, h // 2), 120, (0, 160, 255), -1)
+        wr.write(f)
+    wr.release()
+    return path
+
+
+def main(argv: list[str]) -> None:
+    app = QCoreApplication(argv)
+    src = argv[1] if len(argv) > 1 and argv[1] else _synthetic_clip(os.path.join(tempfile.gettempdir(), "bench_frame_path.avi"))
+    seconds = float(argv[2]) if len(argv) > 2 else 5.0
+
+    vt = VideoThread(src=src, loop_video=True)
+    held: list = []          # emulate canvas + worker holding a couple of frames
+
+    def on_frame(_fid: int):
+        f = vt.latest_frame()
+        if f is None:
+            return
+        _ = f.qimage, f.bgr  # what the canvas and the model read
+        held.append(f)
+        while len(held) > 3:
+            held.pop(0).release()
+
+    warm = {}
+
+    def snapshot():
+        warm.update(vt.stats())
+
+    vt.frame_available.connect(on_frame)
+    vt.start()
+    QTimer.singleShot(1000, snapshot)
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    t0 = time.perf_counter()
+    app.exec()
+    vt.stop()
+    for f in held:
+        f.release()
+
+    st = vt.stats()
+    frames = st["captured"] - warm.get("captured", 0)
+    allocs = st["allocations"] - warm.get("allocations", 0)
+    print(f"frames={st['captured']} in {time.perf_counter() - t0:.1f}s  dropped={st['dropped']} late={st['late']}")
+    print(f"pool allocations total={st['allocations']}  steady-state={allocs} over {frames} frames "
+          f"→ {allocs / max(1, frames):.3f} allocs/frame")
+    q = st.get("quality")
+    if q:
+        print(f"frame quality {q['ms']:.2f} ms/frame in the capture thread "
+              f"({q['black']} black, {q['blurred']} blurred of {q['measured']})")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
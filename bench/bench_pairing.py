@@ -0,0 +1,152 @@
+# bench_pairing.py — cost of MainWindow's frame/overlay pairing at 60 fps with a slow model
+#
+#   python -m bench.bench_pairing [seconds] [model_latency_ms] [max_inflight]
+#
+# Replays a 60 fps capture and a worker that answers `latency` ms after each
+# dispatch (in order, at most max_inflight frames inside) in simulated time, so
+# only the bookkeeping is measured. "dict" is the previous store (every
+# captured frame cached, stale keys collected and sorted on each display);
+# "ring" is PairingRing. Frames come from a real FramePool, so "peak held" is
+# the number of pooled 1080p buffers kept alive by pairing.
+from __future__ import annotations
+import heapq
+import sys
+import time
+from typing import Dict, List
+
+from PySide6.QtGui import QImage
+
+from src.gui.frames import CapturedFrame, FramePool
+from src.gui.pairing import PairingRing
+
+FPS = 60.0
+SHAPE = (1080, 1920, 3)
+
+
+class DictPairing:
+    """The pre-ring MainWindow logic, reduced to its bookkeeping."""
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.frames: Dict[int, CapturedFrame] = {}
+        self.overlays: Dict[int, QImage] = {}
+        self.inflight: List[int] = []
+        self.last_dispatched = 0
+        self.displayed = 0
+
+    def held(self) -> int:
+        return len(self.frames)
+
+    def on_frame(self, f: CapturedFrame, dispatch) -> None:
+        if f.frame_id not in self.frames:
+            self.frames[f.frame_id] = f.retain()
+        if len(self.inflight) < self.max_inflight and f.frame_id > self.last_dispatched:
+            self.inflight.append(f.frame_id)
+            self.last_dispatched = f.frame_id
+            dispatch(f.frame_id)
+        self._display(f.frame_id)
+
+    def on_overlay(self, fid: int, o: QImage) -> None:
+        self.inflight = [i for i in self.inflight if i > fid]
+        self.overlays[fid] = o
+        self._display(fid)
+
+    def _display(self, fid: int) -> None:
+        if self.frames.get(fid) is None or self.overlays.get(fid) is None:
+            return
+        self.displayed += 1
+        for k in [k for k in self.frames.keys() if k < fid]:
+            self.frames.pop(k).release()
+        for k in [k for k in self.overlays.keys() if k < fid]:
+            self.overlays.pop(k, None)
+        if len(self.frames) > 8:
+            for k in sorted(self.frames.keys())[:-4]:
+                self.frames.pop(k).release()
+        if len(self.overlays) > 8:
+            for k in sorted(self.overlays.keys())[:-4]:
+                self.overlays.pop(k, None)
+
+    def close(self) -> None:
+        for f in self.frames.values():
+            f.release()
+
+
+class RingPairing:
+    """The current MainWindow logic on PairingRing."""
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.pairs = PairingRing(16)
+        self.last_dispatched = 0
+        self.displayed = 0
+
+    def held(self) -> int:
+        return len(self.pairs)
+
+    def on_frame(self, f: CapturedFrame, dispatch) -> None:
+        if len(self.pairs) < self.max_inflight and f.frame_id > self.last_dispatched:
+            self.pairs.put_frame(f.frame_id, f)
+            self.last_dispatched = f.frame_id
+            dispatch(f.frame_id)
+
+    def on_overlay(self, fid: int, o: QImage) -> None:
+        if self.pairs.put_overlay(fid, o) is not None:
+            self.displayed += 1
+        self.pairs.drop_through(fid)
+
+    def close(self) -> None:
+        self.pairs.clear()
+
+
+def run(store, seconds: float, latency: float, max_inflight: int) -> dict:
+    pool = FramePool()
+    overlay = QImage(SHAPE[1], SHAPE[0], QImage.Format_Indexed8)
+    events: list = []              # (time, order, kind, frame_id)
+    busy_until = 0.0
+    period = latency / max_inflight  # worker throughput: pipelined stages overlap
+    seq = 0
+
+    def dispatch(fid: int) -> None:
+        nonlocal busy_until, seq
+        start = max(now, busy_until)
+        busy_until = start + period
+        seq += 1
+        heapq.heappush(events, (start + latency, seq, "overlay", fid))
+
+    n = int(seconds * FPS)
+    for i in range(n):
+        heapq.heappush(events, (i / FPS, -1, "frame", i + 1))
+    spent = 0.0
+    peak = 0
+    while events:
+        now, _, kind, fid = heapq.heappop(events)
+        if kind == "frame":
+            f = CapturedFrame(fid, now, pool.acquire(SHAPE))
+            t0 = time.perf_counter()
+            store.on_frame(f, dispatch)
+            spent += time.perf_counter() - t0
+            f.release()  # the capture thread's reference
+        else:
+            t0 = time.perf_counter()
+            store.on_overlay(fid, overlay)
+            spent += time.perf_counter() - t0
+        peak = max(peak, store.held())
+    store.close()
+    return {"us_per_frame": spent / n * 1e6, "peak_held": peak, "displayed": store.displayed,
+            "allocations": pool.allocations, "frames": n}
+
+
+def main(argv: list[str]) -> None:
+    seconds = float(argv[1]) if len(argv) > 1 else 60.0
+    latency = float(argv[2]) / 1000.0 if len(argv) > 2 else 0.120
+    max_inflight = int(argv[3]) if len(argv) > 3 else 1
+    print(f"{seconds:.0f}s at {FPS:.0f} fps, model latency {latency * 1000:.0f} ms, max_inflight {max_inflight}")
+    for name, cls in (("dict", DictPairing), ("ring", RingPairing)):
+        r = run(cls(max_inflight), seconds, latency, max_inflight)
+        print(f"{name:5s} {r['us_per_frame']:7.2f} µs/frame   peak held {r['peak_held']:3d} frames "
+              f"({r['peak_held'] * SHAPE[0] * SHAPE[1] * 3 / 1e6:.0f} MB)   pool buffers {r['allocations']:3d}   "
+              f"displayed {r['displayed']}/{r['frames']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,87 @@
+# bench_propagation.py — cost and registration error of MaskPropagator.propagate
+#
+#   python -m bench.bench_propagation [--frame 1920x1080] [--mask 512x512] [--iters 30]
+#
+# A textured synthetic frame is the keyframe; its mask is a horizontal and a
+# vertical band at model resolution (by default 512×512, i.e. not the frame's
+# aspect ratio). The frame is then shifted by a known amount along x and along
+# y, the key mask is propagated onto it and the band centroids are compared with
+# where the shift puts them. Exits with 1 if any case is off by more than --tol
+# mask pixels, so it doubles as a regression check for the per-axis flow scale.
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from src.gui.mask_propagation import MaskPropagator
+
+
+def _size(s: str) -> tuple:
+    w, h = s.lower().split("x")
+    return int(w), int(h)
+
+
+def _texture(w: int, h: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, size=(h // 16 + 1, w // 16 + 1, 3), dtype=np.uint8)
+    img = cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+    return cv2.GaussianBlur(img, (0, 0), 3)
+
+
+def _shift(img: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    m = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(img, m, (img.shape[1], img.shape[0]), borderMode=cv2.BORDER_REFLECT)
+
+
+def _centroid(mask: np.ndarray, axis: int) -> float:
+    """Mean row (axis=0) / column (axis=1) of the mask's foreground."""
+    idx = np.nonzero(mask)[axis]
+    return float(idx.mean()) if idx.size else float("nan")
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frame", default="1920x1080")
+    ap.add_argument("--mask", default="512x512")
+    ap.add_argument("--shift", type=int, default=48, help="frame pixels")
+    ap.add_argument("--iters", type=int, default=30)
+    ap.add_argument("--tol", type=float, default=3.0, help="mask pixels")
+    args = ap.parse_args(argv[1:])
+    fw, fh = _size(args.frame)
+    mw, mh = _size(args.mask)
+
+    key = _texture(fw, fh)
+    band_y = np.zeros((mh, mw), np.uint8)
+    band_y[mh // 3: mh // 3 + mh // 8, :] = 1           # horizontal band: moves with dy
+    band_x = np.zeros((mh, mw), np.uint8)
+    band_x[:, mw // 3: mw // 3 + mw // 8] = 1           # vertical band: moves with dx
+
+    print(f"frame {fw}x{fh}, mask {mw}x{mh}, shift {args.shift} px")
+    failed = False
+    for name, dx, dy, band, axis, mscale in (
+            ("dy", 0, args.shift, band_y, 0, mh / fh),
+            ("dx", args.shift, 0, band_x, 1, mw / fw)):
+        prop = MaskPropagator(keyframe_interval=1000, motion_threshold=1e9)
+        prop.set_keyframe(1, prop.thumbnail(key), band)
+        cur = _shift(key, dx, dy)
+        t0 = time.perf_counter()
+        for _ in range(args.iters):
+            thumb = prop.thumbnail(cur)
+            out = prop.propagate(thumb, (fh, fw))
+        ms = 1000.0 * (time.perf_counter() - t0) / args.iters
+        mask, _, motion = out
+        want = _centroid(band, axis) + args.shift * mscale
+        got = _centroid(mask, axis)
+        err = abs(got - want)
+        ok = err <= args.tol
+        failed |= not ok
+        print(f"{name}  {ms:6.2f} ms/frame   motion {motion:5.1f} px (want {args.shift})   "
+              f"band at {got:6.1f}, want {want:6.1f}  → off by {err:4.1f} mask px  {'ok' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
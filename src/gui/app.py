@@ -1,3 +1,4 @@
+from .startup import STARTUP  # first: starts the startup clock
 import sys
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QApplication
@@ -18,6 +19,7 @@ def run():
     win = MainWindow()
     win.resize(1400, 800)
     win.show()
+    STARTUP.mark("window")
     sys.excepthook = _exception_hook  # keep tracebacks visible on crash
     sys.exit(app.exec())
 
@@ -0,0 +1,70 @@
+# change_detector.py — "did anything change since the last inferred frame?"
+#
+# Frames are reduced to tiny grayscale thumbnails (INTER_AREA averages whole
+# blocks, which also averages away sensor noise) and compared with the
+# thumbnail of the last frame the model actually ran on. Comparing against the
+# last *inferred* frame, not the previous one, means slow drift adds up and is
+# eventually caught.
+from __future__ import annotations
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """
+    mean_threshold : mean abs. difference (gray levels) below which a frame counts as static
+    peak_threshold : any thumbnail pixel changing more than this is real change
+                     (an instrument entering one corner barely moves the mean)
+    max_skip       : re-run the model after this many reused frames regardless
+    width          : thumbnail width
+
+    Counters: inferred (model ran), skipped (previous mask reused).
+    """
+
+    def __init__(self, mean_threshold: float = 2.0, peak_threshold: float = 24.0,
+                 max_skip: int = 15, width: int = 64):
+        self.mean_threshold = float(mean_threshold)
+        self.peak_threshold = float(peak_threshold)
+        self.max_skip = max(0, int(max_skip))
+        self.width = max(8, int(width))
+        self.inferred = 0
+        self.skipped = 0
+        self._ref: Optional[np.ndarray] = None
+        self._run = 0   # consecutive skips since the last inference
+
+    def thumbnail(self, frame_bgr: np.ndarray) -> np.ndarray:
+        h, w = frame_bgr.shape[:2]
+        tw = min(self.width, w)
+        th = max(1, int(round(h * tw / w)))
+        small = cv2.resize(frame_bgr, (tw, th), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def is_static(self, frame_bgr: np.ndarray) -> bool:
+        """
+        True → reuse the previous mask (counted as a skip); False → run the model
+        (counted as an inference, and this frame becomes the new reference).
+        """
+        thumb = self.thumbnail(frame_bgr)
+        ref = self._ref
+        if ref is not None and ref.shape == thumb.shape and self._run < self.max_skip:
+            diff = cv2.absdiff(thumb, ref)
+            if float(diff.mean()) < self.mean_threshold and int(diff.max()) <= self.peak_threshold:
+                self._run += 1
+                self.skipped += 1
+                return True
+        self._ref = thumb
+        self._run = 0
+        self.inferred += 1
+        return False
+
+    def reset(self) -> None:
+        """Forget the reference (new source, overlay toggled, inference failed)."""
+        self._ref = None
+        self._run = 0
+
+    def stats(self) -> dict:
+        total = self.inferred + self.skipped
+        return {"inferred": self.inferred, "skipped": self.skipped,
+                "skip_ratio": (self.skipped / total) if total else 0.0}
@@ -11,3 +11,20 @@ COLORS = {
 def rgb(name, alpha=1.0):
     r, g, b = COLORS[name]
     return f"rgba({r},{g},{b},{alpha})"
+
+# Segmentation overlay: RGBA per class index (0 = background, transparent).
+# Masks travel as 1-byte class maps; these colours are only applied when drawing.
+OVERLAY_CLASSES = [
+    (0, 0, 0, 0),
+    (0, 140, 255, 180),   # vessels
+    (255, 196, 0, 180),
+    (0, 200, 120, 180),
+    (220, 60, 160, 180),
+]
+
+def overlay_palette(class_colors=None):
+    """256-entry ARGB colour table (QImage.setColorTable) for class-index masks."""
+    table = [0] * 256
+    for i, (r, g, b, a) in enumerate((class_colors or OVERLAY_CLASSES)[:256]):
+        table[i] = ((a & 0xFF) << 24) | ((r & 0xFF) << 16) | ((g & 0xFF) << 8) | (b & 0xFF)
+    return table
@@ -0,0 +1,126 @@
+# frame_quality.py — per-frame image quality, measured once in the capture thread
+#
+# Every captured frame gets a FrameQuality record (CapturedFrame.quality), so
+# consumers read flags instead of looking at pixels themselves: MainWindow
+# greys out the record pill on black frames, ModelWorker skips inference on
+# frames the model cannot say anything about (black, completely out of focus).
+#
+# The measurement works on a strided view of the frame (every n-th pixel of
+# every n-th row, ~160 px wide): one small copy, then a few whole-array
+# operations on it —
+#   black        fraction of pixels with every channel <= black_level
+#   overexposed  fraction of clipped pixels (luma >= 250)
+#   specular     fraction of bright, unsaturated pixels (every channel >= 220):
+#                the glints of the light source on wet tissue / instruments
+#   blur         variance of the Laplacian of the luma, over the lit area only
+#                (the black vignette edge of an endoscope would read as "sharp")
+# Thresholds come from the environment (FRAME_*); FRAME_QUALITY=0 switches the
+# measurement off (quality stays None and everything counts as usable).
+from __future__ import annotations
+import os
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+_KERNEL = np.ones((3, 3), np.uint8)
+
+
+class FrameQuality:
+    """Scores of one frame plus the flags derived from them (see FrameQualityAnalyzer)."""
+    __slots__ = ("black", "overexposed", "specular", "blur", "is_black", "is_blurred")
+
+    def __init__(self, black: float, overexposed: float, specular: float, blur: float,
+                 is_black: bool, is_blurred: bool):
+        self.black = black
+        self.overexposed = overexposed
+        self.specular = specular
+        self.blur = blur
+        self.is_black = is_black
+        self.is_blurred = is_blurred
+
+    @property
+    def usable(self) -> bool:
+        """False → nothing for the model to segment."""
+        return not (self.is_black or self.is_blurred)
+
+    def __repr__(self) -> str:
+        return (f"FrameQuality(black={self.black:.2f}, overexposed={self.overexposed:.2f}, "
+                f"specular={self.specular:.3f}, blur={self.blur:.1f}, usable={self.usable})")
+
+
+def unusable(frame: object) -> bool:
+    """True if frame carries a quality record that says so (ndarrays / unmeasured frames: False)."""
+    q = getattr(frame, "quality", None)
+    return q is not None and not q.usable
+
+
+class FrameQualityAnalyzer:
+    """
+    width          : sampled width (the stride is frame width // width)
+    black_level    : a pixel is black if no channel is above this (old UI check: 12)
+    black_fraction : frame is black from this fraction of black pixels on
+    blur_threshold : frame is blurred below this Laplacian variance (0 = never);
+                     needs at least min_lit of the frame to be lit, a mostly black
+                     frame is judged by black_fraction alone
+
+    Counters: measured, black, blurred, ms (mean measurement time).
+    """
+
+    def __init__(self, width: Optional[int] = None, black_level: Optional[int] = None,
+                 black_fraction: Optional[float] = None, blur_threshold: Optional[float] = None,
+                 min_lit: float = 0.05):
+        env = os.environ.get
+        self.width = max(16, int(width or env("FRAME_QUALITY_WIDTH", 160)))
+        self.black_level = int(black_level if black_level is not None else env("FRAME_BLACK_LEVEL", 12))
+        self.black_fraction = float(black_fraction if black_fraction is not None
+                                    else env("FRAME_BLACK_FRACTION", 0.98))
+        self.blur_threshold = float(blur_threshold if blur_threshold is not None
+                                    else env("FRAME_BLUR_THRESHOLD", 2.0))
+        self.min_lit = float(min_lit)
+        self.measured = 0
+        self.black = 0
+        self.blurred = 0
+        self._seconds = 0.0
+
+    @staticmethod
+    def from_env() -> Optional["FrameQualityAnalyzer"]:
+        """Analyzer with the FRAME_* settings, None if FRAME_QUALITY is switched off."""
+        if os.environ.get("FRAME_QUALITY", "1").lower() in ("0", "false", "no"):
+            return None
+        return FrameQualityAnalyzer()
+
+    def measure(self, frame_bgr: np.ndarray) -> FrameQuality:
+        t0 = time.perf_counter()
+        step = max(1, frame_bgr.shape[1] // self.width)
+        small = np.ascontiguousarray(frame_bgr[::step, ::step])   # strided view → one small copy
+        n = small.shape[0] * small.shape[1]
+        b, g, r = cv2.split(small)
+        hi = cv2.max(cv2.max(b, g), r)   # ~20× faster than small.max(axis=2)
+        lo = cv2.min(cv2.min(b, g), r)
+        luma = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        lit = hi > self.black_level
+        n_lit = int(np.count_nonzero(lit))
+        black = 1.0 - n_lit / n
+        overexposed = np.count_nonzero(luma >= 250) / n
+        specular = np.count_nonzero(lo >= 220) / n
+        blur = 0.0
+        if n_lit >= self.min_lit * n:
+            # pixels next to the black border would measure the border, not the image
+            inner = cv2.erode(lit.view(np.uint8), _KERNEL).view(bool)
+            if inner.any():
+                blur = float(cv2.Laplacian(luma, cv2.CV_32F)[inner].var())
+
+        is_black = black >= self.black_fraction
+        is_blurred = not is_black and n_lit >= self.min_lit * n and blur < self.blur_threshold
+        self.measured += 1
+        self.black += is_black
+        self.blurred += is_blurred
+        self._seconds += time.perf_counter() - t0
+        return FrameQuality(black, overexposed, specular, blur, is_black, is_blurred)
+
+    def stats(self) -> dict:
+        return {"measured": self.measured, "black": self.black, "blurred": self.blurred,
+                "ms": 1000.0 * self._seconds / self.measured if self.measured else 0.0}
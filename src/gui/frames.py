@@ -0,0 +1,196 @@
+# frames.py — pooled frame buffers, captured-frame record + lock-protected "latest frames" ring
+from __future__ import annotations
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PySide6.QtGui import QImage
+
+
+# ------------------------------ buffer pool ------------------------------
+class FrameBuffer:
+    """
+    A recycled (H,W,3) uint8 BGR array with an explicit reference count.
+
+    qimage() wraps the array in place (Format_BGR888, no colour conversion, no
+    copy). That QImage is only valid while somebody holds a reference: every
+    holder calls retain() and later release(); at zero the buffer goes back to
+    its pool and the next capture overwrites it.
+    """
+    __slots__ = ("pool", "array", "_qimage", "_refs")
+
+    def __init__(self, pool: "FramePool", array: np.ndarray):
+        self.pool = pool
+        self.array = array
+        self._qimage: QImage | None = None
+        self._refs = 0
+
+    def qimage(self) -> QImage:
+        if self._qimage is None:
+            h, w, _ = self.array.shape
+            # created once per buffer: the memory never moves, only its content changes
+            self._qimage = QImage(self.array.data, w, h, self.array.strides[0], QImage.Format_BGR888)
+        return self._qimage
+
+    def retain(self) -> None:
+        with self.pool._lock:
+            self._refs += 1
+
+    def release(self) -> None:
+        with self.pool._lock:
+            if self._refs <= 0:
+                return   # double release: recycling again would hand one buffer to two frames
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            self.pool._recycle(self)
+
+
+class FramePool:
+    """
+    Free-lists of FrameBuffers keyed by shape. `allocations` counts every new
+    array; once the working set is reached it stops growing (≈0 allocs/frame).
+    """
+
+    def __init__(self, max_free: int = 32):
+        self.max_free = int(max_free)
+        self._lock = threading.Lock()
+        self._free: Dict[Tuple[int, ...], List[FrameBuffer]] = {}
+        self.allocations = 0
+        self.acquired = 0
+
+    def acquire(self, shape: Tuple[int, int, int]) -> FrameBuffer:
+        """Buffer of `shape` with one reference owned by the caller."""
+        shape = tuple(int(s) for s in shape)
+        with self._lock:
+            self.acquired += 1
+            free = self._free.get(shape)
+            if free:
+                buf = free.pop()
+                buf._refs = 1
+                return buf
+            self.allocations += 1
+        buf = FrameBuffer(self, np.empty(shape, np.uint8))
+        buf._refs = 1
+        return buf
+
+    def adopt(self, array: np.ndarray) -> FrameBuffer:
+        """Take ownership of an array allocated elsewhere (e.g. cv2 on a size change)."""
+        with self._lock:
+            self.acquired += 1
+            self.allocations += 1
+        buf = FrameBuffer(self, np.ascontiguousarray(array, dtype=np.uint8))
+        buf._refs = 1
+        return buf
+
+    def _recycle(self, buf: FrameBuffer) -> None:
+        # called with self._lock held
+        free = self._free.setdefault(buf.array.shape, [])
+        if len(free) < self.max_free:
+            free.append(buf)
+
+    def stats(self) -> dict:
+        with self._lock:
+            free = sum(len(v) for v in self._free.values())
+        return {"allocations": self.allocations, "acquired": self.acquired, "free": free}
+
+
+# ----------------------------- captured frame -----------------------------
+class CapturedFrame:
+    """
+    One decoded frame plus the metadata consumers need to stay in sync.
+
+    Holders that keep the frame beyond the current call retain() it and
+    release() it when done; the pixels are shared, never copied.
+    """
+    __slots__ = ("frame_id", "t_capture", "buffer", "quality", "position")
+
+    def __init__(self, frame_id: int, t_capture: float, buffer: FrameBuffer, quality=None,
+                 position: Optional[Tuple[str, int]] = None):
+        self.frame_id = frame_id
+        self.t_capture = t_capture      # time.perf_counter() right after the decode
+        self.buffer = buffer
+        self.quality = quality          # FrameQuality from the capture thread (None: not measured)
+        self.position = position        # (source identity, frame index) for files, None for cameras
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """(H,W,3) uint8 BGR — model input, read-only by convention."""
+        return self.buffer.array
+
+    @property
+    def qimage(self) -> QImage:
+        return self.buffer.qimage()
+
+    def retain(self) -> "CapturedFrame":
+        self.buffer.retain()
+        return self
+
+    def release(self) -> None:
+        self.buffer.release()
+
+
+# ------------------------------- frame ring -------------------------------
+class FrameRing:
+    """
+    Small fixed-size ring holding the newest captured frames.
+
+    The capture thread push()es (handing over its reference), consumers pull
+    the newest frame with latest() (or a specific one with get()) and receive
+    an extra reference they must release(). Nothing queues up: a slow consumer
+    simply skips frames, and the number of frames it never saw is counted in
+    `dropped`.
+    """
+
+    def __init__(self, capacity: int = 4):
+        self.capacity = max(1, int(capacity))
+        self._slots: List[Optional[CapturedFrame]] = [None] * self.capacity
+        self._head = -1                 # slot index of the newest frame
+        self._lock = threading.Lock()
+        self._last_pulled_id = 0
+        self.pushed = 0
+        self.dropped = 0
+
+    def push(self, frame: CapturedFrame) -> None:
+        with self._lock:
+            self._head = (self._head + 1) % self.capacity
+            old = self._slots[self._head]
+            self._slots[self._head] = frame
+            self.pushed += 1
+        if old is not None:
+            old.release()
+
+    def latest(self) -> Optional[CapturedFrame]:
+        """Newest frame (retained), or None if nothing new arrived since the last pull."""
+        with self._lock:
+            if self._head < 0:
+                return None
+            f = self._slots[self._head]
+            if f is None or f.frame_id <= self._last_pulled_id:
+                return None
+            if self._last_pulled_id:
+                self.dropped += max(0, f.frame_id - self._last_pulled_id - 1)
+            self._last_pulled_id = f.frame_id
+            return f.retain()
+
+    def peek(self) -> Optional[CapturedFrame]:
+        """Newest frame (retained) without marking it as consumed."""
+        with self._lock:
+            f = self._slots[self._head] if self._head >= 0 else None
+            return f.retain() if f is not None else None
+
+    def get(self, frame_id: int) -> Optional[CapturedFrame]:
+        with self._lock:
+            for f in self._slots:
+                if f is not None and f.frame_id == frame_id:
+                    return f.retain()
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            old = [f for f in self._slots if f is not None]
+            self._slots = [None] * self.capacity
+            self._head = -1
+            self._last_pulled_id = 0
+        for f in old:
+            f.release()
@@ -0,0 +1,341 @@
+# gl_canvas.py — OpenGL VideoCanvas: frame and mask as textures, overlay blended in a shader
+#
+# VideoCanvas draws with QPainter.drawImage(target, …), i.e. the frame and the
+# overlay are rescaled in software on the GUI thread on every repaint.
+# GLVideoCanvas instead uploads
+#   - the frame (BGR888, as captured) into an RGB8 texture, linear filtering
+#   - an Indexed8 class mask into an R8 texture, nearest filtering, plus the
+#     colour table as a 256×1 RGBA texture (RGBA overlays: one RGBA texture)
+# once per new image, reusing the texture storage while size/format stay the
+# same, and a fragment shader does letterboxing, palette lookup (bilinear over
+# the class colours, like the smooth-scaled QPainter overlay), the overlay
+# offset and the opacity blend. A repaint without a new image uploads nothing,
+# so opacity / palette / offset changes cost one draw call.
+#
+# Markers and the tracing HUD are still drawn with QPainter on top, and the
+# state / API / ROI click mapping come from widgets.CanvasState, so both canvases
+# behave the same towards MainWindow.
+#
+# Opt in with VIDEO_CANVAS=gl. Without a usable OpenGL context (gl_available())
+# MainWindow keeps VideoCanvas. On carts without a GPU, Mesa's llvmpipe provides
+# one in software (LIBGL_ALWAYS_SOFTWARE=1 forces it); the shader is plain GLSL
+# 1.10 / ES 2.0 so that is enough.
+from __future__ import annotations
+from typing import Optional
+
+import numpy as np
+
+from PySide6.QtCore import QRect, Signal
+from PySide6.QtGui import QImage, QOffscreenSurface, QOpenGLContext, QPainter
+from PySide6.QtOpenGL import (
+    QOpenGLBuffer, QOpenGLPixelTransferOptions, QOpenGLShader, QOpenGLShaderProgram,
+    QOpenGLTexture, QOpenGLVertexArrayObject
+)
+from PySide6.QtOpenGLWidgets import QOpenGLWidget
+
+from .widgets import CanvasState
+
+GL_FLOAT = 0x1406
+GL_TRIANGLE_STRIP = 0x0005
+GL_COLOR_BUFFER_BIT = 0x4000
+
+_VERT = """
+attribute vec2 a_pos;
+varying vec2 v_uv;
+void main() {
+    v_uv = vec2(a_pos.x * 0.5 + 0.5, 0.5 - a_pos.y * 0.5);   // widget uv, top-left origin
+    gl_Position = vec4(a_pos, 0.0, 1.0);
+}
+"""
+
+_FRAG = """
+#ifdef GL_ES
+precision mediump float;
+#endif
+uniform sampler2D u_frame;
+uniform sampler2D u_mask;
+uniform sampler2D u_palette;
+uniform vec4 u_rect;        // letterboxed frame rect in widget uv (x, y, w, h)
+uniform vec4 u_bg;
+uniform float u_bgr;        // 1: frame texture holds BGR
+uniform float u_mode;       // 0 no overlay, 1 Indexed8 + palette, 2 RGBA
+uniform float u_opacity;
+uniform vec2 u_offset;      // overlay shift in frame uv
+uniform vec2 u_mask_size;
+varying vec2 v_uv;
+
+vec4 klass(vec2 texel) {    // premultiplied palette colour of one mask texel
+    vec4 c = texture2D(u_palette, vec2((texture2D(u_mask, texel).r * 255.0 + 0.5) / 256.0, 0.5));
+    return vec4(c.rgb * c.a, c.a);
+}
+
+void main() {
+    vec2 uv = (v_uv - u_rect.xy) / u_rect.zw;
+    if (uv.x < 0.0 || uv.y < 0.0 || uv.x > 1.0 || uv.y > 1.0) {
+        gl_FragColor = u_bg;
+        return;
+    }
+    vec3 rgb = texture2D(u_frame, uv).rgb;
+    if (u_bgr > 0.5)
+        rgb = rgb.bgr;
+    vec4 ov = vec4(0.0);
+    vec2 m = uv - u_offset;
+    if (u_mode > 0.5 && m.x >= 0.0 && m.y >= 0.0 && m.x <= 1.0 && m.y <= 1.0) {
+        if (u_mode < 1.5) {
+            // class indices must not be interpolated: blend the colours of the 4 texels
+            vec2 p = m * u_mask_size - 0.5;
+            vec2 f = fract(p);
+            vec2 t = (floor(p) + 0.5) / u_mask_size;
+            vec2 d = 1.0 / u_mask_size;
+            ov = mix(mix(klass(t), klass(t + vec2(d.x, 0.0)), f.x),
+                     mix(klass(t + vec2(0.0, d.y)), klass(t + d), f.x), f.y);
+        } else {
+            vec4 c = texture2D(u_mask, m);
+            ov = vec4(c.rgb * c.a, c.a);
+        }
+    }
+    gl_FragColor = vec4(rgb * (1.0 - ov.a * u_opacity) + ov.rgb * u_opacity, 1.0);
+}
+"""
+
+_gl_ok: Optional[bool] = None
+
+
+def gl_available() -> bool:
+    """True if an OpenGL context can be created and made current (needs a QGuiApplication)."""
+    global _gl_ok
+    if _gl_ok is None:
+        try:
+            ctx = QOpenGLContext()
+            surface = QOffscreenSurface()
+            _gl_ok = False
+            if ctx.create():
+                surface.setFormat(ctx.format())
+                surface.create()
+                if surface.isValid() and ctx.makeCurrent(surface):
+                    _gl_ok = True
+                    ctx.doneCurrent()
+        except Exception:
+            _gl_ok = False
+    return _gl_ok
+
+
+def _pixels(img: QImage, bpp: int) -> np.ndarray:
+    """Tightly packed (H, W*bpp) bytes of img (copies only if rows are padded)."""
+    h, w = img.height(), img.width()
+    rows = np.frombuffer(img.constBits(), np.uint8, count=h * img.bytesPerLine()).reshape(h, img.bytesPerLine())
+    return np.ascontiguousarray(rows[:, :w * bpp])
+
+
+class _Texture:
+    """One QOpenGLTexture whose storage is reused until size or format change."""
+
+    def __init__(self, fmt, pixel_format, linear: bool):
+        self.fmt = fmt
+        self.pixel_format = pixel_format
+        self.linear = linear
+        self.tex: QOpenGLTexture | None = None
+        self.size = (0, 0)
+        self._opts = QOpenGLPixelTransferOptions()
+        self._opts.setAlignment(1)
+
+    def upload(self, data: np.ndarray, w: int, h: int):
+        if self.tex is None or self.size != (w, h):
+            self.destroy()
+            tex = QOpenGLTexture(QOpenGLTexture.Target2D)
+            tex.setFormat(self.fmt)
+            tex.setSize(w, h)
+            tex.setMipLevels(1)
+            flt = QOpenGLTexture.Linear if self.linear else QOpenGLTexture.Nearest
+            tex.setMinMagFilters(flt, flt)
+            tex.setWrapMode(QOpenGLTexture.ClampToEdge)
+            tex.allocateStorage(self.pixel_format, QOpenGLTexture.UInt8)
+            self.tex, self.size = tex, (w, h)
+        self.tex.setData(self.pixel_format, QOpenGLTexture.UInt8, data.ctypes.data, self._opts)
+
+    def destroy(self):
+        if self.tex is not None:
+            self.tex.destroy()
+            self.tex = None
+            self.size = (0, 0)
+
+
+class GLVideoCanvas(CanvasState, QOpenGLWidget):
+    """VideoCanvas on OpenGL (same API and signals).
+
+    Signals:
+      - roiClicked(int x, int y): emitted when in ROI mode and user clicks the image
+      - framePainted(int frame_id, float latency_s): first paint of a captured
+        frame, with the time since its capture
+    """
+    roiClicked = Signal(int, int)
+    framePainted = Signal(int, float)
+
+    def __init__(self, parent=None):
+        QOpenGLWidget.__init__(self, parent)
+        self._init_canvas()
+        self.setObjectName("VideoCanvas")
+        self._prog: QOpenGLShaderProgram | None = None
+        self._vao: QOpenGLVertexArrayObject | None = None
+        self._vbo: QOpenGLBuffer | None = None
+        self._tex_frame = self._tex_mask = self._tex_rgba = self._tex_palette = None
+        self._frame_dirty = self._overlay_dirty = True
+        self._palette_uploaded: list | None = None
+        self._frame_bgr = True
+        self.gl_error: str = ""       # shader/setup failure → QPainter fallback inside the GL widget
+
+    # ---------- state changes mark textures stale; paintGL uploads ----------
+    def set_frame(self, frame):
+        self._frame_dirty = True
+        super().set_frame(frame)
+
+    def set_overlay(self, qimg):
+        self._overlay_dirty = True
+        super().set_overlay(qimg)
+
+    def clear_overlay(self):
+        self._overlay_dirty = True
+        super().clear_overlay()
+
+    def _apply(self, changes: dict):
+        self._frame_dirty |= "frame" in changes
+        self._overlay_dirty |= "overlay" in changes
+        super()._apply(changes)
+
+    # ---------- GL ----------
+    def initializeGL(self):
+        try:
+            prog = QOpenGLShaderProgram(self)
+            if not (prog.addShaderFromSourceCode(QOpenGLShader.Vertex, _VERT)
+                    and prog.addShaderFromSourceCode(QOpenGLShader.Fragment, _FRAG)
+                    and prog.link()):
+                raise RuntimeError(prog.log() or "shader link failed")
+            self._vao = QOpenGLVertexArrayObject(self)
+            self._vao.create()
+            self._vao.bind()
+            self._vbo = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+            self._vbo.create()
+            self._vbo.bind()
+            quad = np.array([-1, -1, 1, -1, -1, 1, 1, 1], np.float32).tobytes()
+            self._vbo.allocate(quad, len(quad))
+            prog.bind()
+            prog.enableAttributeArray(b"a_pos")
+            prog.setAttributeBuffer(b"a_pos", GL_FLOAT, 0, 2)
+            prog.setUniformValue1i(b"u_frame", 0)
+            prog.setUniformValue1i(b"u_mask", 1)
+            prog.setUniformValue1i(b"u_palette", 2)
+            prog.release()
+            self._vbo.release()
+            self._vao.release()
+            self._prog = prog
+            self._tex_frame = _Texture(QOpenGLTexture.RGB8_UNorm, QOpenGLTexture.RGB, linear=True)
+            self._tex_mask = _Texture(QOpenGLTexture.R8_UNorm, QOpenGLTexture.Red, linear=False)
+            self._tex_rgba = _Texture(QOpenGLTexture.RGBA8_UNorm, QOpenGLTexture.RGBA, linear=True)
+            self._tex_palette = _Texture(QOpenGLTexture.RGBA8_UNorm, QOpenGLTexture.RGBA, linear=False)
+            self._frame_dirty = self._overlay_dirty = True
+            self._palette_uploaded = None
+            self.context().aboutToBeDestroyed.connect(self._release_gl)
+        except Exception as e:
+            self._prog = None
+            self.gl_error = str(e)
+
+    def _release_gl(self):
+        self.makeCurrent()
+        for t in (self._tex_frame, self._tex_mask, self._tex_rgba, self._tex_palette):
+            if t is not None:
+                t.destroy()
+        if self._vbo is not None:
+            self._vbo.destroy()
+        if self._vao is not None:
+            self._vao.destroy()
+        self._prog = None
+        self.doneCurrent()
+
+    def _upload(self):
+        if self._frame_dirty and self._frame is not None and not self._frame.isNull():
+            img = self._frame
+            self._frame_bgr = img.format() == QImage.Format_BGR888
+            if not self._frame_bgr and img.format() != QImage.Format_RGB888:
+                img = img.convertToFormat(QImage.Format_RGB888)
+            self._tex_frame.upload(_pixels(img, 3), img.width(), img.height())
+        self._frame_dirty = False
+
+        ov = self._overlay
+        if self._overlay_dirty and ov is not None and not ov.isNull():
+            if ov.format() == QImage.Format_Indexed8:
+                self._tex_mask.upload(_pixels(ov, 1), ov.width(), ov.height())
+            else:
+                if ov.format() != QImage.Format_RGBA8888:
+                    ov = ov.convertToFormat(QImage.Format_RGBA8888)
+                self._tex_rgba.upload(_pixels(ov, 4), ov.width(), ov.height())
+        self._overlay_dirty = False
+
+        if self._palette_uploaded != self._color_table:
+            table = np.zeros(256, np.uint32)
+            table[:len(self._color_table)] = np.asarray(self._color_table[:256], np.uint32)
+            argb = table.view(np.uint8).reshape(256, 4)       # little endian: B, G, R, A
+            self._tex_palette.upload(np.ascontiguousarray(argb[:, [2, 1, 0, 3]]), 256, 1)
+            self._palette_uploaded = list(self._color_table)
+
+    def _draw_gl(self, target):
+        f = self.context().functions()
+        dpr = self.devicePixelRatioF()
+        f.glViewport(0, 0, int(self.width() * dpr), int(self.height() * dpr))
+        bg = self.palette().window().color()
+        if self._frame is None or self._frame.isNull() or target.width() <= 0 or target.height() <= 0:
+            f.glClearColor(bg.redF(), bg.greenF(), bg.blueF(), 1.0)
+            f.glClear(GL_COLOR_BUFFER_BIT)
+            return
+        self._upload()
+
+        ov = self._overlay
+        mode = 0.0
+        mask_tex = None
+        if ov is not None and not ov.isNull():
+            mode = 1.0 if ov.format() == QImage.Format_Indexed8 else 2.0
+            mask_tex = self._tex_mask if mode == 1.0 else self._tex_rgba
+        src_w, src_h = self._frame.width(), self._frame.height()
+        W, H = max(1, self.width()), max(1, self.height())
+
+        prog = self._prog
+        prog.bind()
+        prog.setUniformValue(b"u_rect", target.x() / W, target.y() / H, target.width() / W, target.height() / H)
+        prog.setUniformValue(b"u_bg", bg.redF(), bg.greenF(), bg.blueF(), 1.0)
+        prog.setUniformValue1f(b"u_bgr", 1.0 if self._frame_bgr else 0.0)
+        prog.setUniformValue1f(b"u_mode", mode)
+        prog.setUniformValue1f(b"u_opacity", self._overlay_opacity)
+        prog.setUniformValue(b"u_offset", self._overlay_offset.x() / src_w, self._overlay_offset.y() / src_h)
+        if mask_tex is not None:
+            prog.setUniformValue(b"u_mask_size", float(mask_tex.size[0]), float(mask_tex.size[1]))
+            mask_tex.tex.bind(1)
+        self._tex_palette.tex.bind(2)
+        self._tex_frame.tex.bind(0)
+        self._vao.bind()
+        f.glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        self._vao.release()
+        self._tex_frame.tex.release(0)
+        self._tex_palette.tex.release(2)
+        if mask_tex is not None:
+            mask_tex.tex.release(1)
+        prog.release()
+
+    def paintGL(self):
+        self._pull_pending()
+        p = QPainter(self)
+        if self._prog is None:
+            # no usable shader: same drawing as VideoCanvas, through Qt's GL paint engine
+            self._paint_canvas(p)
+        else:
+            target = (self._calc_draw_rect(self._frame.width(), self._frame.height())
+                      if self._frame is not None and not self._frame.isNull() else None)
+            p.beginNativePainting()
+            try:
+                self._draw_gl(target if target is not None else QRect())
+            finally:
+                p.endNativePainting()
+            if target is not None and self._markers:
+                self._paint_markers(p, target, self._frame.width(), self._frame.height())
+            if self._hud:
+                self._paint_hud(p)
+        p.end()
+        self._frame_painted()
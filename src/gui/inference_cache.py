@@ -0,0 +1,174 @@
+# inference_cache.py — LRU of model masks for frames that come round again
+#
+# VideoThread loops file sources (seek to frame 0 at the end), so a demo or
+# training clip sends the model the very same frames on every pass. The cache
+# remembers the mask per frame:
+#   key      ("pos", source, index)  source identity + frame index, set by
+#                                    VideoThread as CapturedFrame.position
+#            ("hash", digest)        content hash of a strided sample of the
+#                                    pixels, for frames without a position
+#   value    zlib-compressed (H,W) uint8 class map; masks are long runs of one
+#            class, a 512×512 mask is a few KB
+# Entries are evicted least-recently-used once their compressed size exceeds
+# the memory budget.
+#
+# With a persistence directory, positioned entries are written per source as a
+# mask store (mask_store.py, frame = index) on save() and read back the first
+# time the source shows up again, so after one pass a replayed case has its
+# overlays at full frame rate from the first frame on — also after a restart.
+# The file name includes a model key: other weights / settings never see them.
+from __future__ import annotations
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+import numpy as np
+
+from .mask_store import MaskReader, MaskWriter
+
+
+class InferenceCache:
+    """
+    cache = InferenceCache(budget_mb=64, persist_dir=None, model_key="")
+    key = cache.key(frame)          # CapturedFrame or (H,W,3) ndarray
+    mask = cache.get(key)           # (H,W) uint8, read-only; None on a miss
+    cache.put(key, mask)
+    cache.save()                    # persist_dir only
+    cache.stats()   # {"hits", "misses", "entries", "mb", "evicted", "loaded", "hit_ratio"}
+    """
+
+    def __init__(self, budget_mb: float = 64.0, persist_dir: Optional[str] = None,
+                 model_key: str = "", hash_stride: int = 8, level: int = 1):
+        self.budget = int(max(0.0, float(budget_mb)) * (1 << 20))
+        self.persist_dir = persist_dir
+        self.model_key = str(model_key)
+        self.hash_stride = max(1, int(hash_stride))
+        self.level = int(level)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()   # key → (zlib bytes, h, w)
+        self._bytes = 0
+        self._sources: Set[str] = set()     # sources already looked up on disk
+        self._dirty: Set[str] = set()       # sources with entries not yet saved
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.loaded = 0
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    # ---------------- keys ----------------
+    def key(self, frame) -> Optional[tuple]:
+        pos = getattr(frame, "position", None)
+        if pos is not None:
+            source, index = pos
+            if self.persist_dir and source not in self._sources:
+                self._load(source)
+            return ("pos", source, int(index))
+        bgr = getattr(frame, "bgr", frame)
+        if not isinstance(bgr, np.ndarray):
+            return None
+        # every hash_stride-th pixel of every hash_stride-th row: decoded frames
+        # of the same source position hash identically, at 1/64 of the bytes
+        sample = np.ascontiguousarray(bgr[::self.hash_stride, ::self.hash_stride])
+        h = hashlib.blake2b(sample.data, digest_size=16)
+        h.update(repr(bgr.shape).encode())
+        return ("hash", h.digest())
+
+    # ---------------- lookup / insert ----------------
+    def get(self, key: Optional[tuple]) -> Optional[np.ndarray]:
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        buf, h, w = entry
+        return np.frombuffer(zlib.decompress(buf), np.uint8).reshape(h, w)
+
+    def put(self, key: Optional[tuple], mask: np.ndarray) -> None:
+        if key is None or self.budget <= 0:
+            return
+        h, w = mask.shape[:2]
+        buf = zlib.compress(np.ascontiguousarray(mask, dtype=np.uint8).tobytes(), self.level)
+        self._insert(key, (buf, h, w))
+        if key[0] == "pos":
+            self._dirty.add(key[1])
+
+    def _insert(self, key: tuple, entry: tuple) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        self._entries[key] = entry
+        self._bytes += len(entry[0])
+        while self._bytes > self.budget and self._entries:
+            _, (buf, _, _) = self._entries.popitem(last=False)
+            self._bytes -= len(buf)
+            self.evicted += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        self._sources.clear()
+        self._dirty.clear()
+
+    # ---------------- persistence ----------------
+    def path_for(self, source: str) -> Optional[str]:
+        if not self.persist_dir:
+            return None
+        stem = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.persist_dir, f"{stem}-{self.model_key or 'model'}.masks")
+
+    def _load(self, source: str) -> None:
+        self._sources.add(source)
+        path = self.path_for(source)
+        if path is None or not os.path.exists(path):
+            return
+        try:
+            with MaskReader(path) as r:
+                if r.meta.get("source") != source:
+                    return
+                for i in range(len(r)):
+                    frame, _, h, w = r.record(i)
+                    key = ("pos", source, frame)
+                    if key not in self._entries:
+                        self._insert(key, (r.raw(i), h, w))   # already zlib: no re-compression
+                        self.loaded += 1
+        except (OSError, ValueError):
+            pass
+
+    def save(self) -> int:
+        """Write the sources with new entries; returns the number of masks written."""
+        if not self.persist_dir:
+            return 0
+        written = 0
+        for source in list(self._dirty):
+            path = self.path_for(source)
+            chunks: Dict[int, tuple] = {}
+            try:
+                with MaskReader(path) as r:   # keep what was evicted from memory since loading
+                    if r.meta.get("source") == source:
+                        for i in range(len(r)):
+                            frame, _, h, w = r.record(i)
+                            chunks[frame] = (r.raw(i), h, w)
+            except (OSError, ValueError):
+                pass
+            for key, entry in self._entries.items():
+                if key[0] == "pos" and key[1] == source:
+                    chunks[key[2]] = entry
+            try:
+                with MaskWriter(path, meta={"source": source, "model": self.model_key}) as w:
+                    for frame in sorted(chunks):
+                        buf, h, wd = chunks[frame]
+                        w.write_raw(frame, 0.0, h, wd, buf)
+                written += len(chunks)
+                self._dirty.discard(source)
+            except OSError:
+                pass
+        return written
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                "mb": self._bytes / (1 << 20), "evicted": self.evicted, "loaded": self.loaded,
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
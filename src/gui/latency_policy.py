@@ -0,0 +1,93 @@
+# latency_policy.py — how live video and the (slower) overlay are put on screen
+#
+#   strict      : only (frame, overlay) pairs with the same id are drawn; the video
+#                 runs at the model's rate and lags by the whole inference time
+#   live        : every frame is drawn as soon as it is captured, with the most
+#                 recent overlay on top (which is one inference old)
+#   live_motion : like live, but the overlay is shifted by the global motion
+#                 between the frame it was computed on and the frame on screen
+#
+# LatencyMeter keeps capture → paint latency (and overlay age) per policy, so the
+# policies can be compared on the same procedure.
+from __future__ import annotations
+import collections
+from typing import Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+POLICIES = ("strict", "live", "live_motion")
+POLICY_LABELS = {"strict": "Synchron", "live": "Live", "live_motion": "Live + Bewegung"}
+
+
+class LatencyMeter:
+    """Rolling capture → display samples (seconds) per policy."""
+
+    def __init__(self, window: int = 600):
+        self.window = int(window)
+        self._lat: Dict[str, Deque[float]] = {}
+        self._age: Dict[str, Deque[float]] = {}
+
+    def add(self, policy: str, latency: float, overlay_age: Optional[float] = None) -> None:
+        self._lat.setdefault(policy, collections.deque(maxlen=self.window)).append(latency)
+        if overlay_age is not None:
+            self._age.setdefault(policy, collections.deque(maxlen=self.window)).append(overlay_age)
+
+    def summary(self, policy: str) -> Optional[dict]:
+        lat = self._lat.get(policy)
+        if not lat:
+            return None
+        a = np.asarray(lat) * 1000.0
+        out = {"n": len(a), "mean_ms": float(a.mean()), "p50_ms": float(np.percentile(a, 50)),
+               "p95_ms": float(np.percentile(a, 95))}
+        age = self._age.get(policy)
+        if age:
+            out["overlay_age_ms"] = float(np.mean(age) * 1000.0)
+        return out
+
+    def text(self, policy: str) -> str:
+        s = self.summary(policy)
+        label = POLICY_LABELS.get(policy, policy)
+        if s is None:
+            return f"{label}: noch keine Messung"
+        t = f"{label}: Anzeige-Latenz Ø {s['mean_ms']:.0f} ms (p95 {s['p95_ms']:.0f} ms)"
+        if "overlay_age_ms" in s:
+            t += f" · Overlay-Alter Ø {s['overlay_age_ms']:.0f} ms"
+        return t
+
+    def report(self) -> str:
+        return " | ".join(self.text(p) for p in POLICIES if p in self._lat)
+
+
+class GlobalMotion:
+    """
+    Whole-image translation between two frames by phase correlation on small
+    grayscale thumbnails (~1-2 ms at 1080p). Estimates with a weak correlation
+    peak (blur, smoke, large non-rigid motion) count as "no shift".
+    """
+
+    def __init__(self, width: int = 160, min_response: float = 0.05):
+        self.width = int(width)
+        self.min_response = float(min_response)
+        self._window: Optional[np.ndarray] = None
+
+    def thumbnail(self, frame_bgr: np.ndarray) -> np.ndarray:
+        h, w = frame_bgr.shape[:2]
+        step = max(1, w // (self.width * 4))   # cheap pre-decimation before the area filter
+        src = frame_bgr[::step, ::step]
+        tw = min(self.width, src.shape[1])
+        th = max(8, int(round(h * tw / w)))
+        small = cv2.resize(src, (tw, th), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def shift(self, ref: np.ndarray, cur: np.ndarray, frame_width: int) -> Tuple[float, float]:
+        """(dx, dy) in frame pixels that moves content of `ref` onto `cur`."""
+        if ref.shape != cur.shape:
+            return 0.0, 0.0
+        if self._window is None or self._window.shape != ref.shape:
+            self._window = cv2.createHanningWindow((ref.shape[1], ref.shape[0]), cv2.CV_32F)
+        (dx, dy), response = cv2.phaseCorrelate(ref, cur, self._window)
+        if response < self.min_response:
+            return 0.0, 0.0
+        s = frame_width / float(ref.shape[1])
+        return dx * s, dy * s
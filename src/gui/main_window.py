@@ -3,16 +3,24 @@ from __future__ import annotations
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QGridLayout,
     QLabel, QPushButton, QSlider, QLineEdit, QPlainTextEdit,
-    QStatusBar, QFrame, QSizePolicy, QFileDialog, QMessageBox
+    QStatusBar, QFrame, QSizePolicy, QFileDialog, QMessageBox, QComboBox
 )
-from PySide6.QtCore import Qt, QDateTime, QThread, QRect
-from PySide6.QtGui import QPixmap, QImage, QPalette, QColor, QPainter
+from PySide6.QtCore import Qt, QDateTime, QThread, QTimer
+from PySide6.QtGui import QPixmap, QImage, QPalette, QColor, QPainter, QShortcut, QKeySequence
 
 from datetime import datetime
 import os
+import sys
+import time
 import numpy as np
-from typing import Dict, Optional
-
+from typing import Optional
+
+from .frames import CapturedFrame
+from .latency_policy import POLICIES, POLICY_LABELS, GlobalMotion, LatencyMeter
+from .pairing import PairingRing
+from .presenter import FramePresenter
+from .tracing import TRACE
+from .startup import STARTUP
 from .video_thread import VideoThread
 from .widgets import Card, TopBar, Switch, CircularProgress, VideoCanvas, AppState
 from .style import STYLE
@@ -23,10 +31,17 @@ class MainWindow(QMainWindow):
     """
     Latency-synchronized pipeline:
 
-    - VideoThread emits frames with a monotonically increasing frame_id.
-    - We pass exactly one "latest" frame to the model when the worker is idle.
+    - VideoThread publishes frames with a monotonically increasing frame_id.
+    - Frames live in pooled buffers: anything kept past the current slot is
+      retain()ed and release()d again when dropped (pairs, latest, last drawn).
+    - We pass the "latest" frame to the model whenever the worker has room
+      (one frame at a time, or one per stage when the worker is pipelined).
     - ModelWorker returns an overlay with the SAME frame_id.
-    - UI only draws (frame, overlay) pairs with matching ids. Result: no visual drift.
+    - With the default "strict" latency policy the UI only draws (frame, overlay)
+      pairs with matching ids. Result: no visual drift. The "live" policies draw
+      every frame at once with the newest (optionally motion-shifted) overlay.
+    - Video starts immediately; the model (and torch) load on the worker thread
+      and pairing only kicks in once the worker reports ready.
     """
     def __init__(self):
         super().__init__()
@@ -35,20 +50,29 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Intraoperative Assistenz - Harnblase")
 
         # ---- latency control state ----
-        self._latest_np_frame: Optional[np.ndarray] = None  # newest raw RGB frame
+        self._latest_frame: Optional[CapturedFrame] = None  # newest captured frame (retained)
         self._latest_frame_id: Optional[int] = None         # newest frame id
-        self._inflight: bool = False                        # True while model is working
-        self._inflight_id: Optional[int] = None             # frame id currently processed
+        self._last_dispatched_id: int = 0
         self._model_ready = False
         self._pending_video_src: str | int | None = None
         self._camera_connected = False
+        self._pill_stopped: Optional[bool] = None   # camera pill "stopped" style as last applied
         self._note_counter = 1
 
-        # Pair stores: wait until we have BOTH frame and overlay for the same id.
-        self._frames: Dict[int, QImage] = {}
-        self._overlays: Dict[int, QImage] = {}
+        # Pair store: frames sent to the model wait here for the overlay with the same id;
+        # its live entries are exactly the frames still inside the worker
+        # (re-sized below once the worker says how many that can be).
+        self._pairs = PairingRing(capacity=16)
         self._last_displayed_id: Optional[int] = None
 
+        # Latency policy (strict pairs / live video + latest overlay / + motion shift)
+        policy = os.environ.get("LATENCY_POLICY", "strict").lower()
+        self._policy = policy if policy in POLICIES else "strict"
+        self._latency = LatencyMeter()
+        self._motion = GlobalMotion()
+        self._overlay_thumb = None                     # thumbnail of the overlay's source frame
+        self._overlay_t_capture: Optional[float] = None
+
         central = QWidget(); self.setCentralWidget(central)
         outer = QVBoxLayout(central); outer.setContentsMargins(0,0,0,0); outer.setSpacing(8)
 
@@ -91,11 +115,23 @@ class MainWindow(QMainWindow):
 
         video_card = Card("src/gui/icons/video.png", "Live-Endoskopie", right_widget=toggle_row)
 
-        # Video area
-        self.video_label = VideoCanvas()
+        # Video area — VIDEO_CANVAS=gl draws through OpenGL (textures + shader
+        # overlay, Mesa llvmpipe without a GPU); QPainter canvas otherwise
+        self.video_label = None
+        gl_fallback = False   # reported in the footer once it exists
+        if os.environ.get("VIDEO_CANVAS", "").lower() == "gl":
+            from .gl_canvas import GLVideoCanvas, gl_available
+            if gl_available():
+                self.video_label = GLVideoCanvas()
+            else:
+                gl_fallback = True
+        if self.video_label is None:
+            self.video_label = VideoCanvas()
         self.video_label.setObjectName("VideoArea")
         self.video_label.setMinimumSize(640, 360)
         video_card.inner_layout.addWidget(self.video_label, 1)
+        # frame/overlay/opacity/offset changes reach the canvas at most once per display refresh
+        self.presenter = FramePresenter(self.video_label, self)
 
         # Footer / statusbar
         self.footer = QStatusBar(self)
@@ -122,13 +158,22 @@ class MainWindow(QMainWindow):
         self.open_video_btn.clicked.connect(self._on_open_video_clicked)
         video_card.inner_layout.addWidget(self.open_video_btn, 0, Qt.AlignRight)
 
-        # Model worker (HAC)
-        from .model_worker import ModelWorker
+        # Model worker (HAC) — cheap to construct: torch is imported on its thread,
+        # or in a separate process with MODEL_PROCESS=1
+        if os.environ.get("MODEL_PROCESS", "0").lower() in ("1", "true", "yes"):
+            from .process_worker import ProcessModelWorker as ModelWorker
+        else:
+            from .model_worker import ModelWorker
         self.model_worker = ModelWorker(target_fps=None, max_queue=2)  # event-driven, no timer
         self.model_worker.overlay_ready.connect(self.on_overlay_ready)
         self.model_worker.debug.connect(lambda msg: self.footer.showMessage(msg, 5000))
         self.model_worker.error.connect(lambda msg: self.footer.showMessage(msg, 7000))
         self.model_worker.started_ok.connect(self.on_model_ready)
+        # room for every frame the worker may hold (batched mode: batch_size) with slack,
+        # otherwise dispatch is never throttled and slots get evicted
+        most = max(int(getattr(self.model_worker, "max_inflight", 1)),
+                   int(getattr(self.model_worker, "batch_size", 1)))
+        self._pairs = PairingRing(capacity=max(16, 2 * most))
 
         # start worker at top priority
         try:
@@ -137,7 +182,7 @@ class MainWindow(QMainWindow):
             self.model_worker.start()
 
         # Internal frame/overlay cache (for screenshot composition)
-        self._last_frame_qimg: QImage | None = None
+        self._last_frame: CapturedFrame | None = None   # last drawn frame (retained)
         self._last_overlay_qimg: QImage | None = None
 
         # Start note
@@ -151,8 +196,16 @@ class MainWindow(QMainWindow):
         trans_label.setObjectName("MutedLabel")
         slider_row.addWidget(trans_label)
         slider_row.addWidget(self.overlay_slider)
+        self.latency_combo = QComboBox()
+        for key in POLICIES:
+            self.latency_combo.addItem(POLICY_LABELS[key], key)
+        self.latency_combo.setCurrentIndex(POLICIES.index(self._policy))
+        self.latency_combo.currentIndexChanged.connect(
+            lambda i: self.set_latency_policy(self.latency_combo.itemData(i))
+        )
+        slider_row.addWidget(self.latency_combo)
         self.overlay_slider.valueChanged.connect(
-            lambda v: self.video_label.set_overlay_opacity(v / 100.0)
+            lambda v: self.presenter.set_overlay_opacity(v / 100.0)
         )
 
         self.vessel_toggle.toggled.connect(self._on_vessel_toggle)
@@ -178,6 +231,16 @@ class MainWindow(QMainWindow):
 
         self.roi_btn.toggled.connect(self.on_roi_toggled)
         self.video_label.roiClicked.connect(self.on_roi_marked)
+        self.video_label.framePainted.connect(self._on_frame_painted)
+
+        # Latency tracing: F3 toggles the HUD, Ctrl+Shift+T exports CSV + Chrome trace
+        self._hud_timer = QTimer(self)
+        self._hud_timer.setInterval(500)
+        self._hud_timer.timeout.connect(lambda: self.video_label.set_hud(TRACE.hud_text()))
+        QShortcut(QKeySequence("F3"), self, activated=lambda: self.set_trace_hud(not self._hud_timer.isActive()))
+        QShortcut(QKeySequence("Ctrl+Shift+T"), self, activated=self.export_trace)
+        if os.environ.get("TRACE_HUD", "0").lower() in ("1", "true", "yes"):
+            self.set_trace_hud(True)
 
         video_card.inner_layout.addLayout(slider_row)
         video_card.inner_layout.addLayout(roi_row)
@@ -252,72 +315,80 @@ class MainWindow(QMainWindow):
         root.addWidget(left_wrap, 2)
         root.addWidget(right_wrap, 3)
 
-        # Start note: model loads, start video when ready
-        self.footer.showMessage("Lade Modell …")
+        # Start note: model loads in the background; live video starts right away
+        if gl_fallback:
+            self.footer.showMessage("Kein OpenGL-Kontext verfügbar – QPainter-Anzeige · Lade Modell …")
+        else:
+            self.footer.showMessage("Lade Modell …")
+        QTimer.singleShot(0, self._start_initial_video)
 
     # ---------------- core sync helpers ----------------
+    def _overlay_active(self) -> bool:
+        """Overlay wanted AND model loaded; until then frames are drawn raw."""
+        return self._model_ready and self.vessel_toggle.isChecked()
+
     def _maybe_dispatch_inference(self):
-        """If model idle and we have a fresh frame, start inference immediately."""
-        if not self._model_ready or not self.vessel_toggle.isChecked():
+        """If the model has room and we have a fresh frame, start inference immediately."""
+        if not self._overlay_active():
             return
-        if self._inflight:
+        if len(self._pairs) >= getattr(self.model_worker, "max_inflight", 1):
             return
-        if self._latest_np_frame is None or self._latest_frame_id is None:
+        if self._latest_frame is None or self._latest_frame_id is None:
             return
+        fid = self._latest_frame_id
+        if fid <= self._last_dispatched_id:
+            return  # already in the worker
+        self._pairs.put_frame(fid, self._latest_frame)
+        self._last_dispatched_id = fid
+        TRACE.mark(fid, "dispatch")
         try:
-            self._inflight = True
-            self._inflight_id = self._latest_frame_id
-            self.model_worker.feed_frame(self._latest_np_frame, self._latest_frame_id)
+            self.model_worker.feed_frame(self._latest_frame, fid)
         except Exception:
-            self._inflight = False
-            self._inflight_id = None
-
-    def _display_pair_if_ready(self, frame_id: int):
-        """If we have both frame and overlay for frame_id, show them atomically."""
-        f = self._frames.get(frame_id)
-        o = self._overlays.get(frame_id)
-        if f is None or o is None:
-            return False
+            self._pairs.discard(fid)
 
-        # Draw the exact pair: no drift.
-        self._last_frame_qimg = f
-        self._last_overlay_qimg = o if self.vessel_toggle.isChecked() else None
+    def _display_pair(self, frame: CapturedFrame, overlay: QImage):
+        """Show a frame together with the overlay computed from it: no drift."""
+        self._set_last_frame(frame)
+        self._last_overlay_qimg = overlay if self.vessel_toggle.isChecked() else None
 
-        self.video_label.set_frame(f)
+        self.presenter.set_frame(frame)
         if self.vessel_toggle.isChecked():
-            self.video_label.set_overlay(o)
-            self.video_label.set_overlay_opacity(self.overlay_slider.value() / 100.0)
+            self.presenter.set_overlay(overlay)
+            self.presenter.set_overlay_opacity(self.overlay_slider.value() / 100.0)
         else:
-            self.video_label.clear_overlay()
-
-        self._last_displayed_id = frame_id
-
-        # Drop all older cached items to keep memory tiny
-        to_drop = [k for k in self._frames.keys() if k < frame_id]
-        for k in to_drop:
-            self._frames.pop(k, None)
-        to_drop = [k for k in self._overlays.keys() if k < frame_id]
-        for k in to_drop:
-            self._overlays.pop(k, None)
-
-        # Keep cache bounded (paranoia)
-        if len(self._frames) > 8:
-            oldest = sorted(self._frames.keys())[:-4]
-            for k in oldest:
-                self._frames.pop(k, None)
-        if len(self._overlays) > 8:
-            oldest = sorted(self._overlays.keys())[:-4]
-            for k in oldest:
-                self._overlays.pop(k, None)
-
-        return True
+            self.presenter.clear_overlay()
+
+        self._last_displayed_id = frame.frame_id
+
+    def _set_last_frame(self, frame: CapturedFrame):
+        if frame is self._last_frame:
+            return
+        frame.retain()
+        if self._last_frame is not None:
+            self._last_frame.release()
+        self._last_frame = frame
+
+    def _release_frames(self):
+        """Hand every pooled buffer we still hold back (video restart / close)."""
+        self._pairs.clear()
+        self.presenter.discard()
+        for name in ("_latest_frame", "_last_frame"):
+            f = getattr(self, name)
+            if f is not None:
+                f.release()
+                setattr(self, name, None)
 
     # ---------------- slots ----------------
+    def _start_initial_video(self):
+        if getattr(self, "vthread", None) is None:
+            src = self._pending_video_src if self._pending_video_src is not None else "auto"
+            self.start_video_thread(src)
+
     def on_model_ready(self):
         self._model_ready = True
-        self.footer.showMessage("Modell geladen – starte Video…", 3000)
-        src = self._pending_video_src if self._pending_video_src is not None else "auto"
-        self.start_video_thread(src)
+        STARTUP.mark("model_ready")
+        self.footer.showMessage("Modell geladen – Overlay aktiv", 3000)
+        self._maybe_dispatch_inference()
 
     def _on_open_video_clicked(self):
         start_dir = getattr(self, "_last_video_dir", os.getcwd())
@@ -329,30 +400,53 @@ class MainWindow(QMainWindow):
             return
         self._last_video_dir = os.path.dirname(path)
         self._pending_video_src = path
-        if self._model_ready:
-            self.footer.showMessage(f"Opening: {os.path.basename(path)}", 3000)
-            self.start_video_thread(path)
-        else:
-            self.footer.showMessage(
-                f"Modell lädt noch – starte Video automatisch: {os.path.basename(path)}",
-                4000
-            )
+        self.footer.showMessage(f"Opening: {os.path.basename(path)}", 3000)
+        self.start_video_thread(path)
+
+    def _on_frame_available(self, _frame_id: int):
+        vt = getattr(self, "vthread", None)
+        if vt is None or self.sender() is not vt:
+            return  # late notification from a thread we already replaced
+        frame = vt.latest_frame()
+        if frame is None:
+            return
+        STARTUP.mark("first_frame")
+        TRACE.mark(frame.frame_id, "delivered")
+        try:
+            self.on_frame_for_model(frame)
+            self.update_video_frame(frame)
+        finally:
+            frame.release()
 
-    def on_frame_for_model(self, np_frame: np.ndarray, frame_id: int):
+    def on_frame_for_model(self, frame: CapturedFrame):
         # Always store newest raw frame
-        self._latest_np_frame = np_frame
-        self._latest_frame_id = frame_id
+        frame.retain()
+        if self._latest_frame is not None:
+            self._latest_frame.release()
+        self._latest_frame = frame
+        self._latest_frame_id = frame.frame_id
         # Fire inference immediately if idle
         self._maybe_dispatch_inference()
 
     def on_overlay_ready(self, overlay_qimg: QImage, frame_id: int):
-        # Inference finished; record overlay and try to draw the matching pair.
-        self._inflight = False
-        self._inflight_id = None
-
-        self._overlays[frame_id] = overlay_qimg
-        if self.vessel_toggle.isChecked():
-            self._display_pair_if_ready(frame_id)
+        # Inference finished; draw the matching pair. Overlays come back in order,
+        # so anything older was dropped by the worker and can be released too.
+        if not self._pairs.holds(frame_id):
+            # not dispatched in this session: a late overlay from the previous
+            # video source (its ids run higher than the restarted ones), or one
+            # whose frame was already evicted — releasing up to it would drop
+            # frames the worker is still busy with
+            return
+        TRACE.mark(frame_id, "overlay")
+        frame = self._pairs.put_overlay(frame_id, overlay_qimg)
+        if frame is not None and self.vessel_toggle.isChecked():
+            if self._policy == "strict":
+                self._display_pair(frame, overlay_qimg)
+            else:
+                self._show_live_overlay(frame, overlay_qimg)
+            if STARTUP.mark("first_overlay"):
+                self.footer.showMessage(STARTUP.report(), 8000)
+        self._pairs.drop_through(frame_id)
 
         # If a newer frame is already waiting, start it right away.
         if self._latest_frame_id is not None and (self._latest_frame_id > frame_id):
@@ -365,15 +459,88 @@ class MainWindow(QMainWindow):
 
         if not on:
             # fall back to raw live frames (no overlay waiting)
-            self.video_label.clear_overlay()
-            if self._last_frame_qimg is not None:
-                self.video_label.set_frame(self._last_frame_qimg)
+            self.presenter.clear_overlay()
+            self._reset_live_overlay()
+            if self._last_frame is not None:
+                self.presenter.set_frame(self._last_frame)
         else:
-            # if we already have a matching pair for the last frame, draw it
+            # kick inference to get a pair for the newest frame
             if self._latest_frame_id is not None:
-                if not self._display_pair_if_ready(self._latest_frame_id):
-                    # else, kick inference to get a pair
-                    self._maybe_dispatch_inference()
+                self._maybe_dispatch_inference()
+
+    # ---------------- tracing ----------------
+    def set_trace_hud(self, on: bool):
+        if on:
+            self._hud_timer.start()
+            self.video_label.set_hud(TRACE.hud_text())
+        else:
+            self._hud_timer.stop()
+            self.video_label.set_hud("")
+
+    def export_trace(self, prefix: Optional[str] = None) -> list:
+        prefix = prefix or os.path.join(os.getcwd(), "traces", datetime.now().strftime("trace_%Y%m%d_%H%M%S"))
+        try:
+            paths = TRACE.export(prefix)
+            self.footer.showMessage(f"Trace gespeichert: {', '.join(os.path.basename(p) for p in paths)}", 6000)
+            return paths
+        except Exception as e:
+            self.footer.showMessage(f"Trace-Export fehlgeschlagen: {e}", 6000)
+            return []
+
+    # ---------------- latency policy ----------------
+    def set_latency_policy(self, policy: str):
+        """Switch how video and overlay are drawn (see latency_policy.py); takes effect at once."""
+        if policy not in POLICIES or policy == self._policy:
+            return
+        before = self._latency.text(self._policy)
+        self._policy = policy
+        self.presenter.set_overlay_offset(0.0, 0.0)
+        if self.latency_combo.currentIndex() != POLICIES.index(policy):
+            self.latency_combo.setCurrentIndex(POLICIES.index(policy))
+        if policy != "strict" and self._latest_frame is not None:
+            self._set_last_frame(self._latest_frame)
+            self.presenter.set_frame(self._latest_frame)
+        if policy == "live_motion" and self._last_frame is not None and self._overlay_thumb is None:
+            self._overlay_thumb = self._motion.thumbnail(self._last_frame.bgr)
+        self.footer.showMessage(f"{before} → {POLICY_LABELS[policy]}", 6000)
+
+    def _show_live_overlay(self, frame: CapturedFrame, overlay: QImage):
+        """Live policies: keep the video running, just swap in the newest overlay."""
+        self._last_overlay_qimg = overlay
+        self._overlay_t_capture = frame.t_capture
+        self.presenter.set_overlay(overlay)
+        self.presenter.set_overlay_opacity(self.overlay_slider.value() / 100.0)
+        if self._policy == "live_motion":
+            self._overlay_thumb = self._motion.thumbnail(frame.bgr)
+            if self._last_frame is not None:
+                self._compensate_overlay(self._last_frame)
+        else:
+            self.presenter.set_overlay_offset(0.0, 0.0)
+
+    def _compensate_overlay(self, frame: CapturedFrame):
+        if self._overlay_thumb is None:
+            return
+        try:
+            dx, dy = self._motion.shift(self._overlay_thumb, self._motion.thumbnail(frame.bgr), frame.bgr.shape[1])
+        except Exception:
+            dx, dy = 0.0, 0.0
+        self.presenter.set_overlay_offset(dx, dy)
+
+    def _reset_live_overlay(self):
+        self._overlay_thumb = None
+        self._overlay_t_capture = None
+        self.presenter.set_overlay_offset(0.0, 0.0)
+
+    def _on_frame_painted(self, _frame_id: int, latency: float):
+        if not self._overlay_active():
+            return  # only the overlay policies are being compared
+        age = None
+        if self._policy == "strict":
+            age = latency  # the overlay belongs to the frame on screen
+        elif self._overlay_t_capture is not None:
+            age = time.perf_counter() - self._overlay_t_capture
+        self._latency.add(self._policy, latency, age)
+        self.latency_combo.setToolTip(self._latency.text(self._policy))
 
     def closeEvent(self, event):
         try:
@@ -390,6 +557,12 @@ class MainWindow(QMainWindow):
                     self.vthread.wait(1500)
                 except Exception:
                     pass
+            self._release_frames()
+            report = self._latency.report()
+            if report:
+                print(report, file=sys.stderr)
+            if os.environ.get("TRACE_EXPORT"):
+                self.export_trace(os.environ["TRACE_EXPORT"])
         finally:
             super().closeEvent(event)
 
@@ -401,6 +574,13 @@ class MainWindow(QMainWindow):
                 self.vthread.wait(500)
             except Exception:
                 pass
+        # frame ids restart with the new thread → so must the per-frame trace rows
+        self._release_frames()
+        TRACE.clear()
+        self._reset_live_overlay()
+        self._latest_frame_id = None
+        self._last_displayed_id = None
+        self._last_dispatched_id = 0
 
         # Create WITHOUT forced resizing (preserve original format)
         try:
@@ -415,9 +595,17 @@ class MainWindow(QMainWindow):
             cam_or_path = 0 if (isinstance(src, str) and src == "auto") else src
             self.vthread = VideoThread(cam_or_path)
 
-        # Connect signals (now include frame_id)
-        self.vthread.frame_ready.connect(self.update_video_frame)
-        self.vthread.frame_raw.connect(self.on_frame_for_model)
+        # recorded files: throughput over latency → let the worker batch frames
+        set_batching = getattr(self.model_worker, "set_batching", None)
+        if set_batching is not None:
+            set_batching(not self.vthread.is_live())
+        # … and reuse the masks of frames it has already seen (looping clips)
+        set_caching = getattr(self.model_worker, "set_caching", None)
+        if set_caching is not None:
+            set_caching(not self.vthread.is_live())
+
+        # Frames are pulled from the thread's ring; the signal only says "new frame"
+        self.vthread.frame_available.connect(self._on_frame_available)
         self.vthread.connection_changed.connect(self.set_connection_status)
         self.vthread.video_finished.connect(lambda: self.footer.showMessage("Video finished", 3000))
         self.vthread.error.connect(self._on_video_error)
@@ -450,50 +638,32 @@ class MainWindow(QMainWindow):
         self.start_video_thread(path)
 
     # video frame (QImage + id)
-    def update_video_frame(self, qimg: QImage, frame_id: int):
-        # Cache for pairing
-        self._frames[frame_id] = qimg
-
+    def update_video_frame(self, frame: CapturedFrame):
         # For black/blank detection & screenshots keep references to the *latest drawn*.
-        # If overlay disabled, draw raw immediately; if enabled, wait for overlay pair.
-        if self.vessel_toggle.isChecked():
-            if self._display_pair_if_ready(frame_id):
-                pass  # drawn with overlay
-        else:
-            self._last_frame_qimg = qimg
-            self.video_label.set_frame(qimg)
-
-        # Fast black detection heuristic on the *drawn* frame when available
-        drawn = self._last_frame_qimg if self._last_frame_qimg is not None else qimg
-        is_black = True
-        BLACK_THR = 12
-        try:
-            if drawn and not drawn.isNull() and drawn.width() > 0 and drawn.height() > 0:
-                w, h = drawn.width(), drawn.height()
-                sample_coords = [
-                    (w // 2, h // 2),
-                    (w // 4, h // 2),
-                    (3 * w // 4, h // 2),
-                    (w // 2, h // 4),
-                    (w // 2, 3 * h // 4),
-                ]
-                for (sx, sy) in sample_coords:
-                    c = drawn.pixelColor(int(sx), int(sy))
-                    if (c.red() > BLACK_THR) or (c.green() > BLACK_THR) or (c.blue() > BLACK_THR):
-                        is_black = False
-                        break
-        except Exception:
-            is_black = False
-
-        # update topbar pill "stopped" look
-        try:
-            pill = self.topbar.record_wrap
-            pill.setProperty("stopped", bool(is_black))
-            pill.style().unpolish(pill)
-            pill.style().polish(pill)
-            pill.update()
-        except Exception:
-            pass
+        # If overlay disabled (or model still loading), draw raw immediately;
+        # if enabled, strict pairing draws frames when their overlay arrives
+        # (on_overlay_ready), the live policies draw them right away.
+        if not self._overlay_active() or self._policy != "strict":
+            self._set_last_frame(frame)
+            self.presenter.set_frame(frame)
+            if self._policy == "live_motion" and self._overlay_active():
+                self._compensate_overlay(frame)
+
+        # black frame → "stopped" pill; scored once in the capture thread (frame_quality.py)
+        quality = (self._last_frame or frame).quality
+        is_black = quality is not None and quality.is_black
+
+        # update topbar pill "stopped" look — re-polishing is expensive, only on a change
+        if bool(is_black) != self._pill_stopped:
+            self._pill_stopped = bool(is_black)
+            try:
+                pill = self.topbar.record_wrap
+                pill.setProperty("stopped", self._pill_stopped)
+                pill.style().unpolish(pill)
+                pill.style().polish(pill)
+                pill.update()
+            except Exception:
+                pass
 
         if not self._camera_connected:
             self._camera_connected = True
@@ -520,31 +690,21 @@ class MainWindow(QMainWindow):
 
     # Screenshot: compose frame + overlay with opacity (no aspect-cropping)
     def on_screenshot_clicked(self):
-        if self._last_frame_qimg is None:
+        if self._last_frame is None:
             QMessageBox.information(self, "Screenshot", "Kein Frame verfügbar.")
             return
 
-        base = self._last_frame_qimg.convertToFormat(QImage.Format_RGB888)
+        base = self._last_frame.qimage.convertToFormat(QImage.Format_RGB888)
         result = base.copy()
         painter = QPainter(result)
 
         if self._last_overlay_qimg is not None and self.vessel_toggle.isChecked():
-            ov = self._last_overlay_qimg
+            ov = self.video_label.with_palette(self._last_overlay_qimg)
             painter.setOpacity(self.overlay_slider.value() / 100.0)
 
-            if ov.size() == base.size():
-                painter.drawImage(0, 0, ov)
-            else:
-                bw, bh = base.width(), base.height()
-                ow, oh = ov.width(), ov.height()
-                if ow > 0 and oh > 0:
-                    scale = min(bw / ow, bh / oh)
-                    draw_w = int(ow * scale)
-                    draw_h = int(oh * scale)
-                    off_x = (bw - draw_w) // 2
-                    off_y = (bh - draw_h) // 2
-                    target = QRect(off_x, off_y, draw_w, draw_h)
-                    painter.drawImage(target, ov)
+            # the mask covers the whole frame, whatever its resolution (model or frame size)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+            painter.drawImage(base.rect(), ov)
 
             painter.setOpacity(1.0)
 
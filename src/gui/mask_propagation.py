@@ -0,0 +1,166 @@
+# mask_propagation.py — warp the last model mask forward with low-res optical flow
+#
+# The model runs on keyframes only (every N frames, or sooner when the scene
+# moves too much); every frame in between gets the keyframe mask warped onto it
+# with dense Farneback flow computed on small grayscale thumbnails. Flow is
+# always measured against the keyframe itself, not chained frame to frame, so
+# warping error does not accumulate beyond one keyframe interval. The warp
+# itself runs at about model resolution (the mask has no finer detail anyway)
+# and the uint8 result is scaled back to the key mask's size, which keeps 1080p cheap.
+from __future__ import annotations
+import collections
+import os
+import threading
+from typing import Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class MaskPropagator:
+    """
+    Keyframe bookkeeping + flow warping. Thread-safe: set_keyframe() is called
+    from the inference thread, propagate()/keyframe_due() from the lane thread.
+
+    keyframe_interval : frames after a keyframe before the next one is due
+                        (0 or 1 = every frame)
+    motion_threshold  : mean flow (full-resolution pixels) that makes one due early
+                        (0 = never, keyframes by interval only)
+    flow_width        : thumbnail width the flow is computed at
+    warp_width        : width the key mask is warped at before upscaling
+
+    history holds (frame_id, kind, key_id, motion) for the last frames, kind being
+    "inferred" (model output shown), "propagated" (warped) or "keyframe" (model
+    ran on this frame in the background; its mask became the new key).
+    If log_path is set, the same rows are appended there as CSV.
+    """
+
+    def __init__(self, keyframe_interval: int = 5, motion_threshold: float = 12.0,
+                 flow_width: int = 160, warp_width: int = 512,
+                 log_path: Optional[str] = None, history: int = 2048):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.motion_threshold = float(motion_threshold)
+        self.flow_width = max(16, int(flow_width))
+        self.warp_width = max(self.flow_width, int(warp_width))
+        self.history: Deque[Tuple[int, str, int, float]] = collections.deque(maxlen=history)
+        self.counts: Dict[str, int] = {"inferred": 0, "propagated": 0, "keyframe": 0}
+        self._lock = threading.Lock()
+        # (frame_id, thumb, key mask, mask at warp resolution)
+        self._key: Optional[Tuple[int, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._grid: Optional[Tuple[Tuple[int, int], np.ndarray, np.ndarray]] = None
+        self._last_motion = 0.0
+        self._log_file = None
+        if log_path:
+            try:
+                new = not os.path.exists(log_path)
+                self._log_file = open(log_path, "a", buffering=1)
+                if new:
+                    self._log_file.write("frame_id,kind,key_id,motion_px\n")
+            except Exception:
+                self._log_file = None
+
+    # ---------------- keyframes ----------------
+    def thumbnail(self, frame_bgr: np.ndarray) -> np.ndarray:
+        h, w = frame_bgr.shape[:2]
+        tw = min(self.flow_width, w)
+        th = max(1, int(round(h * tw / w)))
+        small = cv2.resize(frame_bgr, (tw, th), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    @property
+    def key_id(self) -> int:
+        key = self._key
+        return key[0] if key is not None else -1
+
+    def set_keyframe(self, frame_id: int, thumb: np.ndarray, mask: np.ndarray) -> None:
+        with self._lock:
+            # a slow inference must not replace a newer key
+            if self._key is not None and frame_id <= self._key[0]:
+                return
+        h, w = mask.shape
+        ww = min(self.warp_width, w)
+        small = cv2.resize(mask, (ww, max(1, int(round(h * ww / w)))), interpolation=cv2.INTER_NEAREST)
+        with self._lock:
+            if self._key is None or frame_id > self._key[0]:
+                self._key = (int(frame_id), thumb, mask, small)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._key = None
+            self._last_motion = 0.0
+
+    def keyframe_due(self, frame_id: int) -> bool:
+        key = self._key
+        if key is None:
+            return True
+        return (frame_id - key[0] >= self.keyframe_interval
+                or 0 < self.motion_threshold < self._last_motion)
+
+    # ---------------- warping ----------------
+    def propagate(self, thumb: np.ndarray, size: Tuple[int, int]) -> Optional[Tuple[np.ndarray, int, float]]:
+        """
+        Key mask warped onto the frame whose thumbnail is given → (mask, key_id,
+        motion_px); None if there is no key yet or it comes from a frame of
+        another size. The mask keeps the key mask's resolution (model or frame
+        size); `size` is the frame's, for motion in frame pixels.
+        """
+        with self._lock:
+            key = self._key
+        if key is None:
+            return None
+        key_id, key_thumb, key_mask, key_small = key
+        h, w = size
+        if key_thumb.shape != thumb.shape:
+            return None
+        # flow from the current frame back to the key: cur(y, x) ≈ key(y + fy, x + fx)
+        flow = cv2.calcOpticalFlowFarneback(thumb, key_thumb, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+        th, tw = thumb.shape
+        # thumbnail → frame pixels per axis: a model-resolution mask (512×512 for
+        # a 16:9 frame) has different x and y scales, and so may the frame
+        motion = float(cv2.magnitude(flow[..., 0] * (w / float(tw)),
+                                     flow[..., 1] * (h / float(th))).mean())
+        self._last_motion = motion
+        if motion < 0.25:
+            return key_mask, key_id, motion
+        sh, sw = key_small.shape
+        flow_s = cv2.resize(flow, (sw, sh), interpolation=cv2.INTER_LINEAR)
+        gx, gy = self._grid_for(sh, sw)
+        map_x = cv2.scaleAdd(flow_s[..., 0], sw / float(tw), gx)
+        map_y = cv2.scaleAdd(flow_s[..., 1], sh / float(th), gy)
+        warped = cv2.remap(key_small, map_x, map_y, cv2.INTER_NEAREST,
+                           borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        if (sh, sw) != key_mask.shape:
+            mh, mw = key_mask.shape
+            warped = cv2.resize(warped, (mw, mh), interpolation=cv2.INTER_NEAREST)
+        return warped, key_id, motion
+
+    def _grid_for(self, h: int, w: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._grid is None or self._grid[0] != (h, w):
+            gx, gy = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+            self._grid = ((h, w), gx, gy)
+        return self._grid[1], self._grid[2]
+
+    # ---------------- bookkeeping ----------------
+    def record(self, frame_id: int, kind: str, key_id: int, motion: float = 0.0) -> None:
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.history.append((int(frame_id), kind, int(key_id), float(motion)))
+        if self._log_file is not None:
+            try:
+                self._log_file.write(f"{frame_id},{kind},{key_id},{motion:.2f}\n")
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        shown = self.counts["inferred"] + self.counts["propagated"]
+        return {**self.counts,
+                "propagated_ratio": (self.counts["propagated"] / shown) if shown else 0.0,
+                "key_id": self.key_id}
+
+    def close(self) -> None:
+        try:
+            if self._log_file is not None:
+                self._log_file.close()
+        except Exception:
+            pass
+        self._log_file = None
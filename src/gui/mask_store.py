@@ -0,0 +1,184 @@
+# mask_store.py — compact, seekable on-disk store for per-frame class-index masks
+#
+# One file:
+#   header   b"IOMASKS1"
+#   chunks   zlib-compressed (H,W) uint8 masks, back to back
+#   index    fixed-size records (frame, pts_ms, offset, length, height, width)
+#   meta     UTF-8 JSON (video, fps, backend, classes, …)
+#   footer   <index offset u64><record count u64><meta length u32> b"IOMASKE1"
+#
+# The writer streams chunks to the file and index records to a ".idx" scratch
+# file next to it, and appends the index on close(), so memory stays constant no
+# matter how long the video is. The reader memory-maps the index: seeking to a
+# frame or a timestamp is a binary search plus one read + inflate.
+from __future__ import annotations
+import json
+import os
+import struct
+import zlib
+from typing import Iterator, Optional
+
+import numpy as np
+
+MAGIC = b"IOMASKS1"
+END_MAGIC = b"IOMASKE1"
+_FOOTER = struct.Struct("<QQI8s")
+INDEX_DTYPE = np.dtype([("frame", "<i8"), ("pts_ms", "<f8"), ("offset", "<u8"),
+                        ("length", "<u4"), ("height", "<u2"), ("width", "<u2")])
+
+
+class MaskWriter:
+    """
+    w = MaskWriter("case.masks", meta={"video": ...})
+    w.write(frame_index, pts_ms, mask)   # frames in increasing order
+    w.close()                            # or use as a context manager
+
+    Masks are (H,W) uint8 class maps (0 = background), as produced by
+    InferenceEngine.infer_mask(). `level` is the zlib level; class maps are
+    mostly runs of one value, so level 1 already gets most of the size.
+    """
+
+    def __init__(self, path: str, meta: Optional[dict] = None, level: int = 1):
+        self.path = path
+        self.meta = dict(meta or {})
+        self.level = int(level)
+        self.count = 0
+        self.raw_bytes = 0
+        self._last = None
+        self._tmp = path + ".part"
+        self._f = open(self._tmp, "wb")
+        self._idx = open(path + ".idx", "w+b")
+        self._f.write(MAGIC)
+        self._rec = np.zeros(1, INDEX_DTYPE)
+
+    def write(self, frame: int, pts_ms: float, mask: np.ndarray) -> None:
+        h, w = mask.shape[:2]
+        buf = zlib.compress(np.ascontiguousarray(mask, dtype=np.uint8).tobytes(), self.level)
+        self.write_raw(frame, pts_ms, h, w, buf)
+
+    def write_raw(self, frame: int, pts_ms: float, height: int, width: int, buf: bytes) -> None:
+        """Append an already-compressed chunk (MaskReader.raw), e.g. when merging stores."""
+        if self._last is not None and frame <= self._last:
+            raise ValueError(f"frames must be increasing ({frame} after {self._last})")
+        r = self._rec[0]
+        r["frame"], r["pts_ms"], r["offset"], r["length"] = frame, pts_ms, self._f.tell(), len(buf)
+        r["height"], r["width"] = height, width
+        self._f.write(buf)
+        self._idx.write(self._rec.tobytes())
+        self._last = frame
+        self.count += 1
+        self.raw_bytes += height * width
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        index_offset = self._f.tell()
+        self._idx.seek(0)
+        while True:
+            block = self._idx.read(1 << 20)
+            if not block:
+                break
+            self._f.write(block)
+        meta = json.dumps(self.meta).encode("utf-8")
+        self._f.write(meta)
+        self._f.write(_FOOTER.pack(index_offset, self.count, len(meta), END_MAGIC))
+        self._f.close()
+        self._idx.close()
+        self._f = None
+        os.replace(self._tmp, self.path)   # a finished store is never half-written
+        try:
+            os.remove(self.path + ".idx")
+        except OSError:
+            pass
+
+    def __enter__(self) -> "MaskWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:   # leave the .part/.idx behind for inspection, don't publish a partial store
+            try:
+                self._f.close()
+                self._idx.close()
+            except Exception:
+                pass
+            self._f = None
+
+
+class MaskReader:
+    """
+    r = MaskReader("case.masks")
+    len(r), r.meta, r.frames, r.timestamps_ms
+    r[i]              # i-th stored mask
+    r.at_frame(n)     # mask of video frame n (None if not stored)
+    r.at_time(ms)     # last stored mask at or before ms
+    for frame, pts_ms, mask in r: ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        if self._f.read(len(MAGIC)) != MAGIC:
+            self._f.close()
+            raise ValueError(f"{path}: not a mask store")
+        self._f.seek(-_FOOTER.size, os.SEEK_END)
+        index_offset, count, meta_len, end = _FOOTER.unpack(self._f.read(_FOOTER.size))
+        if end != END_MAGIC:
+            self._f.close()
+            raise ValueError(f"{path}: incomplete mask store (no footer)")
+        self._index = (np.memmap(path, INDEX_DTYPE, "r", offset=index_offset, shape=(count,))
+                       if count else np.zeros(0, INDEX_DTYPE))
+        self._f.seek(index_offset + count * INDEX_DTYPE.itemsize)
+        self.meta = json.loads(self._f.read(meta_len).decode("utf-8") or "{}")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self._index["frame"]
+
+    @property
+    def timestamps_ms(self) -> np.ndarray:
+        return self._index["pts_ms"]
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        r = self._index[i]
+        buf = zlib.decompress(self.raw(i))
+        return np.frombuffer(buf, np.uint8).reshape(int(r["height"]), int(r["width"]))
+
+    def raw(self, i: int) -> bytes:
+        """The i-th chunk as stored (compressed)."""
+        r = self._index[i]
+        self._f.seek(int(r["offset"]))
+        return self._f.read(int(r["length"]))
+
+    def record(self, i: int) -> tuple[int, float, int, int]:
+        """(frame, pts_ms, height, width) of the i-th mask."""
+        r = self._index[i]
+        return int(r["frame"]), float(r["pts_ms"]), int(r["height"]), int(r["width"])
+
+    def at_frame(self, frame: int) -> Optional[np.ndarray]:
+        i = int(np.searchsorted(self.frames, frame))
+        if i < len(self) and self.frames[i] == frame:
+            return self[i]
+        return None
+
+    def at_time(self, ms: float) -> Optional[np.ndarray]:
+        i = int(np.searchsorted(self.timestamps_ms, ms, side="right")) - 1
+        return self[i] if i >= 0 else None
+
+    def __iter__(self) -> Iterator[tuple[int, float, np.ndarray]]:
+        for i in range(len(self)):
+            yield int(self._index[i]["frame"]), float(self._index[i]["pts_ms"]), self[i]
+
+    def close(self) -> None:
+        self._index = np.zeros(0, INDEX_DTYPE)   # drops the memmap
+        self._f.close()
+
+    def __enter__(self) -> "MaskReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,27 +1,65 @@
 # model_worker.py — robust model importer + latency-synced overlay (emits with frame_id)
+#                   sequential or 3-stage pipelined (preprocess / forward / postprocess),
+#                   eager PyTorch or ONNX Runtime backend (optionally INT8-quantized),
+#                   or keyframe inference + flow-propagated masks (MODEL_PROPAGATE=1);
+#                   static frames can reuse the last overlay (MODEL_SKIP_STATIC=1)
+#                   replayed files can be inferred in batches (MODEL_BATCH=B)
 from __future__ import annotations
 from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QImage
+import cv2
 import numpy as np
-import queue, time, os, importlib
-from typing import Optional, Tuple
+import queue, threading, time, os, importlib, hashlib
+from typing import Iterable, Optional, Tuple
 
-try:
-    import torch
-    TORCH_OK = True
-    torch.set_grad_enabled(False)
-    try:
-        torch.backends.cudnn.benchmark = True  # speed up convs on fixed-size inputs
-    except Exception:
-        pass
-except Exception:
-    torch = None  # type: ignore
-    TORCH_OK = False
+from .colors import OVERLAY_CLASSES, overlay_palette
+from .frames import CapturedFrame
+from .change_detector import ChangeDetector
+from .frame_quality import unusable
+from .inference_cache import InferenceCache
+from .mask_propagation import MaskPropagator
+from .preprocess import Preprocessor, resize_flag
+from .tracing import TRACE
+
+# torch / lightning are imported lazily by import_torch() — from the worker thread in
+# the GUI — so importing this module (and opening the window) stays fast.
+torch = None  # type: ignore
+pl = None  # type: ignore
+TORCH_OK = False
+_torch_lock = threading.Lock()
+_torch_tried = False
+
+
+def import_torch() -> bool:
+    """Import torch (and lightning, if installed) once; returns TORCH_OK."""
+    global torch, pl, TORCH_OK, _torch_tried
+    with _torch_lock:
+        if _torch_tried:
+            return TORCH_OK
+        _torch_tried = True
+        try:
+            import torch as _torch
+            torch = _torch
+            TORCH_OK = True
+            torch.set_grad_enabled(False)
+            try:
+                torch.backends.cudnn.benchmark = True  # speed up convs on fixed-size inputs
+            except Exception:
+                pass
+        except Exception:
+            TORCH_OK = False
+        try:
+            import lightning.pytorch as _pl  # type: ignore
+            pl = _pl
+        except Exception:
+            pl = None
+        return TORCH_OK
 
-try:
-    import lightning.pytorch as pl  # type: ignore
-except Exception:
-    pl = None  # type: ignore
+
+def _release(frame: object) -> None:
+    """Give a pooled frame back once the worker no longer needs its pixels."""
+    if isinstance(frame, CapturedFrame):
+        frame.release()
 
 
 def _import_first(names: list[str]):
@@ -34,7 +72,593 @@ def _import_first(names: list[str]):
     return None
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def cache_dir() -> str:
+    """On-disk cache for exported/compiled model artefacts (env MODEL_CACHE_DIR)."""
+    d = os.environ.get("MODEL_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "intraop_assist")
+    os.makedirs(d, exist_ok=True)
+    return d
+
+
+def checkpoint_key(paths: Iterable[Optional[str]], *extra: object) -> str:
+    """Content hash of the checkpoint files (+ export parameters) → cache file stem."""
+    h = hashlib.sha256()
+    for p in paths:
+        if not p or not os.path.exists(p):
+            continue
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    for e in extra:
+        h.update(repr(e).encode())
+    return h.hexdigest()[:20]
+
+
+def load_hac_model(ckpt_path: Optional[str], attn_ckpt: Optional[str], unet_ckpt: Optional[str],
+                   device: str, log=print, on_error=None):
+    """Import HACJointModule and load it from the checkpoints; None → use the dummy overlay."""
+    if not import_torch():
+        log("PyTorch not available. Using dummy overlay.")
+        return None
+    # Try multiple paths so GUI can live in src/gui and models in src/models or src/hac/models
+    hac_mod = _import_first([
+        "src.hac.models.hac_joint_module",
+        "src.models.hac_joint_module",
+        "hac_joint_module",
+        f"{__package__}.hac_joint_module" if __package__ else "hac_joint_module",
+    ])
+    if hac_mod is None:
+        log("Import HACJointModule failed. Using dummy overlay.")
+        return None
+
+    HACJointModule = getattr(hac_mod, "HACJointModule", None)
+    if HACJointModule is None:
+        log("HACJointModule symbol not found. Using dummy overlay.")
+        return None
+
+    # Load from checkpoint if given; otherwise expect attn/unet ckpts
+    if ckpt_path and os.path.exists(ckpt_path):
+        try:
+            if pl is not None and hasattr(HACJointModule, "load_from_checkpoint"):
+                kw = {"map_location": device}
+                if attn_ckpt: kw["attn_ckpt"] = attn_ckpt
+                if unet_ckpt: kw["unet_ckpt"] = unet_ckpt
+                model = HACJointModule.load_from_checkpoint(ckpt_path, **kw)
+            else:
+                model = HACJointModule.from_checkpoint(ckpt_path, device=device)  # type: ignore
+            model.eval().to(device)
+            log("Loaded HAC model from checkpoint.")
+            return model
+        except Exception as e:
+            log(f"HAC load_from_checkpoint failed: {e}")
+            if on_error is not None:
+                on_error(f"HAC load failed: {e}")
+
+    # If we get here, no full ckpt; try to construct from partial ckpts/configs if supported
+    if attn_ckpt or unet_ckpt:
+        try:
+            model = HACJointModule(attn_ckpt=attn_ckpt, unet_ckpt=unet_ckpt)
+            model.eval().to(device)
+            log("Constructed HAC from partial ckpts.")
+            return model
+        except Exception as e:
+            log(f"Partial HAC construction failed: {e}")
+
+    log("No model available — using dummy overlay.")
+    return None
+
+
+def prepare_input(frame_bgr: np.ndarray, input_size: tuple[int, int]) -> np.ndarray:
+    """
+    BGR frame → (1,3,H,W) float32 RGB in [0,1], like the PIL bicubic resize the
+    model was trained on (downscales use INTER_AREA, see preprocess.resize_flag;
+    on detailed 1080p frames the two differ by ~1.6 gray levels on average).
+    """
+    # cv2 reads the (pooled) frame in place — PIL would copy the full frame first;
+    # channels are swapped on the small resized image
+    img = cv2.resize(frame_bgr, input_size, interpolation=resize_flag("cubic", frame_bgr.shape[:2], input_size))
+    x = img[..., ::-1].astype(np.float32) / 255.0
+    return np.ascontiguousarray(np.transpose(x, (2, 0, 1))[None, ...])
+
+
+_PALETTE = overlay_palette()
+
+# pipelined mode: stands in for the logits of a frame that gets an empty overlay
+# (disabled, unusable, failed) — only the post stage emits, so order is kept
+_EMPTY = object()
+
+_ENGINE_OPTS = (
+    "backend", "ort_intra_threads", "ort_inter_threads", "ort_opt_level",
+    "quantized", "calib_video", "warmup_iters", "compile", "channels_last", "resize",
+    "mask_size",
+)
+
+
+def mask_qimage(mask: np.ndarray, palette: Optional[list] = None) -> QImage:
+    """
+    (H,W) uint8 class-index mask → Indexed8 QImage (owns its pixels, 1 byte/px).
+    The palette only makes the image self-describing; VideoCanvas applies its
+    own colour table at draw time.
+    """
+    h, w = mask.shape
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    qimg = QImage(mask.data, w, h, w, QImage.Format_Indexed8).copy()
+    qimg.setColorTable(palette if palette is not None else _PALETTE)
+    return qimg
+
+
+def empty_mask_qimage(size: Tuple[int, int], palette: Optional[list] = None) -> QImage:
+    """All-background Indexed8 overlay for frames that get no mask."""
+    h, w = size
+    qimg = QImage(w, h, QImage.Format_Indexed8)
+    qimg.setColorTable(palette if palette is not None else _PALETTE)
+    qimg.fill(0)
+    return qimg
+
+
+def _pick_logits(out):
+    """
+    HAC returns (attention, segmentation); plain models return the logits
+    tensor, ONNX Runtime a list of outputs ([logits] for a one-output graph).
+    """
+    if isinstance(out, (list, tuple)):
+        return out[1] if len(out) > 1 else out[0]
+    return out
+
+
+def logits_to_mask(logits) -> np.ndarray:
+    """
+    (1,C,H,W) / (1,1,H,W) logits → (H,W) uint8 class-index mask at model
+    resolution: argmax for heads with more than two classes, x1 ≥ x0 for two
+    (softmax(x)[1] ≥ 0.5), x ≥ 0 for one (sigmoid(x) ≥ 0.5). Decided on the
+    device; only the uint8 mask is copied back.
+    """
+    with torch.no_grad():  # type: ignore
+        if logits.ndim == 4 and logits.size(1) > 2:
+            cls = logits[0].argmax(dim=0)
+        elif logits.ndim == 4 and logits.size(1) == 2:
+            cls = logits[0, 1] >= logits[0, 0]
+        else:
+            cls = logits.reshape(logits.shape[-2:]) >= 0
+        return cls.to(torch.uint8).cpu().numpy()  # type: ignore
+
+
+# ---------------- inference backends ----------------
+class TorchBackend:
+    """
+    PyTorch forward pass (autocast on CUDA and CPU).
+
+    channels_last=True (env MODEL_CHANNELS_LAST=1) converts the weights to NHWC,
+    the layout the preprocessed input then has as well.
+
+    compile_mode (env MODEL_COMPILE):
+      - "none"    : eager module
+      - "trace"   : TorchScript trace, frozen and saved to the model cache keyed by
+                    checkpoint hash → later launches just torch.jit.load() it
+      - "compile" : torch.compile; Inductor's kernel cache is pointed at the model
+                    cache dir so recompiles on later launches are mostly cache hits
+    """
+    name = "torch"
+
+    def __init__(self, model, device: str, compile_mode: str = "none",
+                 input_size: tuple[int, int] = (512, 512), ckpts: Iterable[Optional[str]] = (), log=print,
+                 channels_last: bool = False):
+        if channels_last:
+            model = model.to(memory_format=torch.channels_last)  # matches Preprocessor's NHWC input
+        self.model = model
+        self.device = device
+        mode = (compile_mode or "none").lower()
+        try:
+            if mode == "trace":
+                self.model = self._traced(model, device, input_size, ckpts, log)
+                self.name = "torch-trace"
+            elif mode == "compile":
+                os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(cache_dir(), "inductor"))
+                self.model = torch.compile(model)
+                self.name = "torch-compile"
+            elif mode != "none":
+                log(f"Unknown compile mode '{mode}' — running eager.")
+        except Exception as e:
+            log(f"Model compile ({mode}) failed: {e} — running eager.")
+            self.model = model
+
+    @staticmethod
+    def _traced(model, device: str, input_size: tuple[int, int], ckpts, log):
+        w, h = input_size
+        key = checkpoint_key(ckpts, "trace", device, h, w, torch.__version__)
+        path = os.path.join(cache_dir(), f"hac_{key}.ts.pt")
+        if os.path.exists(path):
+            log(f"TorchScript: using cached graph {os.path.basename(path)}")
+            return torch.jit.load(path, map_location=device)
+        log("TorchScript: tracing model (first launch for this checkpoint) …")
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 3, h, w, device=device)))
+        tmp = path + ".tmp"
+        torch.jit.save(traced, tmp)
+        os.replace(tmp, path)
+        return traced
+
+    def forward(self, x):
+        # autocast to speed up on CUDA; grad mode/autocast are thread-local → set per call
+        autocast = torch.cuda.amp.autocast if (self.device == "cuda") else torch.cpu.amp.autocast  # type: ignore[attr-defined]
+        with torch.no_grad(), autocast():
+            return _pick_logits(self.model(x))
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime forward pass for CPU-only carts.
+
+    The torch model is exported once to <cache_dir>/<checkpoint hash>.onnx and
+    reused on later launches. Session threads and graph optimisation level come
+    from the constructor or env (ORT_INTRA_OP_THREADS, ORT_INTER_OP_THREADS,
+    ORT_GRAPH_OPT = disable|basic|extended|all). forward() returns a torch tensor
+    so postprocessing — and therefore the overlay — is identical to TorchBackend.
+
+    quantized=True runs the INT8 variant from quantize.ensure_int8(), calibrated
+    on `calib_video` the first time and cached afterwards.
+    """
+    name = "onnx"
+    OPSET = 17
+
+    def __init__(self, model, device: str, input_size: tuple[int, int], ckpts: Iterable[Optional[str]],
+                 intra_threads: Optional[int] = None, inter_threads: Optional[int] = None,
+                 opt_level: Optional[str] = None, log=print,
+                 quantized: bool = False, calib_video: Optional[str] = None, calib_frames: int = 64):
+        import onnxruntime as ort  # optional dependency, only needed for this backend
+        self.device = device
+        w, h = input_size
+        key = checkpoint_key(ckpts, "onnx", self.OPSET, h, w)
+        self.path = os.path.join(cache_dir(), f"hac_{key}.onnx")
+        if os.path.exists(self.path):
+            log(f"ONNX: using cached graph {os.path.basename(self.path)}")
+        else:
+            log("ONNX: exporting model (first launch for this checkpoint) …")
+            self.export(model, self.path, (h, w), self.OPSET)
+        if quantized:
+            try:
+                from .quantize import ensure_int8
+                self.path = ensure_int8(self.path, calib_video, input_size, calib_frames, log=log)
+                self.name = "onnx-int8"
+            except Exception as e:
+                log(f"INT8 unavailable ({e}) — running the FP32 graph.")
+
+        so = ort.SessionOptions()
+        intra = intra_threads if intra_threads is not None else _env_int("ORT_INTRA_OP_THREADS", 0)
+        inter = inter_threads if inter_threads is not None else _env_int("ORT_INTER_OP_THREADS", 0)
+        so.intra_op_num_threads = max(0, int(intra))   # 0 → ORT default (physical cores)
+        so.inter_op_num_threads = max(0, int(inter))
+        so.execution_mode = ort.ExecutionMode.ORT_PARALLEL if inter > 1 else ort.ExecutionMode.ORT_SEQUENTIAL
+        levels = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }
+        level = (opt_level or os.environ.get("ORT_GRAPH_OPT", "all")).lower()
+        so.graph_optimization_level = levels.get(level, levels["all"])
+
+        providers = ["CPUExecutionProvider"]
+        if device == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self._sess = ort.InferenceSession(self.path, so, providers=providers)
+        self._input = self._sess.get_inputs()[0].name
+        log(f"ONNX Runtime ready ({self.name}, {providers[0]}, intra={intra or 'auto'}, inter={inter or 'auto'}, opt={level})")
+
+    @staticmethod
+    def export(model, path: str, hw: tuple[int, int], opset: int) -> None:
+        import shutil, tempfile
+        dummy = torch.zeros(1, 3, *hw)
+        cpu_model = model.to("cpu").eval()
+        # export into a scratch dir (the exporter may add external-data files next to
+        # the graph), then move everything over — the .onnx last, so a cached graph
+        # is never half-written
+        out_dir = os.path.dirname(path)
+        tmp_dir = tempfile.mkdtemp(dir=out_dir)
+        try:
+            with torch.no_grad():
+                torch.onnx.export(
+                    cpu_model, dummy, os.path.join(tmp_dir, os.path.basename(path)), opset_version=opset,
+                    input_names=["input"], dynamic_axes={"input": {0: "batch"}},
+                )
+            tmp_path = os.path.join(tmp_dir, os.path.basename(path))
+            try:
+                # one self-contained file (graph + weights) is what the INT8 tooling expects
+                import onnx
+                m = onnx.load(tmp_path)
+                if m.ByteSize() < (2 << 30) - (1 << 20):
+                    for n in os.listdir(tmp_dir):
+                        os.remove(os.path.join(tmp_dir, n))
+                    onnx.save_model(m, tmp_path)
+            except Exception:
+                pass
+            names = sorted(os.listdir(tmp_dir), key=lambda n: n == os.path.basename(path))
+            for n in names:
+                os.replace(os.path.join(tmp_dir, n), os.path.join(out_dir, n))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def forward(self, x):
+        x_np = x.detach().cpu().numpy() if TORCH_OK and isinstance(x, torch.Tensor) else x
+        outs = self._sess.run(None, {self._input: np.ascontiguousarray(x_np, dtype=np.float32)})
+        return torch.from_numpy(_pick_logits(outs)).to(self.device)
+
+
+class InferenceEngine:
+    """
+    Model + backend + pre/post-processing, free of Qt so the same inference runs
+    in ModelWorker's thread, in a child process (process_worker.py) or a CLI.
+
+    load() does the heavy part (torch import, checkpoint, backend, warm-up);
+    without torch or a model it falls back to a cheap edge-magnitude "dummy".
+
+    backend="torch" | "onnx" (or env MODEL_BACKEND) picks the forward-pass
+    engine; the mask does not depend on it. quantized=True (env
+    MODEL_QUANTIZED=1) uses the cached INT8 ONNX graph, calibrating it on
+    calib_video (env MODEL_CALIB_VIDEO) the first time.
+
+    Frames are converted by a preprocess.Preprocessor into reused (pinned on
+    CUDA) input tensors; resize (env MODEL_RESIZE = cubic|linear|area) picks its
+    resize kernel, channels_last (env MODEL_CHANNELS_LAST) the memory format.
+
+    Masks come out at model resolution (mask_size="model", env MODEL_MASK_SIZE)
+    and are scaled by the renderer; mask_size="frame" returns frame-sized masks.
+
+    load() runs `warmup_iters` (env MODEL_WARMUP_ITERS) inferences on synthetic
+    input so cudnn autotuning, lazy allocations and first-call dispatch are paid
+    before the surgeon sees video. compile="trace" | "compile" (env
+    MODEL_COMPILE) additionally caches a compiled graph.
+    """
+
+    def __init__(
+        self,
+        ckpt_path: Optional[str] = None,
+        device: Optional[str] = None,
+        input_size: tuple[int, int] = (512, 512),
+        attn_ckpt: Optional[str] = None,
+        unet_ckpt: Optional[str] = None,
+        backend: Optional[str] = None,
+        ort_intra_threads: Optional[int] = None,
+        ort_inter_threads: Optional[int] = None,
+        ort_opt_level: Optional[str] = None,
+        quantized: Optional[bool] = None,
+        calib_video: Optional[str] = None,
+        warmup_iters: Optional[int] = None,
+        compile: Optional[str] = None,
+        channels_last: Optional[bool] = None,
+        resize: Optional[str] = None,
+        mask_size: Optional[str] = None,
+        log=print,
+        on_error=None,
+    ):
+        # MODEL_PATH / ATTN_PATH / UNET_PATH are the names used in .env
+        self.ckpt_path = ckpt_path or os.environ.get("MODEL_CKPT") or os.environ.get("MODEL_PATH", "")
+        self.attn_ckpt = attn_ckpt or os.environ.get("ATTN_CKPT") or os.environ.get("ATTN_PATH")
+        self.unet_ckpt = unet_ckpt or os.environ.get("UNET_CKPT") or os.environ.get("UNET_PATH")
+        self.backend_name = (backend or os.environ.get("MODEL_BACKEND", "torch")).lower()
+        self._ort_opts = (ort_intra_threads, ort_inter_threads, ort_opt_level)
+        if quantized is None:
+            quantized = os.environ.get("MODEL_QUANTIZED", "0").lower() in ("1", "true", "yes")
+        self.quantized = bool(quantized)
+        self.calib_video = calib_video or os.environ.get("MODEL_CALIB_VIDEO")
+        if self.quantized:
+            self.backend_name = "onnx"  # INT8 graphs are run by ONNX Runtime
+        self.warmup_iters = warmup_iters if warmup_iters is not None else _env_int("MODEL_WARMUP_ITERS", 3)
+        self.compile_mode = (compile or os.environ.get("MODEL_COMPILE", "none")).lower()
+        if channels_last is None:
+            channels_last = os.environ.get("MODEL_CHANNELS_LAST", "0").lower() in ("1", "true", "yes")
+        self.channels_last = bool(channels_last) and self.backend_name == "torch"
+        self.resize = (resize or os.environ.get("MODEL_RESIZE", "cubic")).lower()
+        self.mask_size = (mask_size or os.environ.get("MODEL_MASK_SIZE", "model")).lower()
+        self._pre: Optional[Preprocessor] = None   # created in load() for the real model
+        self.device = device  # None → resolved in load() once torch is imported
+        self.input_size = input_size
+        self._log = log
+        self._on_error = on_error or (lambda msg: None)
+        self._model = None
+        self._backend: TorchBackend | OnnxBackend | None = None
+        self._use_dummy = False  # set in load() if torch or the model is unavailable
+
+    @property
+    def ckpts(self) -> tuple:
+        return (self.ckpt_path, self.attn_ckpt, self.unet_ckpt)
+
+    @property
+    def backend(self) -> str:
+        return self._backend.name if self._backend is not None else "dummy"
+
+    # ---------------- model loading ----------------
+    def load(self) -> None:
+        t0 = time.perf_counter()
+        if not import_torch():
+            self._use_dummy = True  # if no torch, force dummy
+        elif self.device is None:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = self.device or "cpu"
+        self._log(f"ModelWorker starting on device={self.device} (imports {time.perf_counter() - t0:.1f}s) …")
+        try:
+            if not self._use_dummy:
+                self._model = load_hac_model(*self.ckpts, self.device, log=self._log, on_error=self._on_error)
+                if self._model is None:
+                    self._use_dummy = True
+                else:
+                    self._backend = self._make_backend()
+                    self._pre = Preprocessor(
+                        torch, self.input_size, self.device, interpolation=self.resize,
+                        channels_last=self.channels_last and self._backend.name.startswith("torch"),
+                    )
+        except Exception as e:
+            self._use_dummy = True
+            self._on_error(f"Model load failed: {e}")
+
+        if not self.dummy and self.warmup_iters > 0:
+            try:
+                self.warmup(self.warmup_iters)
+            except Exception as e:
+                self._log(f"Warm-up failed: {e}")
+
+    def _make_backend(self):
+        if self.backend_name == "onnx":
+            try:
+                intra, inter, level = self._ort_opts
+                return OnnxBackend(
+                    self._model, self.device, self.input_size, self.ckpts,
+                    intra_threads=intra, inter_threads=inter, opt_level=level, log=self._log,
+                    quantized=self.quantized, calib_video=self.calib_video,
+                )
+            except Exception as e:
+                self._log(f"ONNX backend unavailable ({e}) — falling back to PyTorch.")
+                self._on_error(f"ONNX backend failed: {e}")
+                self._model.to(self.device)  # export moved it to CPU
+        elif self.backend_name != "torch":
+            self._log(f"Unknown backend '{self.backend_name}' — using PyTorch.")
+        return TorchBackend(
+            self._model, self.device, self.compile_mode, self.input_size, self.ckpts, log=self._log,
+            channels_last=self.channels_last,
+        )
+
+    def warmup(self, iters: int) -> None:
+        """Run full inferences on synthetic input; report first vs steady-state latency."""
+        w, h = self.input_size
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        times = []
+        t_start = time.perf_counter()
+        for _ in range(iters):
+            t0 = time.perf_counter()
+            self.infer_mask(frame)
+            if TORCH_OK and self.device == "cuda":
+                torch.cuda.synchronize()
+            times.append((time.perf_counter() - t0) * 1000.0)
+        total = time.perf_counter() - t_start
+        steady = np.median(times[1:]) if len(times) > 1 else times[0]
+        self._log(
+            f"Warm-up ({self.backend}): {iters} runs in {total:.2f}s — "
+            f"first {times[0]:.0f} ms, steady {steady:.0f} ms"
+        )
+
+    # ---------------- inference ----------------
+    @property
+    def dummy(self) -> bool:
+        return self._use_dummy or self._backend is None or not TORCH_OK
+
+    def infer_mask(self, frame: np.ndarray, stamps: Optional[list] = None) -> np.ndarray:
+        """
+        All stages back to back: BGR frame → (H,W) uint8 mask. If a list is
+        passed as `stamps`, perf_counter() at the start of each stage and at the
+        end is appended to it (see tracing.Tracer.mark_stages).
+        """
+        if stamps is None:
+            return self.postprocess(self.forward(self.preprocess(frame)), frame.shape[:2])
+        stamps.append(time.perf_counter())
+        x = self.preprocess(frame)
+        stamps.append(time.perf_counter())
+        logits = self.forward(x)
+        stamps.append(time.perf_counter())
+        mask = self.postprocess(logits, frame.shape[:2])
+        stamps.append(time.perf_counter())
+        return mask
+
+    def infer_masks(self, frames: list, stamps: Optional[list] = None) -> list:
+        """
+        One forward pass over a batch of BGR frames → one uint8 mask per frame.
+        `stamps` as in infer_mask(), for the batch as a whole.
+        """
+        if self.dummy or len(frames) == 1:
+            t0 = time.perf_counter()
+            masks = [self.infer_mask(f) for f in frames]
+            if stamps is not None:
+                t1 = time.perf_counter()
+                stamps.extend((t0, t0, t1, t1))   # not split into stages: all "forward"
+            return masks
+        if stamps is not None:
+            stamps.append(time.perf_counter())
+        x = self._pre.batch(frames)  # type: ignore
+        if stamps is not None:
+            stamps.append(time.perf_counter())
+        logits = self.forward(x)
+        if stamps is not None:
+            stamps.append(time.perf_counter())
+        masks = [self.postprocess(logits[i:i + 1], f.shape[:2]) for i, f in enumerate(frames)]
+        if stamps is not None:
+            stamps.append(time.perf_counter())
+        return masks
+
+    def preprocess(self, frame: np.ndarray):
+        """BGR frame → model input (float tensor on device, or gray array for the dummy)."""
+        if self.dummy:
+            return np.dot(frame[..., :3].astype(np.float32), [0.114, 0.587, 0.299])
+        return self._pre(frame)  # type: ignore
+
+    def stats(self) -> dict:
+        """Rolling preprocessing time per frame (real model only)."""
+        return self._pre.stats() if self._pre is not None else {}
+
+    def forward(self, x):
+        if self.dummy:
+            # Fast edge magnitude
+            gy, gx = np.gradient(x)
+            mag = np.sqrt(gx * gx + gy * gy)
+            return mag / (mag.max() + 1e-6)
+        return self._backend.forward(x)
+
+    def postprocess(self, logits, size: Tuple[int, int]) -> np.ndarray:
+        """
+        Model output → (H,W) uint8 class-index mask: 0/1 for one- or two-channel
+        heads, argmax over the classes for wider softmax heads.
+
+        The decision is taken at model resolution, on the device, on the logits
+        themselves (sigmoid(x) ≥ 0.5 ⇔ x ≥ 0; softmax(x)[1] ≥ 0.5 ⇔ x1 ≥ x0), so
+        no probability map is built and only the uint8 mask leaves the device.
+        With mask_size="model" it stays at model resolution and VideoCanvas
+        scales it into the frame rectangle when drawing; "frame" scales it
+        (nearest) to `size` here.
+        """
+        if self.dummy:
+            return (logits > 0.25).astype(np.uint8)
+        mask = logits_to_mask(logits)
+        if self.mask_size == "frame" and mask.shape != tuple(size):
+            h, w = size
+            mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)
+        return mask
+
+
 class ModelWorker(QThread):
+    """
+    Runs an InferenceEngine (HAC model or dummy edge overlay) on frames fed via
+    feed_frame() and emits class-index overlays (Indexed8 QImage, 1 byte/px).
+
+    pipelined=True (or env MODEL_PIPELINED=1) splits inference into three stages
+    on their own threads: preprocessing of frame N+1 and postprocessing
+    of frame N-1 overlap with the forward pass of frame N. Overlays are still
+    emitted in order through overlay_ready(QImage, frame_id); callers can keep up
+    to `max_inflight` frames in the worker.
+
+    batch_size=B (env MODEL_BATCH) > 1 allows a batched mode for replayed files,
+    where throughput matters more than latency: once set_batching(True), the
+    worker collects up to B frames (waiting at most batch_wait_ms, env
+    MODEL_BATCH_WAIT_MS, after the first), runs one forward pass on the stacked
+    batch and emits every overlay with its own frame_id, in order.
+
+    skip_unusable=True (default, env MODEL_SKIP_UNUSABLE=0 to disable) answers
+    CapturedFrames whose capture-thread quality score says black or completely
+    blurred with an empty overlay instead of running the model on them.
+
+    result_cache=True (default, env MODEL_RESULT_CACHE) keeps the masks of
+    file frames in an InferenceCache (budget MODEL_RESULT_CACHE_MB, default 64;
+    MODEL_RESULT_CACHE_PERSIST=1 stores them under cache_dir()/results): once
+    set_caching(True), a looping clip is inferred on its first pass only. Used
+    by the sequential and batched modes.
+
+    Model options (backend, quantized, compile, warmup_iters, …) are passed
+    through to InferenceEngine.
+    """
     started_ok = Signal()
     started = Signal()
     overlay_ready = Signal(QImage, int)  # (overlay_qimage, frame_id)
@@ -46,66 +670,201 @@ class ModelWorker(QThread):
         ckpt_path: Optional[str] = None,
         device: Optional[str] = None,
         input_size: tuple[int, int] = (512, 512),
-        color_rgba: tuple[int, int, int, int] = (0, 140, 255, 180),
+        color_rgba: Optional[tuple[int, int, int, int]] = None,
         target_fps: Optional[float] = None,   # optional pacing, but UI is event-driven
         max_queue: int = 1,
         attn_ckpt: Optional[str] = None,
         unet_ckpt: Optional[str] = None,
-        **_: object,
+        pipelined: Optional[bool] = None,
+        propagate: Optional[bool] = None,
+        keyframe_interval: Optional[int] = None,
+        motion_threshold: Optional[float] = None,
+        skip_static: Optional[bool] = None,
+        skip_unusable: Optional[bool] = None,
+        result_cache: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+        batch_wait_ms: Optional[float] = None,
+        **engine_opts: object,
     ):
         super().__init__()
         self.daemon = True
-        self.ckpt_path = ckpt_path or os.environ.get("MODEL_CKPT", "")
-        self.attn_ckpt = attn_ckpt or os.environ.get("ATTN_CKPT")
-        self.unet_ckpt = unet_ckpt or os.environ.get("UNET_CKPT")
-        self.device = device or ("cuda" if TORCH_OK and torch.cuda.is_available() else "cpu")
+        self.engine = InferenceEngine(
+            ckpt_path, device, input_size, attn_ckpt=attn_ckpt, unet_ckpt=unet_ckpt,
+            log=self._log, on_error=self.error.emit,
+            **{k: v for k, v in engine_opts.items() if k in _ENGINE_OPTS},
+        )
         self.input_size = input_size
-        self.color_rgba = color_rgba
+        # class 1 colour override; the canvas may recolour at draw time anyway
+        self.color_table = overlay_palette(
+            OVERLAY_CLASSES[:1] + [color_rgba] + OVERLAY_CLASSES[2:] if color_rgba else None)
         self.target_delay = (1.0 / float(target_fps)) if (target_fps and target_fps > 0) else None
+        if pipelined is None:
+            pipelined = os.environ.get("MODEL_PIPELINED", "0").lower() in ("1", "true", "yes")
+        self.pipelined = bool(pipelined)
+        # frames that may be in the worker at once: one per stage when pipelined
+        self.max_inflight = 3 if self.pipelined else 1
+
+        # propagation mode: model on keyframes only, flow-warped masks in between
+        if propagate is None:
+            propagate = os.environ.get("MODEL_PROPAGATE", "0").lower() in ("1", "true", "yes")
+        self.propagator: Optional[MaskPropagator] = None
+        if propagate:
+            self.propagator = MaskPropagator(
+                keyframe_interval=(keyframe_interval if keyframe_interval is not None
+                                   else _env_int("MODEL_KEYFRAME_INTERVAL", 5)),
+                motion_threshold=(motion_threshold if motion_threshold is not None
+                                  else float(os.environ.get("MODEL_KEYFRAME_MOTION", 12.0))),
+                flow_width=_env_int("MODEL_FLOW_WIDTH", 160),
+                log_path=os.environ.get("MODEL_PROPAGATION_LOG") or None,
+            )
+            # warping takes a few ms, so the window can hand over every frame
+            self.max_inflight = 4
+            max_queue = max(int(max_queue), self.max_inflight)
+
+        # static-scene skipping: reuse the last overlay while the view does not change
+        if skip_static is None:
+            skip_static = os.environ.get("MODEL_SKIP_STATIC", "0").lower() in ("1", "true", "yes")
+        self.change_detector: Optional[ChangeDetector] = None
+        if skip_static:
+            self.change_detector = ChangeDetector(
+                mean_threshold=float(os.environ.get("MODEL_STATIC_THRESHOLD", 2.0)),
+                max_skip=_env_int("MODEL_STATIC_MAX_SKIP", 15),
+            )
+        # frames the capture thread scored as black / completely blurred get an
+        # empty overlay instead of a forward pass
+        if skip_unusable is None:
+            skip_unusable = os.environ.get("MODEL_SKIP_UNUSABLE", "1").lower() in ("1", "true", "yes")
+        self.skip_unusable = bool(skip_unusable)
+        self.unusable_skipped = 0
+        # masks of frames seen before (looping files); switched on per source with set_caching
+        if result_cache is None:
+            result_cache = os.environ.get("MODEL_RESULT_CACHE", "1").lower() in ("1", "true", "yes")
+        self.result_cache: Optional[InferenceCache] = None
+        if result_cache:
+            persist = os.environ.get("MODEL_RESULT_CACHE_PERSIST", "0").lower() in ("1", "true", "yes")
+            self.result_cache = InferenceCache(
+                budget_mb=float(os.environ.get("MODEL_RESULT_CACHE_MB", 64.0)),
+                persist_dir=os.path.join(cache_dir(), "results") if persist else None,
+            )
+        self._caching = False
+        # batched mode (sequential path only; switched on per source with set_batching)
+        self.batch_size = max(1, int(batch_size or _env_int("MODEL_BATCH", 1)))
+        if self.pipelined or self.propagator is not None:
+            self.batch_size = 1
+        if batch_wait_ms is None:
+            batch_wait_ms = float(os.environ.get("MODEL_BATCH_WAIT_MS", 50.0))
+        self.batch_wait = max(0.0, float(batch_wait_ms)) / 1000.0
+        self._batching = False
+        max_queue = max(int(max_queue), self.batch_size)
+
+        self._last_overlay: QImage | None = None
+        self._last_report = time.perf_counter()
+        self._reported: Optional[dict] = None
 
         import queue as _q
-        # Queue holds tuples: (frame_rgb_np, frame_id)
+        # Queue holds tuples: (CapturedFrame | frame_bgr_np, frame_id)
         self._q: "_q.Queue[Tuple[np.ndarray | None, Optional[int]]]" = _q.Queue(maxsize=max(1, int(max_queue)))
         self._running = False
         self._enabled = True
-        self._model = None
-        self._use_dummy = not TORCH_OK  # if no torch, force dummy
 
     # ---------------- public API ----------------
-    def feed_frame(self, rgb_frame: np.ndarray, frame_id: int) -> None:
-        if not isinstance(rgb_frame, np.ndarray) or rgb_frame.ndim != 3:
+    def feed_frame(self, frame: "CapturedFrame | np.ndarray", frame_id: int) -> None:
+        """
+        Queue a frame for inference. A CapturedFrame is retained until the worker
+        is done with it (its pooled buffer is read in place, never copied); a bare
+        ndarray must be (H,W,3) uint8 BGR.
+        """
+        if isinstance(frame, CapturedFrame):
+            frame.retain()
+        elif not isinstance(frame, np.ndarray) or frame.ndim != 3:
             return
         try:
             if self._q.full():
-                _ = self._q.get_nowait()
-            self._q.put_nowait((rgb_frame, frame_id))
+                _release(self._q.get_nowait()[0])
+            self._q.put_nowait((frame, frame_id))
         except Exception:
-            pass
+            _release(frame)
 
     # Backward-compat (signature kept but frame_id missing → ignored)
-    def enqueue_frame(self, rgb_frame: np.ndarray) -> None:
+    def enqueue_frame(self, bgr_frame: np.ndarray) -> None:
         try:
-            self.feed_frame(rgb_frame, -1)
+            self.feed_frame(bgr_frame, -1)
         except Exception:
             pass
 
     def set_enabled(self, on: bool) -> None:
         self._enabled = bool(on)
 
+    def set_batching(self, on: bool) -> None:
+        """Batch up to batch_size frames per forward pass (replayed files), or go back to one at a time."""
+        self._batching = bool(on) and self.batch_size > 1
+        if self.propagator is None and not self.pipelined:
+            self.max_inflight = self.batch_size if self._batching else 1
+
+    def set_caching(self, on: bool) -> None:
+        """Look frames up in / add them to the result cache (recorded files), or stop doing so."""
+        self._caching = bool(on) and self.result_cache is not None
+
+    def stats(self) -> dict:
+        """
+        Skip counters (static-scene mode, unusable frames), result cache counters,
+        inferred/propagated counts (propagation mode) and the rolling
+        preprocessing time per frame.
+        """
+        st: dict = {}
+        if self.change_detector is not None:
+            st.update(self.change_detector.stats())
+        if self.skip_unusable:
+            st["unusable"] = self.unusable_skipped
+        if self.result_cache is not None:
+            st["result_cache"] = self.result_cache.stats()
+        if self.propagator is not None:
+            st["propagation"] = self.propagator.stats()
+        st.update(self.engine.stats())
+        return st
+
     # ---------------- thread ----------------
     def run(self):
         self._running = True
-        self._log(f"ModelWorker starting on device={self.device} …")
-        try:
-            if not self._use_dummy:
-                self._load_model()
-        except Exception as e:
-            self._use_dummy = True
-            self.error.emit(f"Model load failed: {e}")
+        # heavy imports happen here, on the worker thread, while the UI already shows video
+        self.engine.load()
+        cache = self.result_cache
+        if cache is not None and cache.persist_dir:
+            e = self.engine
+            cache.model_key = checkpoint_key(e.ckpts, e.backend, e.input_size, e.resize, e.mask_size)
 
         self.started_ok.emit()
         self.started.emit()
 
+        if self.propagator is not None:
+            p = self.propagator
+            motion = f" or > {p.motion_threshold:.0f}px motion" if p.motion_threshold > 0 else ""
+            self._log(f"ModelWorker: propagation mode (keyframe every {p.keyframe_interval} frames{motion})")
+            self._run_propagation()
+        elif self.pipelined:
+            self._log("ModelWorker: pipelined mode (pre / forward / post threads)")
+            self._run_pipelined()
+        else:
+            if self.batch_size > 1:
+                self._log(f"ModelWorker: batches of up to {self.batch_size} frames for video files "
+                          f"(wait ≤ {self.batch_wait * 1000:.0f} ms)")
+            self._run_sequential()
+
+        while not self._q.empty():
+            try:
+                _release(self._q.get_nowait()[0])
+            except Exception:
+                break
+        if cache is not None and cache.persist_dir:
+            try:
+                n = cache.save()
+                if n:
+                    self._log(f"ModelWorker: {n} cached masks saved to {cache.persist_dir}")
+            except Exception as e:
+                self._log(f"ModelWorker: result cache not saved: {e}")
+        self._log("ModelWorker stopped.")
+
+    def _run_sequential(self):
         last_emit = 0.0
         while self._running:
             try:
@@ -114,14 +873,35 @@ class ModelWorker(QThread):
                 continue
             if frame is None or fid is None:
                 continue
+            if self._batching:
+                self._run_batch(self._collect_batch((frame, fid)))
+                self._maybe_report()
+                continue
 
+            captured = frame
+            if isinstance(frame, CapturedFrame):
+                frame = frame.bgr
             try:
                 if not self._enabled:
                     # Emit transparent overlay of same size so UI can "pair" and still draw raw frame if desired
-                    h, w, _ = frame.shape
-                    empty = QImage(w, h, QImage.Format_RGBA8888)
-                    empty.fill(0)
-                    self.overlay_ready.emit(empty, int(fid))
+                    self._forget_overlay()
+                    self._emit_empty(int(fid), frame.shape[:2])
+                    continue
+
+                if self._skip_unusable(captured):
+                    self._emit_empty(int(fid), frame.shape[:2])
+                    continue
+
+                key = self._cache_key(captured)
+                mask = self.result_cache.get(key) if key is not None else None
+                if mask is not None:
+                    qimg = self._mask_image(mask)
+                    self._last_overlay = qimg
+                    self.overlay_ready.emit(qimg, int(fid))
+                    continue
+
+                if self._reuse_overlay(frame):
+                    self.overlay_ready.emit(self._last_overlay, int(fid))
                     continue
 
                 if self.target_delay is not None:
@@ -130,14 +910,373 @@ class ModelWorker(QThread):
                     if wait > 0:
                         time.sleep(wait)
 
-                qimg = self._infer_overlay(frame)
+                mask = self._traced_infer(frame, int(fid))
+                if key is not None:
+                    self.result_cache.put(key, mask)
+                qimg = self._mask_image(mask)
+                self._last_overlay = qimg
                 self.overlay_ready.emit(qimg, int(fid))
                 last_emit = time.time()
             except Exception as e:
+                self._forget_overlay()
                 self.error.emit(f"Inference error: {e}")
                 self._log(f"Inference error: {e}")
+            finally:
+                _release(captured)
+            self._maybe_report()
 
-        self._log("ModelWorker stopped.")
+    # ---------------- batched mode ----------------
+    def _collect_batch(self, first: tuple) -> list:
+        """`first` plus whatever arrives within batch_wait, up to batch_size items."""
+        items = [first]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(items) < self.batch_size and self._running:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] is None or item[1] is None:
+                break   # stop() sentinel
+            items.append(item)
+        return items
+
+    def _run_batch(self, items: list) -> None:
+        frames = [f.bgr if isinstance(f, CapturedFrame) else f for f, _ in items]
+        fids = [int(fid) for _, fid in items]
+        try:
+            if not self._enabled:
+                self._forget_overlay()
+                for frame, fid in zip(frames, fids):
+                    self._emit_empty(fid, frame.shape[:2])
+                return
+            skip = {i for i, (f, _) in enumerate(items) if self._skip_unusable(f)}
+            keys = [None if i in skip else self._cache_key(f) for i, (f, _) in enumerate(items)]
+            cached = {i: m for i, k in enumerate(keys)
+                      if k is not None and (m := self.result_cache.get(k)) is not None}
+            # static frames reuse the overlay of the last inferred frame before them
+            infer = [i for i, frame in enumerate(frames)
+                     if i not in skip and i not in cached and not self._reuse_overlay(frame)]
+            masks: list = []
+            if infer:
+                stamps: list = []
+                masks = self.engine.infer_masks([frames[i] for i in infer], stamps)
+                for i in infer:
+                    TRACE.mark_stages(fids[i], stamps)
+            for i, m in zip(infer, masks):
+                if keys[i] is not None:
+                    self.result_cache.put(keys[i], m)
+            cached.update(zip(infer, masks))
+            images = {i: self._mask_image(m) for i, m in cached.items()}
+            for i, fid in enumerate(fids):
+                if i in images:
+                    self._last_overlay = images[i]
+                if i in skip or self._last_overlay is None:
+                    self._emit_empty(fid, frames[i].shape[:2])
+                else:
+                    self.overlay_ready.emit(self._last_overlay, fid)
+        except Exception as e:
+            self._forget_overlay()
+            self.error.emit(f"Inference error: {e}")
+            self._log(f"Inference error: {e}")
+            for frame, fid in zip(frames, fids):
+                self._emit_empty(fid, frame.shape[:2])
+        finally:
+            for f, _ in items:
+                _release(f)
+
+    # ---------------- pipelined mode ----------------
+    def _run_pipelined(self):
+        """
+        preprocess (N+1) → forward (N, this thread) → postprocess (N-1).
+        Stages are linked by 1-slot queues so at most one frame waits between
+        them; cv2/numpy and torch kernels release the GIL, so on CPU the stages
+        really overlap. Every frame passes all three stages (static ones as
+        None, dropped ones as _EMPTY) and only the post stage emits, so
+        overlays leave in frame order.
+        """
+        self._fwd_q: "queue.Queue" = queue.Queue(maxsize=1)
+        self._post_q: "queue.Queue" = queue.Queue(maxsize=1)
+        pre = threading.Thread(target=self._pre_stage, name="ModelWorker-pre", daemon=True)
+        post = threading.Thread(target=self._post_stage, name="ModelWorker-post", daemon=True)
+        pre.start()
+        post.start()
+
+        last_emit = 0.0
+        while self._running:
+            try:
+                item = self._fwd_q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            fid, size, x = item
+            if x is None or x is _EMPTY:
+                # static / dropped frame: nothing to run, the post stage answers it in order
+                self._put(self._post_q, item)
+                continue
+            if self.target_delay is not None:
+                wait = self.target_delay - (time.time() - last_emit)
+                if wait > 0:
+                    time.sleep(wait)
+            try:
+                TRACE.mark(fid, "fwd_start")
+                logits = self.engine.forward(x)
+                TRACE.mark(fid, "fwd_end")
+            except Exception as e:
+                self._stage_error("forward", e)
+                self._put(self._post_q, (fid, size, _EMPTY))
+                continue
+            last_emit = time.time()
+            self._put(self._post_q, (fid, size, logits))
+
+        pre.join(1.0)
+        post.join(1.0)
+
+    def _pre_stage(self):
+        while self._running:
+            try:
+                frame, fid = self._q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            if frame is None or fid is None:
+                continue
+            captured = frame
+            if isinstance(frame, CapturedFrame):
+                frame = frame.bgr
+            size = frame.shape[:2]
+            try:
+                if not self._enabled or self._skip_unusable(captured, forget=False):
+                    # the post stage drops the last overlay; the detector belongs to this thread
+                    if self.change_detector is not None:
+                        self.change_detector.reset()
+                    x = _EMPTY
+                elif self._reuse_overlay(frame):
+                    x = None
+                else:
+                    TRACE.mark(int(fid), "pre_start")
+                    x = self.engine.preprocess(frame)
+                    TRACE.mark(int(fid), "pre_end")
+            except Exception as e:
+                self._stage_error("preprocess", e)
+                x = _EMPTY
+            finally:
+                # the resized input no longer references the capture buffer → recycle it now
+                _release(captured)
+            self._put(self._fwd_q, (int(fid), size, x))
+
+    def _post_stage(self):
+        while self._running:
+            try:
+                fid, size, logits = self._post_q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            if logits is _EMPTY:
+                self._last_overlay = None
+                self._emit_empty(fid, size)
+                self._maybe_report()
+                continue
+            if logits is None:
+                last = self._last_overlay
+                if last is not None:
+                    self.overlay_ready.emit(last, fid)
+                else:
+                    self._emit_empty(fid, size)
+                self._maybe_report()
+                continue
+            try:
+                TRACE.mark(fid, "post_start")
+                qimg = self._mask_image(self.engine.postprocess(logits, size))
+                TRACE.mark(fid, "post_end")
+            except Exception as e:
+                self._stage_error("postprocess", e)
+                self._last_overlay = None   # the pre stage then resets its detector itself
+                self._emit_empty(fid, size)
+                continue
+            self._last_overlay = qimg
+            self.overlay_ready.emit(qimg, fid)
+            self._maybe_report()
+
+    # ---------------- propagation mode ----------------
+    def _run_propagation(self):
+        """
+        Every frame gets an overlay at camera rate: the key mask warped onto it.
+        When a keyframe is due and the model is idle, the frame also goes to the
+        keyframe thread; its mask becomes the new key once inference finishes.
+        Only the very first frame (or one with a new resolution) waits for the model.
+        """
+        prop = self.propagator
+        self._key_q: "queue.Queue" = queue.Queue(maxsize=1)
+        self._key_busy = False
+        keyer = threading.Thread(target=self._key_stage, name="ModelWorker-key", daemon=True)
+        keyer.start()
+
+        while self._running:
+            try:
+                frame, fid = self._q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            if frame is None or fid is None:
+                continue
+            captured = frame
+            if isinstance(frame, CapturedFrame):
+                frame = frame.bgr
+            fid = int(fid)
+            size = frame.shape[:2]
+            try:
+                if not self._enabled:
+                    prop.reset()
+                    self._forget_overlay()
+                    self._emit_empty(fid, size)
+                    continue
+                if self._skip_unusable(captured):
+                    prop.reset()   # nothing to warp from / onto: the next usable frame is a keyframe
+                    self._emit_empty(fid, size)
+                    continue
+                if fid < prop.key_id:
+                    prop.reset()  # ids went backwards → new video source
+                    self._forget_overlay()
+                thumb = prop.thumbnail(frame)
+                warped = prop.propagate(thumb, size)
+                if warped is None:
+                    mask = self._traced_infer(frame, fid)
+                    prop.set_keyframe(fid, thumb, mask)
+                    prop.record(fid, "inferred", fid)
+                else:
+                    mask, key_id, motion = warped
+                    prop.record(fid, "propagated", key_id, motion)
+                    if (not self._key_busy and prop.keyframe_due(fid)
+                            and not (self.change_detector is not None and self.change_detector.is_static(frame))):
+                        self._key_busy = True
+                        if isinstance(captured, CapturedFrame):
+                            captured.retain()
+                        try:
+                            self._key_q.put_nowait((captured, fid, thumb))
+                        except queue.Full:
+                            _release(captured)
+                            self._key_busy = False
+                self.overlay_ready.emit(self._mask_image(mask), fid)
+            except Exception as e:
+                self._stage_error("propagation", e)
+                self._emit_empty(fid, size)
+            finally:
+                _release(captured)
+            self._maybe_report()
+
+        keyer.join(1.0)
+        while not self._key_q.empty():
+            try:
+                _release(self._key_q.get_nowait()[0])
+            except Exception:
+                break
+        prop.close()
+
+    def _key_stage(self):
+        while self._running:
+            try:
+                frame, fid, thumb = self._key_q.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            try:
+                bgr = frame.bgr if isinstance(frame, CapturedFrame) else frame
+                mask = self._traced_infer(bgr, fid)
+                self.propagator.set_keyframe(fid, thumb, mask)
+                self.propagator.record(fid, "keyframe", fid)
+            except Exception as e:
+                self._stage_error("keyframe", e)
+            finally:
+                _release(frame)
+                self._key_busy = False
+
+    # ---------------- result cache ----------------
+    def _cache_key(self, frame: object) -> Optional[tuple]:
+        """Result-cache key of frame (position or content hash); None while caching is off."""
+        if not self._caching:
+            return None
+        try:
+            return self.result_cache.key(frame)
+        except Exception:
+            return None
+
+    # ---------------- static-scene skipping ----------------
+    def _reuse_overlay(self, frame: np.ndarray) -> bool:
+        """True if the scene has not changed since the last inferred frame."""
+        det = self.change_detector
+        if det is None:
+            return False
+        if self._last_overlay is None:
+            det.reset()   # nothing to reuse → the detector must say "infer"
+        return det.is_static(frame)
+
+    def _skip_unusable(self, frame: object, forget: bool = True) -> bool:
+        """
+        True if frame was scored unusable in the capture thread (and skipping is
+        on); the last overlay is forgotten (forget=False: by the caller), the
+        scene after a black or blurred stretch has to be inferred afresh.
+        """
+        if not self.skip_unusable or not unusable(frame):
+            return False
+        self.unusable_skipped += 1
+        if forget:
+            self._forget_overlay()
+        return True
+
+    def _forget_overlay(self) -> None:
+        self._last_overlay = None
+        if self.change_detector is not None:
+            self.change_detector.reset()
+
+    def _maybe_report(self) -> None:
+        """
+        Every ~5 s: skip / propagation counters and preprocessing time on the
+        debug signal (only if counters changed or the time moved by > 20%).
+        """
+        now = time.perf_counter()
+        if now - self._last_report < 5.0:
+            return
+        self._last_report = now
+        st = self.stats()
+        counters = {k: v for k, v in st.items() if k != "preprocess_ms"}
+        pre = st.get("preprocess_ms")
+        last = self._reported or {}
+        pre_moved = pre is not None and abs(pre - last.get("preprocess_ms", 0.0)) > 0.2 * pre
+        if not st or (counters == {k: v for k, v in last.items() if k != "preprocess_ms"} and not pre_moved):
+            return
+        self._reported = st
+        parts = []
+        if pre is not None:
+            parts.append(f"preprocess {pre:.1f} ms/frame")
+        p = st.get("propagation")
+        if p is not None:
+            parts.append(f"{p['inferred'] + p['keyframe']} inferred, {p['propagated']} propagated "
+                         f"({100 * p['propagated_ratio']:.0f}%)")
+        if self.change_detector is not None:
+            parts.append(f"static scene: {st['skipped']} reused / {st['inferred']} inferred "
+                         f"({100 * st['skip_ratio']:.0f}% skipped)")
+        if st.get("unusable"):
+            parts.append(f"{st['unusable']} black/blurred frames not inferred")
+        c = st.get("result_cache")
+        if c and c["hits"] + c["misses"]:
+            parts.append(f"result cache: {c['hits']} hits / {c['misses']} misses "
+                         f"({100 * c['hit_ratio']:.0f}%), {c['entries']} masks in {c['mb']:.1f} MB, "
+                         f"{c['evicted']} evicted")
+        self._log("ModelWorker: " + "; ".join(parts))
+
+    def _put(self, q: "queue.Queue", item) -> bool:
+        """Blocking put that gives up once the worker is stopping."""
+        while self._running:
+            try:
+                q.put(item, timeout=0.25)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _stage_error(self, stage: str, e: Exception) -> None:
+        self.error.emit(f"Inference error ({stage}): {e}")
+        self._log(f"Inference error ({stage}): {e}")
+
+    def _emit_empty(self, fid: int, size: Tuple[int, int]) -> None:
+        h, w = size
+        self.overlay_ready.emit(empty_mask_qimage((h, w), self.color_table), int(fid))
 
     def stop(self):
         self._running = False
@@ -157,94 +1296,17 @@ class ModelWorker(QThread):
         except Exception:
             pass
 
-    # ---------------- model loading ----------------
-    def _load_model(self) -> None:
-        # Try multiple paths so GUI can live in src/gui and models in src/models or src/hac/models
-        hac_mod = _import_first([
-            "src.hac.models.hac_joint_module",
-            "src.models.hac_joint_module",
-            "hac_joint_module",
-            f"{__package__}.hac_joint_module" if __package__ else "hac_joint_module",
-        ])
-        if hac_mod is None:
-            self._log("Import HACJointModule failed. Using dummy overlay.")
-            self._use_dummy = True
-            return
-
-        HACJointModule = getattr(hac_mod, "HACJointModule", None)
-        if HACJointModule is None:
-            self._log("HACJointModule symbol not found. Using dummy overlay.")
-            self._use_dummy = True
-            return
-
-        # Load from checkpoint if given; otherwise expect attn/unet ckpts
-        if self.ckpt_path and os.path.exists(self.ckpt_path):
-            try:
-                if pl is not None and hasattr(HACJointModule, "load_from_checkpoint"):
-                    kw = {"map_location": self.device}
-                    if self.attn_ckpt: kw["attn_ckpt"] = self.attn_ckpt
-                    if self.unet_ckpt: kw["unet_ckpt"] = self.unet_ckpt
-                    self._model = HACJointModule.load_from_checkpoint(self.ckpt_path, **kw)
-                else:
-                    self._model = HACJointModule.from_checkpoint(self.ckpt_path, device=self.device)  # type: ignore
-                self._model.eval().to(self.device)
-                self._log("Loaded HAC model from checkpoint.")
-                return
-            except Exception as e:
-                self._log(f"HAC load_from_checkpoint failed: {e}")
-                self.error.emit(f"HAC load failed: {e}")
+    # ---------------- overlay ----------------
+    def _traced_infer(self, frame: np.ndarray, fid: int) -> np.ndarray:
+        if not TRACE.enabled or fid < 0:
+            return self.engine.infer_mask(frame)
+        stamps: list = []
+        mask = self.engine.infer_mask(frame, stamps)
+        TRACE.mark_stages(fid, stamps)
+        return mask
 
-        # If we get here, no full ckpt; try to construct from partial ckpts/configs if supported
-        if self.attn_ckpt or self.unet_ckpt:
-            try:
-                self._model = HACJointModule(attn_ckpt=self.attn_ckpt, unet_ckpt=self.unet_ckpt)
-                self._model.eval().to(self.device)
-                self._log("Constructed HAC from partial ckpts.")
-                return
-            except Exception as e:
-                self._log(f"Partial HAC construction failed: {e}")
-
-        self._log("No model available — using dummy overlay.")
-        self._use_dummy = True
-
-    # ---------------- inference ----------------
-    def _infer_overlay(self, frame: np.ndarray) -> QImage:
-        h, w, _ = frame.shape
-        if self._use_dummy or self._model is None or not TORCH_OK:
-            # Fast edge magnitude → mask
-            gray = np.dot(frame[..., :3].astype(np.float32), [0.299, 0.587, 0.114])
-            gy, gx = np.gradient(gray)
-            mag = np.sqrt(gx * gx + gy * gy)
-            mag = (mag / (mag.max() + 1e-6))
-            mask = (mag > 0.25).astype(np.uint8)
-        else:
-            import PIL.Image as PILImage
-            # autocast to speed up on CUDA
-            autocast = torch.cuda.amp.autocast if (self.device == "cuda") else torch.cpu.amp.autocast  # type: ignore[attr-defined]
-            with torch.no_grad(), autocast():
-                img = PILImage.fromarray(frame).resize(self.input_size)
-                x = np.asarray(img).astype(np.float32) / 255.0
-                x = np.transpose(x, (2, 0, 1))[None, ...]
-                x_t = torch.from_numpy(x).to(self.device)  # type: ignore
-                out = self._model(x_t)
-                logits = out[1] if isinstance(out, (list, tuple)) and len(out) > 1 else out
-                if logits.ndim == 4 and logits.size(1) > 1:  # type: ignore
-                    prob = torch.softmax(logits, dim=1)[:, 1:2]  # type: ignore
-                else:
-                    prob = torch.sigmoid(logits)  # type: ignore
-                prob = torch.nn.functional.interpolate(prob, size=(h, w), mode="bilinear", align_corners=False)  # type: ignore
-                mask = (prob >= 0.5).float().cpu().numpy()[0, 0].astype(np.uint8)  # type: ignore
-
-        r, g, b, a = self.color_rgba
-        alpha = (mask * a).astype(np.uint8)
-        rgba = np.dstack([
-            np.full_like(mask, r, np.uint8),
-            np.full_like(mask, g, np.uint8),
-            np.full_like(mask, b, np.uint8),
-            alpha,
-        ])
-        qimg = QImage(rgba.data, w, h, 4 * w, QImage.Format_RGBA8888)
-        return qimg.copy()
+    def _mask_image(self, mask: np.ndarray) -> QImage:
+        return mask_qimage(mask, self.color_table)
 
     def _log(self, s: str) -> None:
         try:
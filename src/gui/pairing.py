@@ -0,0 +1,97 @@
+# pairing.py — fixed-size frame/overlay pairing store (slot = frame_id % capacity)
+#
+# Only frames that were actually sent to inference are stored. Ids are
+# dispatched in increasing order, so "drop everything up to id N" is a popleft
+# loop over a deque, and every id is pushed and popped exactly once:
+# constant time per frame, and never more than `capacity` pooled buffers held.
+from __future__ import annotations
+import collections
+from typing import Deque, List, Optional, Tuple
+
+from PySide6.QtGui import QImage
+
+from .frames import CapturedFrame
+
+
+class PairingRing:
+    """
+    put_frame(fid, frame)   : frame sent to the worker (retained here)
+    holds(fid)              : fid is dispatched and still waiting
+    put_overlay(fid, img)   : overlay arrived → the matching frame, or None
+    drop_through(fid)       : release everything up to and including fid
+    len(ring)               : dispatched frames still waiting for their overlay
+
+    A slot reused by a newer id evicts (releases) the old one; `evicted` counts
+    that, which only happens if the worker holds more than `capacity` frames.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self.capacity = max(2, int(capacity))
+        self._ids: List[int] = [-1] * self.capacity
+        self._frames: List[Optional[CapturedFrame]] = [None] * self.capacity
+        self._overlays: List[Optional[QImage]] = [None] * self.capacity
+        self._live: Deque[int] = collections.deque()   # increasing ids still held
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def put_frame(self, frame_id: int, frame: CapturedFrame) -> None:
+        i = frame_id % self.capacity
+        old = self._ids[i]
+        if old != -1:
+            # dispatched ids are sparse: the evicted one is whichever held this
+            # slot, not necessarily the oldest live id
+            self._live.remove(old)
+            self._clear(i)
+            self.evicted += 1
+        self._ids[i] = frame_id
+        self._frames[i] = frame.retain()
+        self._live.append(frame_id)
+
+    def discard(self, frame_id: int) -> None:
+        """Undo the last put_frame (dispatch failed)."""
+        if self._live and self._live[-1] == frame_id:
+            self._live.pop()
+            i = frame_id % self.capacity
+            if self._ids[i] == frame_id:
+                self._clear(i)
+
+    def holds(self, frame_id: int) -> bool:
+        """True while frame_id is dispatched and waiting (not dropped/evicted)."""
+        return self._ids[frame_id % self.capacity] == frame_id
+
+    def put_overlay(self, frame_id: int, overlay: QImage) -> Optional[CapturedFrame]:
+        i = frame_id % self.capacity
+        if self._ids[i] != frame_id:
+            return None  # never dispatched, or already dropped/evicted
+        self._overlays[i] = overlay
+        return self._frames[i]
+
+    def get(self, frame_id: int) -> Tuple[Optional[CapturedFrame], Optional[QImage]]:
+        i = frame_id % self.capacity
+        if self._ids[i] != frame_id:
+            return None, None
+        return self._frames[i], self._overlays[i]
+
+    def drop_through(self, frame_id: int) -> None:
+        live = self._live
+        while live and live[0] <= frame_id:
+            old = live.popleft()
+            i = old % self.capacity
+            if self._ids[i] == old:
+                self._clear(i)
+
+    def clear(self) -> None:
+        for i in range(self.capacity):
+            if self._ids[i] != -1:
+                self._clear(i)
+        self._live.clear()
+
+    def _clear(self, i: int) -> None:
+        f = self._frames[i]
+        self._ids[i] = -1
+        self._frames[i] = None
+        self._overlays[i] = None
+        if f is not None:
+            f.release()
@@ -0,0 +1,133 @@
+# preprocess.py — BGR frame(s) → model input tensor, into preallocated buffers
+#
+# prepare_input() allocates a resized image, a float copy, a transposed copy and
+# a tensor per frame. Preprocessor keeps all of that around between frames:
+#   1. cv2.resize writes into a persistent uint8 (H,W,3) buffer (pinned on CUDA)
+#   2. one numpy ufunc reads it with BGR→RGB and HWC→CHW folded into the strides
+#      and writes x * (1/255) (or the per-channel (x/255 - mean)/std as one
+#      multiply-add) straight into a persistent float32 tensor
+# On CUDA the uint8 buffer is copied to the device (3× less than float) and the
+# conversion runs there instead. channels_last=True lays the tensor out NHWC,
+# which is what cudnn / oneDNN convolutions prefer; CHW↔HWC is then a no-op.
+#
+# Tensors come from a small ring (`slots` per batch size): pipelined mode has
+# up to three frames between preprocessing and the forward pass, and a buffer
+# must not be overwritten while the model still reads it.
+from __future__ import annotations
+import collections
+import time
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+INTERPOLATION = {"cubic": cv2.INTER_CUBIC, "linear": cv2.INTER_LINEAR, "area": cv2.INTER_AREA}
+
+
+def resize_flag(name: str, src_hw: Tuple[int, int], size: Tuple[int, int]) -> int:
+    """
+    cv2 interpolation for resizing an (H,W) image to size=(w,h). "cubic" stands
+    for the PIL BICUBIC resize the model was trained with; PIL widens the filter
+    when shrinking (antialiasing), cv2's INTER_CUBIC does not, so downscales
+    use INTER_AREA, which is the closest cv2 match.
+    """
+    flag = INTERPOLATION.get(name, cv2.INTER_CUBIC)
+    if flag == cv2.INTER_CUBIC and (size[0] < src_hw[1] or size[1] < src_hw[0]):
+        return cv2.INTER_AREA
+    return flag
+
+
+class Preprocessor:
+    """
+    pre = Preprocessor(torch, (512, 512), "cuda", channels_last=True)
+    x = pre(frame)              # (1,3,H,W) float32 on device
+    x = pre.batch([f1, f2])     # (2,3,H,W)
+    pre.stats()                 # {"preprocess_ms": rolling mean per frame}
+
+    `interpolation` is "cubic" (what the model was trained with, see
+    resize_flag), "linear" or "area". mean/std (RGB, in [0,1] units) are
+    optional; without them the input is RGB in [0,1] like prepare_input().
+    """
+
+    def __init__(self, torch, input_size: Tuple[int, int], device: str = "cpu",
+                 channels_last: bool = False, interpolation: str = "cubic",
+                 mean: Optional[Sequence[float]] = None, std: Optional[Sequence[float]] = None,
+                 slots: int = 4):
+        self.torch = torch
+        self.input_size = tuple(input_size)
+        self.device = device
+        self.cuda = str(device).startswith("cuda")
+        self.channels_last = bool(channels_last)
+        self.interpolation = interpolation
+        self.slots = max(1, int(slots))
+        mean = np.asarray(mean if mean is not None else (0.0, 0.0, 0.0), np.float32)
+        std = np.asarray(std if std is not None else (1.0, 1.0, 1.0), np.float32)
+        # x_rgb / 255 → (x_rgb / 255 - mean) / std  ==  x_rgb * scale + bias, per channel
+        self._scale = (1.0 / (255.0 * std)).astype(np.float32)
+        self._bias = (-mean / std).astype(np.float32)
+        self._plain = not self._bias.any() and np.allclose(self._scale, self._scale[0])
+        self._rings: Dict[int, List[tuple]] = {}
+        self._next: Dict[int, int] = {}
+        self._times: Deque[float] = collections.deque(maxlen=120)
+
+    # ---------------- buffers ----------------
+    def _alloc(self, b: int) -> tuple:
+        torch = self.torch
+        w, h = self.input_size
+        fmt = torch.channels_last if self.channels_last else torch.contiguous_format
+        x = torch.empty((b, 3, h, w), dtype=torch.float32, device=self.device).contiguous(memory_format=fmt)
+        u8 = torch.empty((b, h, w, 3), dtype=torch.uint8, pin_memory=self.cuda)
+        dev_u8 = torch.empty((b, h, w, 3), dtype=torch.uint8, device=self.device) if self.cuda else None
+        return x, u8, u8.numpy(), dev_u8
+
+    def _slot(self, b: int) -> tuple:
+        ring = self._rings.get(b)
+        if ring is None:
+            ring = self._rings[b] = [self._alloc(b) for _ in range(self.slots)]
+            self._next[b] = 0
+        i = self._next[b]
+        self._next[b] = (i + 1) % len(ring)
+        return ring[i]
+
+    # ---------------- conversion ----------------
+    def __call__(self, frame_bgr: np.ndarray):
+        return self.batch([frame_bgr])
+
+    def batch(self, frames: List[np.ndarray]):
+        t0 = time.perf_counter()
+        x, u8, u8_np, dev_u8 = self._slot(len(frames))
+        for i, f in enumerate(frames):
+            flag = resize_flag(self.interpolation, f.shape[:2], self.input_size)
+            cv2.resize(f, self.input_size, dst=u8_np[i], interpolation=flag)
+        if self.cuda:
+            dev_u8.copy_(u8, non_blocking=True)
+            self._convert_torch(dev_u8, x)
+        else:
+            self._convert_numpy(u8_np, x)
+        self._times.append((time.perf_counter() - t0) / len(frames))
+        return x
+
+    def _convert_numpy(self, src: np.ndarray, x) -> None:
+        """(B,H,W,3) uint8 BGR → x in one strided ufunc pass (plus one in-place add if mean is set)."""
+        # x.numpy() is an NCHW view with x's strides, so for channels_last the
+        # writes below are sequential and the transpose costs nothing
+        dst = x.numpy()
+        rgb = src[..., ::-1].transpose(0, 3, 1, 2)
+        if self._plain:
+            np.multiply(rgb, self._scale[0], out=dst, dtype=np.float32)
+            return
+        np.multiply(rgb, self._scale[:, None, None], out=dst, dtype=np.float32)
+        np.add(dst, self._bias[:, None, None], out=dst)
+
+    def _convert_torch(self, src, x) -> None:
+        torch = self.torch
+        rgb = src.permute(0, 3, 1, 2).flip(1)
+        if self._plain:
+            torch.mul(rgb, float(self._scale[0]), out=x)
+        else:
+            scale = torch.as_tensor(self._scale, device=x.device)[:, None, None]
+            bias = torch.as_tensor(self._bias, device=x.device)[:, None, None]
+            torch.addcmul(bias, rgb.float(), scale, out=x)
+
+    def stats(self) -> dict:
+        return {"preprocess_ms": float(np.mean(self._times) * 1000.0)} if self._times else {}
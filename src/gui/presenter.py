@@ -0,0 +1,130 @@
+# presenter.py — coalesce canvas state changes to at most one repaint per display refresh
+#
+# MainWindow touches the canvas from several slots per frame (frame arrives,
+# overlay arrives, opacity re-applied, motion offset, …); each setter used to
+# schedule its own repaint. FramePresenter collects the changes in a dirty set
+# and the canvas pulls them in one go at the start of its next paint:
+#   - if the last present is at least one refresh interval ago, the first change
+#     just calls canvas.update() (Qt merges it with the rest of the slot, and
+#     paints on the next pass — no added latency)
+#   - otherwise a precise single-shot timer calls update() when the interval is
+#     over, so the canvas is never repainted faster than the screen refreshes
+# Newer values replace older pending ones (a frame in between is never drawn),
+# and values equal to what the canvas already shows are not marked dirty.
+# PRESENT_HZ overrides the refresh rate of the canvas' screen (0 = no limit).
+from __future__ import annotations
+import os
+import time
+from typing import Callable, Optional
+
+from PySide6.QtCore import QObject, QTimer, Qt
+from PySide6.QtGui import QImage
+
+from .frames import CapturedFrame
+
+
+class FramePresenter(QObject):
+    """
+    p = FramePresenter(canvas)        # registers itself with canvas.set_presenter
+    p.set_frame(frame); p.set_overlay(img); p.set_overlay_opacity(0.7)   # → one repaint
+    p.stats()   # {"presents", "changes", "present_hz"}
+    """
+
+    def __init__(self, canvas, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self._pending: dict = {}
+        self._held: Optional[CapturedFrame] = None     # pending frame keeps its pooled buffer
+        self._scheduled = False
+        self._last_present = 0.0
+        self._changes = 0
+        self._presents = 0
+        env = os.environ.get("PRESENT_HZ")
+        try:
+            hz = float(env) if env is not None else self._screen_hz()
+        except ValueError:
+            hz = self._screen_hz()
+        self.present_hz = hz
+        self._interval = 1.0 / hz if hz > 0 else 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(canvas.update)
+        canvas.set_presenter(self)
+
+    def _screen_hz(self) -> float:
+        try:
+            screen = self.canvas.screen()
+            hz = float(screen.refreshRate()) if screen is not None else 0.0
+        except Exception:
+            hz = 0.0
+        return hz if hz >= 10.0 else 60.0
+
+    # ---------------- state changes ----------------
+    def set_frame(self, frame: QImage | CapturedFrame):
+        held = frame.retain() if isinstance(frame, CapturedFrame) else None
+        if self._held is not None:
+            self._held.release()
+        self._held = held
+        self._mark("frame", frame)
+        self.canvas.prefetch_frame(frame)   # scaling can start before the paint
+
+    def set_overlay(self, qimg: Optional[QImage]):
+        if "overlay" not in self._pending and qimg is self.canvas._overlay:
+            return
+        self._mark("overlay", qimg)
+        self.canvas.prefetch_overlay(qimg)
+
+    def clear_overlay(self):
+        self.set_overlay(None)
+
+    def set_overlay_opacity(self, value: float):
+        value = max(0.0, min(1.0, float(value)))
+        if "opacity" not in self._pending and value == self.canvas._overlay_opacity:
+            return
+        self._mark("opacity", value)
+
+    def set_overlay_offset(self, dx: float = 0.0, dy: float = 0.0):
+        off = self.canvas._overlay_offset
+        if "offset" not in self._pending and dx == off.x() and dy == off.y():
+            return
+        self._mark("offset", (dx, dy))
+
+    def _mark(self, key: str, value):
+        self._pending[key] = value
+        self._changes += 1
+        if self._scheduled:
+            return
+        self._scheduled = True
+        wait = self._last_present + self._interval - time.perf_counter()
+        if wait <= 0:
+            self.canvas.update()
+        else:
+            self._timer.start(max(1, int(wait * 1000.0 + 0.5)))
+
+    # ---------------- present ----------------
+    def pull(self, apply: Callable[[dict], None]):
+        """Called by the canvas when it paints: hand over all pending changes."""
+        self._scheduled = False
+        self._timer.stop()
+        if not self._pending:
+            return
+        changes, self._pending = self._pending, {}
+        apply(changes)
+        if self._held is not None:   # the canvas holds its own reference now
+            self._held.release()
+            self._held = None
+        self._last_present = time.perf_counter()
+        self._presents += 1
+
+    def discard(self):
+        """Drop pending changes (video restart / close)."""
+        self._timer.stop()
+        self._scheduled = False
+        self._pending.clear()
+        if self._held is not None:
+            self._held.release()
+            self._held = None
+
+    def stats(self) -> dict:
+        return {"presents": self._presents, "changes": self._changes, "present_hz": self.present_hz}
@@ -0,0 +1,337 @@
+# process_worker.py — out-of-process inference with shared-memory frame/mask rings
+#
+# The model runs in a child process, so Python-level pre/post-processing no
+# longer competes with the Qt event loop and VideoThread for the GIL. Frames go
+# into a multiprocessing.shared_memory ring, masks come back through a second
+# ring; the pipes only carry tiny (slot, frame_id, shape) messages.
+from __future__ import annotations
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from PySide6.QtGui import QImage
+
+from .frame_quality import unusable
+from .frames import CapturedFrame
+from .tracing import TRACE
+from .colors import OVERLAY_CLASSES, overlay_palette
+from .model_worker import _ENGINE_OPTS, empty_mask_qimage, mask_qimage
+
+
+class ShmRing:
+    """`slots` fixed-size byte slots in one SharedMemory block."""
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = int(slots)
+        self.slot_bytes = int(slot_bytes)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        else:
+            # spawned children share the parent's resource tracker, so attaching
+            # here does not hand ownership (unlink) to the child
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def view(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        n = int(np.prod(shape))
+        if n > self.slot_bytes:
+            raise ValueError(f"{shape} does not fit a {self.slot_bytes}-byte slot")
+        return np.ndarray(shape, np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except Exception:
+            pass
+
+
+def _engine_main(req, res, in_name: str, out_name: str, slots: int, in_bytes: int, out_bytes: int,
+                 engine_opts: dict) -> None:
+    """Child process: load the engine, then turn ("frame", …) requests into ("mask", …) replies."""
+    from .model_worker import InferenceEngine
+
+    ring_in = ShmRing(slots, in_bytes, in_name)
+    ring_out = ShmRing(slots, out_bytes, out_name)
+    log = lambda m: res.send(("log", str(m)))
+    engine = InferenceEngine(log=log, on_error=lambda m: res.send(("error", str(m))), **engine_opts)
+    engine.load()
+    res.send(("ready", engine.backend))
+    try:
+        while True:
+            msg = req.recv()
+            if msg[0] == "stop":
+                break
+            _, slot, fid, h, w = msg
+            try:
+                stamps: list = []
+                mask = engine.infer_mask(ring_in.view(slot, (h, w, 3)), stamps)
+                mh, mw = mask.shape
+                ring_out.view(slot, (mh, mw))[...] = mask
+                # perf_counter is system-wide, so the parent can file these under fid as-is
+                res.send(("mask", slot, fid, mh, mw, stamps))
+            except Exception as e:
+                res.send(("failed", slot, fid, f"{e}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring_in.close()
+        ring_out.close()
+
+
+class ProcessModelWorker(QThread):
+    """
+    Drop-in replacement for ModelWorker (same signals and feed_frame/set_enabled/
+    stop API) that runs the InferenceEngine in a separate process.
+
+    feed_frame() copies the frame into a free shared-memory slot (the pooled
+    capture buffer is released immediately) and sends its slot/id over a pipe.
+    This thread reads replies, wraps masks in Indexed8 QImages and emits overlay_ready. If the
+    child dies it is restarted with exponential back-off; frames that were in
+    flight get empty overlays so pairing in MainWindow never stalls.
+
+    Env: MODEL_PROCESS_SLOTS (ring slots, default 3), MODEL_PROCESS_MAX_FRAME
+    ("WxH" the slots are sized for, default 1920x1080; larger frames restart the
+    child with bigger slots).
+    """
+    started_ok = Signal()
+    started = Signal()
+    overlay_ready = Signal(QImage, int)  # (overlay_qimage, frame_id)
+    debug = Signal(str)
+    error = Signal(str)
+
+    def __init__(self, input_size: tuple[int, int] = (512, 512),
+                 color_rgba: Optional[tuple[int, int, int, int]] = None,
+                 slots: Optional[int] = None, max_frame: Optional[Tuple[int, int]] = None,
+                 target_fps: Optional[float] = None, max_queue: int = 1,
+                 **engine_opts: object):
+        # target_fps/max_queue are accepted for ModelWorker compatibility; the
+        # slot ring is the queue here and feed_frame drops when it is full.
+        super().__init__()
+        self.engine_opts = {k: v for k, v in engine_opts.items() if k in _ENGINE_OPTS + ("ckpt_path", "device", "attn_ckpt", "unet_ckpt")}
+        self.engine_opts["input_size"] = input_size
+        # class 1 colour override; the canvas may recolour at draw time anyway
+        self.color_table = overlay_palette(
+            OVERLAY_CLASSES[:1] + [color_rgba] + OVERLAY_CLASSES[2:] if color_rgba else None)
+        self.slots = int(slots or os.environ.get("MODEL_PROCESS_SLOTS", 3))
+        if max_frame is None:
+            mw, _, mh = os.environ.get("MODEL_PROCESS_MAX_FRAME", "1920x1080").partition("x")
+            max_frame = (int(mw), int(mh or mw))
+        self._in_bytes = max_frame[0] * max_frame[1] * 3
+        # child works on one frame while the next waits in its slot
+        self.max_inflight = max(1, self.slots - 1)
+        # black / blurred frames (scored in the capture thread) never go to the child
+        self.skip_unusable = os.environ.get("MODEL_SKIP_UNUSABLE", "1").lower() in ("1", "true", "yes")
+
+        self._lock = threading.Lock()
+        self._free: List[int] = []
+        self._inflight: Dict[int, Tuple[int, Tuple[int, int]]] = {}   # slot → (frame_id, (h, w))
+        self._running = False
+        self._enabled = True
+        self._ready = False
+        self._resize_to = 0
+        self._proc = None
+        self._req = None
+        self._ring_in: ShmRing | None = None
+        self._ring_out: ShmRing | None = None
+        self.restarts = 0
+
+    # ---------------- public API (GUI thread) ----------------
+    def feed_frame(self, frame: "CapturedFrame | np.ndarray", frame_id: int) -> None:
+        bgr = frame.bgr if isinstance(frame, CapturedFrame) else frame
+        if not isinstance(bgr, np.ndarray) or bgr.ndim != 3:
+            return
+        h, w, _ = bgr.shape
+        if not self._enabled or (self.skip_unusable and unusable(frame)):
+            self._emit_empty(int(frame_id), (h, w))
+            return
+        with self._lock:
+            accept = self._ready and bool(self._free) and bgr.nbytes <= self._ring_in.slot_bytes
+            if self._ready and bgr.nbytes > self._ring_in.slot_bytes:
+                self._resize_to = bgr.nbytes  # restart with bigger slots from run()
+            if accept:
+                slot = self._free.pop()
+                self._inflight[slot] = (int(frame_id), (h, w))
+                self._ring_in.view(slot, bgr.shape)[...] = bgr
+                try:
+                    self._req.send(("frame", slot, int(frame_id), h, w))
+                except Exception:
+                    self._inflight.pop(slot, None)
+                    self._free.append(slot)
+                    accept = False
+        if not accept:
+            # child busy/restarting: answer with an empty overlay so the caller's
+            # pairing moves on instead of waiting for a frame that never comes back
+            self._emit_empty(int(frame_id), (h, w))
+
+    def enqueue_frame(self, bgr_frame: np.ndarray) -> None:
+        self.feed_frame(bgr_frame, -1)
+
+    def set_enabled(self, on: bool) -> None:
+        self._enabled = bool(on)
+
+    # ---------------- process management ----------------
+    def _spawn(self):
+        ctx = mp.get_context("spawn")
+        self._ring_in = ShmRing(self.slots, self._in_bytes)
+        self._ring_out = ShmRing(self.slots, self._in_bytes // 3)
+        req_r, req_w = ctx.Pipe(duplex=False)
+        res_r, res_w = ctx.Pipe(duplex=False)
+        self._proc = ctx.Process(
+            target=_engine_main, name="intraop-inference", daemon=True,
+            args=(req_r, res_w, self._ring_in.name, self._ring_out.name, self.slots,
+                  self._ring_in.slot_bytes, self._ring_out.slot_bytes, self.engine_opts),
+        )
+        self._proc.start()
+        req_r.close()
+        res_w.close()
+        with self._lock:
+            self._req = req_w
+            self._free = list(range(self.slots))
+            self._inflight.clear()
+        return res_r
+
+    def _shutdown_child(self, res, graceful: bool = True):
+        with self._lock:
+            self._ready = False
+            lost = list(self._inflight.values())
+            self._inflight.clear()
+            self._free = []
+            req, self._req = self._req, None
+        if graceful and req is not None:
+            try:
+                req.send(("stop",))
+            except Exception:
+                pass
+        if self._proc is not None:
+            self._proc.join(2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join(1.0)
+        for c in (req, res):
+            try:
+                if c is not None:
+                    c.close()
+            except Exception:
+                pass
+        for r in (self._ring_in, self._ring_out):
+            if r is not None:
+                r.close()
+        self._ring_in = self._ring_out = None
+        # frames that never come back still need an (empty) overlay for pairing
+        for fid, size in lost:
+            self._emit_empty(fid, size)
+
+    def run(self):
+        self._running = True
+        backoff = 1.0
+        announced = False
+        while self._running:
+            res = self._spawn()
+            t_spawn = time.perf_counter()
+            self._log(f"Inference process started (pid {self._proc.pid}).")
+            crashed = False
+            while self._running:
+                if self._resize_to:
+                    self._in_bytes, self._resize_to = self._resize_to, 0
+                    self._log("Frame larger than shared-memory slots — restarting inference process.")
+                    break
+                try:
+                    has = res.poll(0.25)
+                except (EOFError, OSError):
+                    has, crashed = False, True
+                if not has:
+                    if crashed or not self._proc.is_alive():
+                        crashed = True
+                        break
+                    continue
+                try:
+                    msg = res.recv()
+                except (EOFError, OSError):
+                    crashed = True
+                    break
+                self._handle(msg)
+                if msg[0] == "ready":
+                    backoff = 1.0
+                    if not announced:
+                        announced = True
+                        self.started_ok.emit()
+                        self.started.emit()
+            self._shutdown_child(res, graceful=not crashed)
+            if crashed and self._running:
+                code = self._proc.exitcode if self._proc is not None else None
+                self.restarts += 1
+                self.error.emit(f"Inference process crashed (exit code {code}) — restarting in {backoff:.0f}s")
+                if time.perf_counter() - t_spawn > 60.0:
+                    backoff = 1.0
+                t_end = time.perf_counter() + backoff
+                while self._running and time.perf_counter() < t_end:
+                    time.sleep(0.1)
+                backoff = min(30.0, backoff * 2)
+        self._log("ProcessModelWorker stopped.")
+
+    def _handle(self, msg) -> None:
+        kind = msg[0]
+        if kind == "log":
+            self._log(msg[1])
+        elif kind == "error":
+            self.error.emit(msg[1])
+        elif kind == "ready":
+            with self._lock:
+                self._ready = True
+            self._log(f"Inference process ready ({msg[1]}).")
+        elif kind in ("mask", "failed"):
+            slot, fid = msg[1], msg[2]
+            with self._lock:
+                entry = self._inflight.pop(slot, None)
+            try:
+                if kind == "mask" and entry is not None:
+                    mh, mw = msg[3], msg[4]
+                    TRACE.mark_stages(int(fid), msg[5])
+                    # mask_qimage copies, so the slot can be reused right after
+                    qimg = mask_qimage(self._ring_out.view(slot, (mh, mw)), self.color_table)
+                    self.overlay_ready.emit(qimg, int(fid))
+                else:
+                    if kind == "failed":
+                        self.error.emit(f"Inference error: {msg[3]}")
+                    if entry is not None:
+                        self._emit_empty(entry[0], entry[1])
+            finally:
+                with self._lock:
+                    if self._ready:
+                        self._free.append(slot)
+
+    def stop(self):
+        self._running = False
+        try:
+            if self.isRunning():
+                self.wait(4000)
+        except Exception:
+            pass
+
+    def __del__(self):
+        try:
+            self.stop()
+        except Exception:
+            pass
+
+    # ---------------- helpers ----------------
+    def _emit_empty(self, fid: int, size: Tuple[int, int]) -> None:
+        h, w = size
+        self.overlay_ready.emit(empty_mask_qimage((h, w), self.color_table), int(fid))
+
+    def _log(self, s: str) -> None:
+        try:
+            self.debug.emit(s)
+        except Exception:
+            pass
@@ -0,0 +1,124 @@
+# quantize.py — INT8 post-training quantization of the exported ONNX graph
+#
+# Static QDQ quantization with ONNX Runtime, calibrated on frames of a recorded
+# procedure (same preprocessing as the live worker). The INT8 graph is cached
+# next to the FP32 export: <fp32 stem>_int8.onnx plus a .json sidecar saying
+# which video/how many frames it was calibrated on. Delete both to recalibrate.
+from __future__ import annotations
+import json
+import os
+import time
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+from .model_worker import prepare_input
+
+
+def calibration_frames(video: str, n_frames: int, input_size: tuple[int, int]) -> Iterator[np.ndarray]:
+    """Up to n_frames model inputs spread evenly over the whole video."""
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Cannot open calibration video: {video}")
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        step = max(1, total // max(1, n_frames)) if total > 0 else 1
+        emitted = 0
+        while emitted < n_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield prepare_input(frame, input_size)
+            emitted += 1
+            for _ in range(step - 1):
+                if not cap.grab():
+                    return
+    finally:
+        cap.release()
+
+
+class VideoCalibrationReader:
+    """onnxruntime CalibrationDataReader fed from a video file."""
+
+    def __init__(self, input_name: str, video: str, n_frames: int, input_size: tuple[int, int]):
+        self.input_name = input_name
+        self._args = (video, n_frames, input_size)
+        self._it = calibration_frames(*self._args)
+
+    def get_next(self) -> Optional[dict]:
+        x = next(self._it, None)
+        return None if x is None else {self.input_name: x}
+
+    def rewind(self) -> None:
+        self._it = calibration_frames(*self._args)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        d = self.get_next()
+        if d is None:
+            raise StopIteration
+        return d
+
+
+def int8_path_for(fp32_path: str) -> str:
+    stem, ext = os.path.splitext(fp32_path)
+    return f"{stem}_int8{ext}"
+
+
+def ensure_int8(fp32_path: str, calib_video: Optional[str], input_size: tuple[int, int],
+                n_frames: int = 64, log=print) -> str:
+    """Path of the INT8 graph for fp32_path, quantizing (and caching) it if needed."""
+    out = int8_path_for(fp32_path)
+    meta_path = out + ".json"
+    if os.path.exists(out):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            log(f"INT8: using cached graph (calibrated on {os.path.basename(meta.get('calib_video', '?'))}, "
+                f"{meta.get('frames', '?')} frames)")
+        except Exception:
+            log(f"INT8: using cached graph {os.path.basename(out)}")
+        return out
+    if not calib_video or not os.path.exists(calib_video):
+        raise FileNotFoundError("no cached INT8 graph and no calibration video (MODEL_CALIB_VIDEO)")
+
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    log(f"INT8: calibrating on {n_frames} frames of {os.path.basename(calib_video)} …")
+    t0 = time.perf_counter()
+    src = fp32_path
+    prep = os.path.splitext(out)[0] + "_prep.onnx"
+    try:
+        # shape inference + constant folding makes the quantizer's job much easier
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        quant_pre_process(fp32_path, prep, skip_symbolic_shape=True)
+        src = prep
+    except Exception as e:
+        log(f"INT8: pre-processing skipped ({e})")
+
+    input_name = ort.InferenceSession(src, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = VideoCalibrationReader(input_name, calib_video, n_frames, input_size)
+    tmp = out + ".tmp.onnx"
+    try:
+        quantize_static(
+            src, tmp, reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+        os.replace(tmp, out)
+    finally:
+        for p in (tmp, prep):
+            if os.path.exists(p):
+                os.remove(p)
+    with open(meta_path, "w") as f:
+        json.dump({"calib_video": os.path.abspath(calib_video), "frames": n_frames,
+                   "input_size": list(input_size), "created": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+    log(f"INT8: quantized in {time.perf_counter() - t0:.1f}s → {os.path.basename(out)}")
+    return out
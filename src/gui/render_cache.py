@@ -0,0 +1,194 @@
+# render_cache.py — display-sized copies of the canvas' frame, overlay and their composite
+#
+# VideoCanvas used to draw the native-resolution frame and overlay into the
+# letterbox rect on every paint, i.e. rescale both even when a repaint was only
+# for a marker, the HUD or a new opacity. RenderCache keeps
+#   frame      scaled to the target rect (RGB32, the format QPainter blits fastest)
+#   overlay    class mask through the palette, premultiplied, scaled (bilinear)
+#   composite  frame + overlay at the current opacity / offset, from the second
+#              paint of the same combination on (a new frame is painted once)
+# each rebuilt only when one of its inputs changes. A repaint with nothing new
+# is one blit; a new opacity or offset is two unscaled blits.
+#
+# Scaling is cv2 on the image memory (the GIL is released) and can start as soon
+# as the presenter receives a frame/overlay (prefetch), on one background thread;
+# the paint then only waits for a job that is already running, or does the work
+# itself if the job has not started yet.
+from __future__ import annotations
+import concurrent.futures as cf
+from typing import Optional
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QPoint, QSize, Qt
+from PySide6.QtGui import QImage, QPainter
+
+from .frames import CapturedFrame
+
+
+def _view(img: QImage, channels: int) -> np.ndarray:
+    h, w = img.height(), img.width()
+    a = np.frombuffer(img.constBits(), np.uint8, count=h * img.bytesPerLine()).reshape(h, img.bytesPerLine())
+    return a[:, :w * channels].reshape(h, w, channels) if channels > 1 else a[:, :w]
+
+
+def _wrap(arr: np.ndarray, fmt) -> QImage:
+    """QImage over arr; the array is kept alive on the image's Python wrapper."""
+    img = QImage(arr.data, arr.shape[1], arr.shape[0], arr.strides[0], fmt)
+    img._array = arr
+    return img
+
+
+def scale_frame(img: QImage, size: QSize) -> QImage:
+    w, h = size.width(), size.height()
+    if img.format() == QImage.Format_BGR888:
+        src = _view(img, 3)
+        small = cv2.resize(src, (w, h), interpolation=cv2.INTER_LINEAR)
+        return _wrap(cv2.cvtColor(small, cv2.COLOR_BGR2BGRA), QImage.Format_RGB32)   # B,G,R,A bytes = RGB32
+    return img.scaled(w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation).convertToFormat(QImage.Format_RGB32)
+
+
+def scale_overlay(img: QImage, size: QSize, lut: Optional[np.ndarray]) -> QImage:
+    """Overlay at `size`, ARGB32_Premultiplied; Indexed8 masks go through `lut` (palette_lut)."""
+    w, h = size.width(), size.height()
+    if img.format() == QImage.Format_Indexed8 and lut is not None:
+        idx = _view(img, 1)
+        colored = np.take(lut, idx).view(np.uint8).reshape(idx.shape[0], idx.shape[1], 4)
+        return _wrap(cv2.resize(colored, (w, h), interpolation=cv2.INTER_LINEAR),
+                     QImage.Format_ARGB32_Premultiplied)
+    return (img.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+            .scaled(w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+
+
+def palette_lut(color_table) -> np.ndarray:
+    """Qt colour table (ARGB ints) → (256,) uint32 premultiplied ARGB (B,G,R,A bytes in memory)."""
+    table = np.zeros(256, np.uint32)
+    table[:len(color_table)] = np.asarray(list(color_table)[:256], np.uint32)
+    bgra = table.view(np.uint8).reshape(256, 4).astype(np.uint16)
+    bgra[:, :3] = bgra[:, :3] * bgra[:, 3:4] // 255
+    # one 4-byte gather per pixel (np.take) is ~10× faster than indexing a (256,4) table
+    return np.ascontiguousarray(bgra.astype(np.uint8)).view(np.uint32).reshape(256)
+
+
+class _Slot:
+    __slots__ = ("key", "image", "job")
+
+    def __init__(self):
+        self.key = None
+        self.image: Optional[QImage] = None
+        self.job: Optional[cf.Future] = None
+
+
+class RenderCache:
+    """
+    cache = RenderCache()
+    cache.prefetch_frame(key, qimg, size, hold=captured)    # optional, off-thread
+    f = cache.frame(key, qimg, size)
+    o = cache.overlay(key, qimg, size, lut)
+    img = cache.composite(f, o, opacity, QPoint(dx, dy))   # None: draw f, then o
+    cache.stats()   # {"hits", "scaled", "composited"}
+    """
+
+    def __init__(self, threaded: bool = True):
+        self._pool = cf.ThreadPoolExecutor(1, thread_name_prefix="canvas-scale") if threaded else None
+        self._frame = _Slot()
+        self._overlay = _Slot()
+        self._comp_key = None
+        self._comp: Optional[QImage] = None
+        self.hits = 0
+        self.scaled = 0
+        self.composited = 0
+
+    # ---------------- scaled inputs ----------------
+    def prefetch_frame(self, key, img: QImage, size: QSize, hold: Optional[CapturedFrame] = None):
+        self._prefetch(self._frame, (key, size.width(), size.height()), scale_frame, (img, size), hold)
+
+    def prefetch_overlay(self, key, img: QImage, size: QSize, lut: Optional[np.ndarray]):
+        self._prefetch(self._overlay, (key, size.width(), size.height()), scale_overlay, (img, size, lut), None)
+
+    def frame(self, key, img: QImage, size: QSize) -> QImage:
+        return self._get(self._frame, (key, size.width(), size.height()), scale_frame, (img, size))
+
+    def overlay(self, key, img: QImage, size: QSize, lut: Optional[np.ndarray]) -> QImage:
+        return self._get(self._overlay, (key, size.width(), size.height()), scale_overlay, (img, size, lut))
+
+    def _prefetch(self, slot: _Slot, key, fn, args, hold: Optional[CapturedFrame]):
+        if self._pool is None or slot.key == key or size_empty(args[1]):
+            return
+        if slot.job is not None:
+            slot.job.cancel()
+        slot.key, slot.image = key, None
+        try:
+            slot.job = self._pool.submit(fn, *args)
+        except RuntimeError:   # pool shut down
+            slot.job = None
+            return
+        if hold is not None:
+            # the buffer must not be recycled while it is being read; done
+            # callbacks also run when the job is cancelled before it starts
+            hold.retain()
+            slot.job.add_done_callback(lambda _f: hold.release())
+
+    def _get(self, slot: _Slot, key, fn, args) -> QImage:
+        if slot.key == key:
+            if slot.image is not None:
+                self.hits += 1
+                return slot.image
+            job, slot.job = slot.job, None
+            if job is not None and not job.cancel():
+                try:
+                    slot.image = job.result()    # already running: cheaper to wait than to redo
+                    self.scaled += 1
+                    return slot.image
+                except Exception:
+                    pass
+        elif slot.job is not None:
+            slot.job.cancel()
+            slot.job = None
+        slot.key, slot.image = key, fn(*args)
+        self.scaled += 1
+        return slot.image
+
+    # ---------------- composite ----------------
+    def composite(self, frame: QImage, overlay: QImage, opacity: float, offset: QPoint) -> Optional[QImage]:
+        """
+        frame with overlay blended in at opacity, shifted by offset (display
+        pixels) — once the same combination is painted a second time. The first
+        time None is returned and the caller draws the two layers itself: a new
+        frame is painted once, building a composite for it would only add a copy.
+        """
+        key = (frame.cacheKey(), overlay.cacheKey(), round(opacity, 4), offset.x(), offset.y())
+        if key == self._comp_key:
+            if self._comp is None:
+                out = frame.copy()
+                p = QPainter(out)
+                p.setOpacity(opacity)
+                p.drawImage(offset, overlay)
+                p.end()
+                self._comp = out
+                self.composited += 1
+            else:
+                self.hits += 1
+            return self._comp
+        self._comp_key, self._comp = key, None
+        return None
+
+    def clear(self):
+        for slot in (self._frame, self._overlay):
+            if slot.job is not None:
+                slot.job.cancel()
+            slot.key = slot.image = slot.job = None
+        self._comp_key = self._comp = None
+
+    def close(self):
+        self.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "scaled": self.scaled, "composited": self.composited}
+
+
+def size_empty(size: QSize) -> bool:
+    return size.width() <= 0 or size.height() <= 0
@@ -0,0 +1,59 @@
+# startup.py — startup milestones: app import → window shown → first frame → first overlay
+#
+# Imported first by app.py so T0 is as close to process start as we can get
+# from Python. The report goes to stderr, the status bar, and — if env
+# STARTUP_REPORT is set — is appended as one JSON line to that file, so
+# regressions across releases are easy to spot.
+from __future__ import annotations
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+T0 = time.perf_counter()
+
+
+class StartupTimer:
+    MILESTONES = ("window", "first_frame", "model_ready", "first_overlay")
+
+    def __init__(self, t0: float = T0):
+        self.t0 = t0
+        self.marks: Dict[str, float] = {}
+        self.reported = False
+
+    def mark(self, name: str) -> bool:
+        """Record the first occurrence of a milestone; True if it was new."""
+        if name in self.marks:
+            return False
+        self.marks[name] = time.perf_counter() - self.t0
+        return True
+
+    def seconds(self, name: str) -> Optional[float]:
+        return self.marks.get(name)
+
+    def summary(self) -> str:
+        parts = []
+        for name in self.MILESTONES:
+            t = self.marks.get(name)
+            parts.append(f"{name.replace('_', ' ')} {t:.2f}s" if t is not None else f"{name.replace('_', ' ')} –")
+        return "Startup: " + " · ".join(parts)
+
+    def report(self) -> str:
+        """Emit the report once (stderr + optional JSON-lines file); returns the summary."""
+        s = self.summary()
+        if self.reported:
+            return s
+        self.reported = True
+        print(s, file=sys.stderr)
+        path = os.environ.get("STARTUP_REPORT")
+        if path:
+            try:
+                with open(path, "a") as f:
+                    f.write(json.dumps({"time": time.strftime("%Y-%m-%d %H:%M:%S"), **self.marks}) + "\n")
+            except Exception:
+                pass
+        return s
+
+
+STARTUP = StartupTimer()
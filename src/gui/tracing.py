@@ -0,0 +1,141 @@
+# tracing.py — per-frame latency tracing: capture → worker stages → overlay → paint
+#
+# One row per frame_id in a preallocated ring (row = frame_id % capacity); each
+# pipeline point writes its perf_counter() stamp into its column, so recording
+# is an index computation and one float store, from any thread and without locks.
+# perf_counter is system-wide monotonic, so stamps taken in the inference child
+# process (process_worker.py) line up with ours.
+#
+# Env: TRACE=0 disables recording, TRACE_HUD=1 shows the on-screen summary,
+# TRACE_EXPORT=<path prefix> writes <prefix>.csv and <prefix>.json on exit.
+from __future__ import annotations
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+STAGES = ("capture", "delivered", "dispatch", "pre_start", "pre_end", "fwd_start", "fwd_end",
+          "post_start", "post_end", "overlay", "paint")
+_COL = {name: i for i, name in enumerate(STAGES)}
+
+# (name, from stage, to stage)
+SPANS = (
+    ("signal", "capture", "delivered"),          # capture thread → GUI slot
+    ("dispatch_wait", "delivered", "dispatch"),  # waiting for room in the worker
+    ("worker_queue", "dispatch", "pre_start"),
+    ("preprocess", "pre_start", "pre_end"),
+    ("forward", "fwd_start", "fwd_end"),
+    ("postprocess", "post_start", "post_end"),
+    ("overlay_delivery", "post_end", "overlay"),  # worker signal → GUI slot
+    ("overlay_to_paint", "overlay", "paint"),
+    ("capture_to_paint", "capture", "paint"),
+)
+
+
+class Tracer:
+    def __init__(self, capacity: int = 4096, enabled: bool = True):
+        self.capacity = int(capacity)
+        self.enabled = bool(enabled)
+        self._ids = np.full(self.capacity, -1, np.int64)
+        self._t = np.full((self.capacity, len(STAGES)), np.nan)
+
+    # ---------------- recording ----------------
+    def mark(self, frame_id: int, stage: str, t: Optional[float] = None) -> None:
+        if not self.enabled or frame_id is None or frame_id < 0:
+            return
+        i = frame_id % self.capacity
+        if self._ids[i] != frame_id:
+            self._t[i] = np.nan
+            self._ids[i] = frame_id
+        self._t[i, _COL[stage]] = time.perf_counter() if t is None else t
+
+    def mark_stages(self, frame_id: int, stamps: List[float]) -> None:
+        """[t_pre, t_fwd, t_post, t_done] from InferenceEngine.infer_mask(stamps=…)."""
+        if len(stamps) != 4:
+            return
+        t0, t1, t2, t3 = stamps
+        for stage, t in (("pre_start", t0), ("pre_end", t1), ("fwd_start", t1),
+                         ("fwd_end", t2), ("post_start", t2), ("post_end", t3)):
+            self.mark(frame_id, stage, t)
+
+    def clear(self) -> None:
+        self._ids[:] = -1
+        self._t[:] = np.nan
+
+    # ---------------- analysis ----------------
+    def _rows(self):
+        keep = self._ids >= 0
+        ids = self._ids[keep]
+        order = np.argsort(ids)
+        return ids[order], self._t[keep][order]
+
+    def durations(self) -> Dict[str, np.ndarray]:
+        """Span name → durations in ms (NaN where a frame did not pass both points)."""
+        _, t = self._rows()
+        return {name: (t[:, _COL[b]] - t[:, _COL[a]]) * 1000.0 for name, a, b in SPANS}
+
+    def summary(self) -> Dict[str, dict]:
+        """Rolling n/mean/p50/p95/p99 (ms) per span over the frames still in the ring."""
+        out = {}
+        for name, d in self.durations().items():
+            d = d[~np.isnan(d)]
+            if d.size:
+                p50, p95, p99 = np.percentile(d, (50, 95, 99))
+                out[name] = {"n": int(d.size), "mean": float(d.mean()),
+                             "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return out
+
+    def histogram(self, span: str, bins: int = 20):
+        """(counts, edges in ms) for one span."""
+        d = self.durations().get(span)
+        if d is None:
+            return np.zeros(0, np.int64), np.zeros(0)
+        return np.histogram(d[~np.isnan(d)], bins=bins)
+
+    def hud_text(self) -> str:
+        s = self.summary()
+        lines = [f"{name:<17}{v['p50']:6.1f}{v['p95']:7.1f}{v['p99']:7.1f}"
+                 for name, _, _ in SPANS if (v := s.get(name))]
+        return "\n".join([f"{'ms':<17}{'p50':>6}{'p95':>7}{'p99':>7}"] + lines) if lines else ""
+
+    # ---------------- export ----------------
+    def export_csv(self, path: str) -> str:
+        """One row per frame: absolute capture time (s) + every stage relative to capture (ms)."""
+        ids, t = self._rows()
+        base = t[:, _COL["capture"]]
+        with open(path, "w") as f:
+            f.write("frame_id,capture_s," + ",".join(f"{s}_ms" for s in STAGES[1:]) + "\n")
+            for fid, row, t0 in zip(ids, t, base):
+                rel = ["" if np.isnan(v) or np.isnan(t0) else f"{(v - t0) * 1000.0:.3f}" for v in row[1:]]
+                f.write(f"{fid},{'' if np.isnan(t0) else f'{t0:.6f}'}," + ",".join(rel) + "\n")
+        return path
+
+    def export_chrome(self, path: str) -> str:
+        """Chrome trace (chrome://tracing, Perfetto): one complete event per frame and span."""
+        ids, t = self._rows()
+        valid = t[~np.isnan(t)]
+        t_ref = float(valid.min()) if valid.size else 0.0
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": k, "args": {"name": name}}
+                  for k, (name, _, _) in enumerate(SPANS)]
+        for fid, row in zip(ids, t):
+            for k, (name, a, b) in enumerate(SPANS):
+                ta, tb = row[_COL[a]], row[_COL[b]]
+                if np.isnan(ta) or np.isnan(tb):
+                    continue
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": k,
+                               "ts": (ta - t_ref) * 1e6, "dur": max(0.0, (tb - ta) * 1e6),
+                               "args": {"frame_id": int(fid)}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+    def export(self, prefix: str) -> List[str]:
+        d = os.path.dirname(prefix)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        return [self.export_csv(prefix + ".csv"), self.export_chrome(prefix + ".json")]
+
+
+TRACE = Tracer(enabled=os.environ.get("TRACE", "1").lower() not in ("0", "false", "no"))
@@ -1,32 +1,48 @@
-# video_thread.py — unified API with frame_id for perfect sync
+# video_thread.py — deadline-paced capture into a latest-frame ring (frame_id + capture time)
 from __future__ import annotations
 from PySide6.QtCore import QThread, Signal
-from PySide6.QtGui import QImage
 import cv2
-import numpy as np
+import threading
 import time
 import os
+from typing import Optional
+
+from .frame_quality import FrameQualityAnalyzer
+from .frames import CapturedFrame, FramePool, FrameRing
+from .tracing import TRACE
 
 
 class VideoThread(QThread):
     """
+    Captures into a small FrameRing; consumers pull the newest frame with
+    latest_frame() instead of receiving one queued signal per frame.
+
     Emits:
-      - frame_ready(QImage RGB888, int frame_id)  : for painting in UI
-      - frame_raw(object np.uint8, int frame_id)  : (H,W,3) RGB for model
+      - frame_available(int frame_id) : "something new is in the ring"; at most one
+                                        notification is pending until the next pull
       - connection_changed(bool)
       - video_finished()
       - error(str), debug(str)
+
+    Pacing uses time.perf_counter() deadlines (monotonic and high resolution on
+    Windows too). File sources are paced to their FPS and skip ahead when we fall
+    a full period behind; live cameras are read as fast as they deliver so the
+    driver buffer never fills with stale frames.
+
+    Each frame is scored by a FrameQualityAnalyzer (black / overexposed /
+    blur / specular, see frame_quality.py) before it enters the ring; the
+    result travels with it as CapturedFrame.quality.
     """
-    frame_ready = Signal(QImage, int)
-    frame_raw = Signal(object, int)
+    frame_available = Signal(int)
     connection_changed = Signal(bool)
     video_finished = Signal()
     error = Signal(str)
     debug = Signal(str)
 
-    def __init__(self, src: str | int = "auto", width: int | None = None,
+    def __init__(self, src: "str | int | cv2.VideoCapture" = "auto", width: int | None = None,
                  height: int | None = None, target_fps: float | None = None,
-                 loop_video: bool = True):
+                 loop_video: bool = True, ring_size: int = 4,
+                 quality: "FrameQualityAnalyzer | None | bool" = True):
         super().__init__()
         self.src = src
         self.width = int(width) if width else None
@@ -36,12 +52,64 @@ class VideoThread(QThread):
         self._running = False
         self._cap: cv2.VideoCapture | None = None
         self._frame_id = 0
+        self.ring = FrameRing(ring_size)
+        self.pool = FramePool()
+        self._shape: tuple | None = None   # last decoded (H,W,3) → size of pooled buffers
+        self._pos = 0                      # index of the next frame read from a file source
+        # True → FRAME_* environment settings; False/None → frames are not scored
+        self.quality = FrameQualityAnalyzer.from_env() if quality is True else (quality or None)
+        self._notify_lock = threading.Lock()
+        self._notify_pending = False
+        # counters (read from any thread; plain ints are fine for monitoring)
+        self.late_frames = 0       # capture woke up more than half a period past its deadline
+        self.skipped_frames = 0    # source frames grabbed & discarded to get back on schedule
+
+    # ---------------- consumer API ----------------
+    def latest_frame(self) -> Optional[CapturedFrame]:
+        """Pull the newest frame (None if nothing new); re-arms frame_available."""
+        with self._notify_lock:
+            self._notify_pending = False
+        return self.ring.latest()
+
+    def stats(self) -> dict:
+        return {
+            "captured": self._frame_id,
+            "dropped": self.ring.dropped + self.skipped_frames,
+            "late": self.late_frames,
+            "allocations": self.pool.allocations,
+            "quality": self.quality.stats() if self.quality is not None else None,
+        }
+
+    def is_live(self) -> bool:
+        """Camera (latency matters) rather than a recorded file (throughput matters)."""
+        # capture-like objects (synthetic/test sources) say so themselves; default: camera
+        if hasattr(self.src, "read"):
+            return bool(getattr(self.src, "is_live", True))
+        return not (isinstance(self.src, str) and self.src != "auto")
+
+    def source_id(self) -> Optional[str]:
+        """
+        Identity of a recorded source (path + size + mtime), None for cameras;
+        with the frame index it names a frame across loops and restarts.
+        """
+        src = self.src
+        if hasattr(src, "read"):
+            return getattr(src, "source_id", None)
+        if isinstance(src, str) and src != "auto":
+            try:
+                st = os.stat(src)
+                return f"{os.path.abspath(src)}:{st.st_size}:{int(st.st_mtime)}"
+            except OSError:
+                return None
+        return None
 
     def _open_capture(self):
         src = self.src
         cap = None
 
-        if isinstance(src, str) and src == "auto":
+        if hasattr(src, "read") and hasattr(src, "isOpened"):
+            cap = src  # already-open capture-like object (read/grab/get/set/release)
+        elif isinstance(src, str) and src == "auto":
             # Prefer a direct camera backend if available to minimize buffering
             cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) if hasattr(cv2, "CAP_DSHOW") else cv2.VideoCapture(0)
             if not cap or not cap.isOpened():
@@ -84,41 +152,104 @@ class VideoThread(QThread):
         fps = self._cap.get(cv2.CAP_PROP_FPS)
         fps = fps if fps and fps > 0 else 25.0
         use_fps = self.target_fps or float(fps)
-        delay = 1.0 / max(1e-6, use_fps)
+        period = 1.0 / max(1e-6, use_fps)
+        live = self.is_live()
+        source = None if live else self.source_id()
+        self._pos = 0
+        # Live cameras block in read() at the sensor rate → only pace them if a target is set
+        paced = (not live) or (self.target_fps is not None)
+
+        next_deadline = time.perf_counter()
+        last_capture = None
+        last_report = next_deadline
+        reported = (0, 0)
 
         while self._running:
-            ok, frame_bgr = self._cap.read()
+            now = time.perf_counter()
+            if paced:
+                if now < next_deadline:
+                    if live:
+                        # drain the driver buffer instead of letting it queue stale frames
+                        self._cap.grab()
+                        self.skipped_frames += 1
+                        continue
+                    time.sleep(next_deadline - now)
+                else:
+                    behind = now - next_deadline
+                    if behind > 0.5 * period:
+                        self.late_frames += 1
+                    if behind > 1.0:
+                        next_deadline = now  # long stall (seek, debugger, …): resync
+                    elif behind >= period and not live:
+                        n = int(behind / period)
+                        for _ in range(n):
+                            self._cap.grab()
+                        self._pos += n
+                        self.skipped_frames += n
+                        next_deadline += n * period
+
+            # Decode straight into a recycled buffer (cv2 reuses it when the size matches)
+            buf = self.pool.acquire(self._shape) if self._shape else None
+            ok, frame_bgr = self._cap.read(buf.array) if buf is not None else self._cap.read()
+            t_cap = time.perf_counter()
             if not ok:
+                if buf is not None:
+                    buf.release()
                 if isinstance(self.src, str) and self.src != "auto" and self.loop_video:
                     self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    self._pos = 0
+                    next_deadline = time.perf_counter()
                     continue
                 self.video_finished.emit()
                 break
+            if buf is None or frame_bgr is not buf.array:
+                # first frame or size change: cv2 allocated → adopt it, pool follows the new size
+                if buf is not None:
+                    buf.release()
+                buf = self.pool.adopt(frame_bgr)
+                self._shape = buf.array.shape
+
+            if not paced and last_capture is not None and (t_cap - last_capture) > 1.5 * period:
+                self.late_frames += 1
+            last_capture = t_cap
+            next_deadline += period
 
             # Increment id for each *captured* frame
             self._frame_id += 1
             fid = self._frame_id
+            TRACE.mark(fid, "capture", t_cap)
 
-            rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+            position = (source, self._pos) if source is not None else None
+            self._pos += 1
+            quality = None
+            if self.quality is not None:
+                try:
+                    quality = self.quality.measure(buf.array)
+                except Exception:
+                    quality = None
 
-            # Emit raw for model (MainWindow will throttle/lock to pairs)
-            try:
-                self.frame_raw.emit(rgb, fid)
-            except Exception:
-                pass
+            # Zero-copy: the ring takes our reference; QImage/model read the pooled BGR buffer
+            self.ring.push(CapturedFrame(fid, t_cap, buf, quality, position))
 
-            h, w, _ = rgb.shape
-            # QImage shares data; copy() when delivering to UI to ensure safety
-            qimg = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888).copy()
-            self.frame_ready.emit(qimg, fid)
+            with self._notify_lock:
+                notify = not self._notify_pending
+                self._notify_pending = True
+            if notify:
+                self.frame_available.emit(fid)
 
-            time.sleep(delay)
+            if t_cap - last_report > 5.0:
+                st = self.stats()
+                if (st["dropped"], st["late"]) != reported:
+                    reported = (st["dropped"], st["late"])
+                    self.debug.emit(f"Video: {st['captured']} frames, {st['dropped']} dropped, {st['late']} late")
+                last_report = t_cap
 
         try:
             if self._cap is not None:
                 self._cap.release()
         except Exception:
             pass
+        self.ring.clear()
         self.connection_changed.emit(False)
 
     def stop(self):
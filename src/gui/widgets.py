@@ -1,14 +1,19 @@
 from __future__ import annotations
+import os
+import time
 from typing import List, Tuple
 
 from PySide6.QtWidgets import (
     QFrame, QLabel, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QCheckBox,
     QSizePolicy
 )
-from PySide6.QtCore import Qt, QSize, QRect, Signal, QPointF
+from PySide6.QtCore import Qt, QSize, QRect, Signal, QPoint, QPointF
 from PySide6.QtGui import QPixmap, QPainter, QColor, QBrush, QPen, QIcon, QImage, QFont
 
-from .colors import COLORS
+from .colors import COLORS, overlay_palette
+from .frames import CapturedFrame
+from .render_cache import RenderCache, palette_lut
+from .tracing import TRACE
 
 
 # --------------------------- Simple global app state ---------------------------
@@ -222,6 +227,9 @@ class TopBar(QFrame):
         self.set_camera_connected(False)
 
     def set_camera_connected(self, connected: bool):
+        if getattr(self, "_connected", None) == bool(connected):
+            return  # setStyleSheet re-polishes the whole pill
+        self._connected = bool(connected)
         txt = "Kamera verbunden" if connected else "Nicht verbunden"
         self.record_text.setText(txt)
 
@@ -245,33 +253,137 @@ class TopBar(QFrame):
 
 
 # ----------------------------- VideoCanvas ---------------------------
-class VideoCanvas(QLabel):
-    """Displays frames, an RGBA overlay, and ROI markers.
+class CanvasState:
+    """
+    Frame / overlay / marker state and the public API shared by VideoCanvas
+    (QPainter) and gl_canvas.GLVideoCanvas (OpenGL); subclasses only paint it
+    and declare the signals.
 
-    Signals:
-      - roiClicked(int x, int y): emitted when in ROI mode and user clicks the image
+    Overlays are Indexed8 class-index masks (RGBA images still work), at frame
+    or model resolution; the canvas' colour table is applied when they are
+    drawn, so recolouring is a palette swap, not a new inference.
     """
-    roiClicked = Signal(int, int)
 
-    def __init__(self):
-        super().__init__()
-        self.setObjectName("VideoCanvas")
-        self.setAlignment(Qt.AlignCenter)
+    def _init_canvas(self, cache: bool = False):
         self._frame: QImage | None = None           # raw frame
-        self._overlay: QImage | None = None         # RGBA overlay (same or different size)
+        self._frame_key = None                       # identity of the frame for the render cache
+        self._held: CapturedFrame | None = None     # keeps a pooled frame's buffer alive while shown
+        self._overlay: QImage | None = None         # Indexed8 class mask or RGBA (frame or model size)
+        self._color_table: List[int] = overlay_palette()
+        self._overlay_offset = QPointF(0.0, 0.0)     # frame pixels (motion-compensated overlay)
+        self._painted_id: int | None = None
+        self._hud: str = ""                          # tracing summary (monospace, top-left)
         self._overlay_opacity: float = 0.7
         self._roi_mode: bool = False
         self._markers: List[Tuple[QPointF, str]] = []
+        self._presenter = None
+        # display-sized frame / overlay / composite (render_cache.py); None = scale on every paint
+        self._render: RenderCache | None = RenderCache() if cache else None
+        if self._render is not None:
+            self.destroyed.connect(self._render.close)   # stops its scaling thread
+        self._lut = None                             # colour table as premultiplied BGRA (render cache)
 
     # ---------- public API ----------
-    def set_frame(self, qimg: QImage):
-        self._frame = qimg
+    def set_frame(self, frame: QImage | CapturedFrame):
+        """Show a frame; a CapturedFrame is retained until the next one replaces it."""
+        self._take_frame(frame)
         self.update()
 
-    def set_overlay(self, qimg_rgba: QImage | None):
-        self._overlay = qimg_rgba
+    def set_presenter(self, presenter):
+        """Pull a presenter.FramePresenter's pending changes at the start of every paint."""
+        self._presenter = presenter
+
+    def _pull_pending(self):
+        if self._presenter is not None:
+            self._presenter.pull(self._apply)
+
+    def _apply(self, changes: dict):
+        """Changes pulled from the presenter: keys "frame", "overlay" (None clears), "opacity", "offset" ((dx, dy))."""
+        if "frame" in changes:
+            self._take_frame(changes["frame"])
+        if "overlay" in changes:
+            self._overlay = changes["overlay"]
+        if "opacity" in changes:
+            self._overlay_opacity = max(0.0, min(1.0, float(changes["opacity"])))
+        if "offset" in changes:
+            self._overlay_offset = QPointF(*changes["offset"])
+
+    def _take_frame(self, frame: QImage | CapturedFrame):
+        held = frame.retain() if isinstance(frame, CapturedFrame) else None
+        if self._held is not None:
+            self._held.release()
+        self._held = held
+        self._frame = frame.qimage if held is not None else frame
+        self._frame_key = self._key_of(frame)
+
+    @staticmethod
+    def _key_of(frame: QImage | CapturedFrame):
+        # pooled frames reuse their QImage, so captured ones are told apart by id + capture time
+        if isinstance(frame, CapturedFrame):
+            return ("captured", frame.frame_id, frame.t_capture)
+        return ("image", frame.cacheKey())
+
+    # ---------- render cache ----------
+    def prefetch_frame(self, frame: QImage | CapturedFrame):
+        """Start scaling a frame that is about to be shown to display size (off the GUI thread)."""
+        if self._render is None:
+            return
+        img = frame.qimage if isinstance(frame, CapturedFrame) else frame
+        if img is None or img.isNull():
+            return
+        self._render.prefetch_frame(self._key_of(frame), img, self._device_size(img.width(), img.height()),
+                                    hold=frame if isinstance(frame, CapturedFrame) else None)
+
+    def prefetch_overlay(self, qimg: QImage | None):
+        if self._render is None or qimg is None or qimg.isNull() or self._frame is None:
+            return
+        self._render.prefetch_overlay(self._overlay_key(qimg), qimg,
+                                      self._device_size(self._frame.width(), self._frame.height()),
+                                      self._palette_lut())
+
+    def _device_size(self, src_w: int, src_h: int) -> QSize:
+        r = self._calc_draw_rect(src_w, src_h)
+        dpr = self.devicePixelRatioF()
+        return QSize(int(round(r.width() * dpr)), int(round(r.height() * dpr)))
+
+    def _overlay_key(self, qimg: QImage):
+        return qimg.cacheKey(), id(self._color_table)
+
+    def _palette_lut(self):
+        if self._lut is None:
+            self._lut = palette_lut(self._color_table)
+        return self._lut
+
+    def set_overlay(self, qimg: QImage | None):
+        self._overlay = qimg
         self.update()
 
+    def set_hud(self, text: str):
+        if text != self._hud:
+            self._hud = text
+            self.update()
+
+    def set_overlay_offset(self, dx: float = 0.0, dy: float = 0.0):
+        """Shift the overlay by (dx, dy) frame pixels when drawing."""
+        if dx == self._overlay_offset.x() and dy == self._overlay_offset.y():
+            return
+        self._overlay_offset = QPointF(dx, dy)
+        self.update()
+
+    def set_overlay_colors(self, class_colors: List[Tuple[int, int, int, int]] | None = None):
+        """RGBA per class index (None → default classes); applies to the current overlay too."""
+        self._color_table = overlay_palette(class_colors)
+        self._lut = None
+        self.update()
+
+    def with_palette(self, qimg: QImage) -> QImage:
+        """qimg as it is drawn: Indexed8 masks get the canvas colour table."""
+        if qimg.format() != QImage.Format_Indexed8 or qimg.colorTable() == self._color_table:
+            return qimg
+        out = QImage(qimg)  # shallow; setColorTable detaches only this copy's (1 byte/px) pixels
+        out.setColorTable(self._color_table)
+        return out
+
     def clear_overlay(self):
         self._overlay = None
         self.update()
@@ -322,8 +434,9 @@ class VideoCanvas(QLabel):
                 return
         super().mousePressEvent(ev)
 
-    def paintEvent(self, ev):
-        p = QPainter(self)
+    # ---------- painting helpers ----------
+    def _paint_canvas(self, p: QPainter):
+        """Frame, overlay, markers and HUD with QPainter (the whole VideoCanvas paint)."""
         p.setRenderHint(QPainter.Antialiasing, True)
 
         # fill background (in case of letterboxing)
@@ -333,38 +446,131 @@ class VideoCanvas(QLabel):
         if self._frame is not None and not self._frame.isNull():
             src_w, src_h = self._frame.width(), self._frame.height()
             target = self._calc_draw_rect(src_w, src_h)
-            if target.width() > 0 and target.height() > 0:
+            if self._render is not None:
+                if target.width() > 0 and target.height() > 0:
+                    self._paint_cached(p, target, src_w, src_h)
+            elif target.width() > 0 and target.height() > 0:
                 p.drawImage(target, self._frame)
 
             # --- overlay (same target rect mapping) ---
-            if self._overlay is not None and not self._overlay.isNull():
+            if self._render is None and self._overlay is not None and not self._overlay.isNull():
+                # masks may come at model resolution: scaled into the frame rect, filtered
+                p.setRenderHint(QPainter.SmoothPixmapTransform, True)
                 p.setOpacity(self._overlay_opacity)
-                p.drawImage(target, self._overlay)
+                off = self._overlay_offset
+                if off.x() or off.y():
+                    p.save()
+                    p.setClipRect(target)
+                    p.drawImage(target.translated(int(round(off.x() * target.width() / max(1, src_w))),
+                                                  int(round(off.y() * target.height() / max(1, src_h)))),
+                                self.with_palette(self._overlay))
+                    p.restore()
+                else:
+                    p.drawImage(target, self.with_palette(self._overlay))
                 p.setOpacity(1.0)
 
             # --- ROI markers ---
             if self._markers:
-                sx = target.width() / max(1, src_w)
-                sy = target.height() / max(1, src_h)
-                pen_x = QPen(QColor(*COLORS.get("light_blue", (64, 184, 255))), 2)
-                p.setPen(pen_x)
-
-                font = p.font()
-                font.setPointSize(11)
-                font.setBold(True)
-                p.setFont(font)
-
-                for point, label_str in self._markers:
-                    x = target.x() + int(point.x() * sx)
-                    y = target.y() + int(point.y() * sy)
-                    s = 10
-                    p.setPen(pen_x)
-                    p.drawLine(x - s, y - s, x + s, y + s)
-                    p.drawLine(x - s, y + s, x + s, y - s)
-
-                    p.setPen(QPen(QColor(0, 0, 0, 200)))
-                    p.drawText(x + s + 5, y - s - 2, label_str)
-                    p.setPen(QPen(QColor(255, 255, 255)))
-                    p.drawText(x + s + 4, y - s - 3, label_str)
+                self._paint_markers(p, target, src_w, src_h)
+
+        if self._hud:
+            self._paint_hud(p)
+
+    def _paint_cached(self, p: QPainter, target: QRect, src_w: int, src_h: int):
+        """Frame (+ overlay at the current opacity/offset) from display-sized copies in the render cache."""
+        size = self._device_size(src_w, src_h)
+        img = self._render.frame(self._frame_key, self._frame, size)
+        if self._overlay is None or self._overlay.isNull():
+            p.drawImage(target, img)
+            return
+        ov = self._render.overlay(self._overlay_key(self._overlay), self._overlay, size, self._palette_lut())
+        off = QPoint(int(round(self._overlay_offset.x() * size.width() / max(1, src_w))),
+                     int(round(self._overlay_offset.y() * size.height() / max(1, src_h))))
+        comp = self._render.composite(img, ov, self._overlay_opacity, off)
+        if comp is not None:
+            p.drawImage(target, comp)
+            return
+        p.drawImage(target, img)
+        p.save()
+        p.setClipRect(target)
+        p.setOpacity(self._overlay_opacity)
+        dpr = size.width() / max(1, target.width())
+        p.drawImage(target.translated(int(round(off.x() / dpr)), int(round(off.y() / dpr))), ov)
+        p.restore()
+
+    def _paint_markers(self, p: QPainter, target: QRect, src_w: int, src_h: int):
+        sx = target.width() / max(1, src_w)
+        sy = target.height() / max(1, src_h)
+        pen_x = QPen(QColor(*COLORS.get("light_blue", (64, 184, 255))), 2)
+        p.setPen(pen_x)
 
+        font = p.font()
+        font.setPointSize(11)
+        font.setBold(True)
+        p.setFont(font)
+
+        for point, label_str in self._markers:
+            x = target.x() + int(point.x() * sx)
+            y = target.y() + int(point.y() * sy)
+            s = 10
+            p.setPen(pen_x)
+            p.drawLine(x - s, y - s, x + s, y + s)
+            p.drawLine(x - s, y + s, x + s, y - s)
+
+            p.setPen(QPen(QColor(0, 0, 0, 200)))
+            p.drawText(x + s + 5, y - s - 2, label_str)
+            p.setPen(QPen(QColor(255, 255, 255)))
+            p.drawText(x + s + 4, y - s - 3, label_str)
+
+    def _paint_hud(self, p: QPainter):
+        font = QFont("monospace")
+        font.setStyleHint(QFont.Monospace)
+        font.setPointSize(9)
+        p.setFont(font)
+        lines = self._hud.splitlines()
+        lh = p.fontMetrics().height()
+        w = max(p.fontMetrics().horizontalAdvance(l) for l in lines) + 12
+        box = QRect(8, 8, w, lh * len(lines) + 8)
+        p.fillRect(box, QColor(0, 0, 0, 150))
+        p.setPen(QPen(QColor(255, 255, 255)))
+        for k, line in enumerate(lines):
+            p.drawText(box.x() + 6, box.y() + 4 + lh * (k + 1) - p.fontMetrics().descent(), line)
+
+    def _frame_painted(self):
+        """After a paint: trace + framePainted for the first paint of each held frame."""
+        held = self._held
+        if held is not None and held.frame_id != self._painted_id:
+            self._painted_id = held.frame_id
+            TRACE.mark(held.frame_id, "paint")
+            self.framePainted.emit(held.frame_id, time.perf_counter() - held.t_capture)
+
+
+class VideoCanvas(CanvasState, QLabel):
+    """Displays frames, a segmentation overlay, and ROI markers (QPainter).
+
+    With the render cache (default; CANVAS_CACHE=0 turns it off) frame and
+    overlay are scaled to display size once per new image or resize, so
+    repaints for markers / HUD / opacity only blit or re-blend.
+
+    Signals:
+      - roiClicked(int x, int y): emitted when in ROI mode and user clicks the image
+      - framePainted(int frame_id, float latency_s): first paint of a captured
+        frame, with the time since its capture
+    """
+    roiClicked = Signal(int, int)
+    framePainted = Signal(int, float)
+
+    def __init__(self, cache: bool | None = None):
+        QLabel.__init__(self)
+        if cache is None:   # CANVAS_CACHE=0: scale frame and overlay on every paint
+            cache = os.environ.get("CANVAS_CACHE", "1").lower() not in ("0", "false", "no")
+        self._init_canvas(cache=cache)
+        self.setObjectName("VideoCanvas")
+        self.setAlignment(Qt.AlignCenter)
+
+    def paintEvent(self, ev):
+        self._pull_pending()
+        p = QPainter(self)
+        self._paint_canvas(p)
         p.end()
+        self._frame_painted()
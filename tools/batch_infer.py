@@ -0,0 +1,189 @@
+# batch_infer.py — run the live overlay's inference over a recorded video, without the GUI
+#
+#   python -m tools.batch_infer --video case.mp4 [--out case.masks] [--batch 8] [--stride 1]
+#                               [--start 0] [--end N] [--backend torch|onnx] [--device cuda]
+#
+# Same InferenceEngine (checkpoint env vars, backend, pre/post-processing) as
+# ModelWorker, so the stored masks are what the surgeon saw. Frames are decoded
+# on a separate thread into a bounded queue and run through the model `--batch`
+# at a time, as fast as decoder and model allow (no pacing). Masks go to a
+# mask_store file with each frame's index and timestamp; memory stays constant
+# regardless of video length. Masks are stored at model resolution (the frame
+# size is in the metadata) unless --mask-size frame.
+from __future__ import annotations
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Optional
+
+import cv2
+
+from src.gui.mask_store import MaskWriter
+from src.gui.model_worker import InferenceEngine
+
+_END = object()
+
+
+def _decode(cap: "cv2.VideoCapture", q: "queue.Queue", start: int, end: Optional[int], stride: int,
+            fps: float, stop: threading.Event) -> None:
+    """Decoder thread: (frame index, pts ms, BGR frame) into q, then _END (or an exception)."""
+    try:
+        n = start
+        while not stop.is_set() and (end is None or n < end):
+            if n % stride:
+                ok = cap.grab()      # skipped frames are not decoded to pixels
+                frame = None
+            else:
+                ok, frame = cap.read()
+            if not ok:
+                break
+            if frame is not None:
+                pts = cap.get(cv2.CAP_PROP_POS_MSEC)
+                if pts <= 0 and n > 0 and fps > 0:
+                    pts = n * 1000.0 / fps
+                q.put((n, float(pts), frame))
+            n += 1
+        q.put(_END)
+    except Exception as e:
+        q.put(e)
+
+
+def process_video(video: str, out: str, engine: InferenceEngine, batch: int = 8, stride: int = 1,
+                  start: int = 0, end: Optional[int] = None, meta: Optional[dict] = None,
+                  progress=None) -> dict:
+    """
+    Infer frames [start, end) of `video` (those with index % stride == 0, so
+    segments of one video agree on which frames are inferred) and store the masks
+    in `out`. `engine` must be loaded. Returns counters and timings; progress(done,
+    total) is called after every batch.
+    """
+    cap = cv2.VideoCapture(video)
+    if not cap or not cap.isOpened():
+        raise IOError(f"cannot open {video}")
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    last = min(total, end) if (total and end is not None) else (end if end is not None else total)
+    todo = max(0, (last - 1) // stride - (start - 1) // stride) if last else 0
+
+    q: "queue.Queue" = queue.Queue(maxsize=max(2, 2 * batch))   # bounds decoded frames in memory
+    stop = threading.Event()
+    reader = threading.Thread(target=_decode, args=(cap, q, start, end, stride, fps, stop),
+                              name="batch-decode", daemon=True)
+    info = {"video": os.path.abspath(video), "fps": fps, "frame_count": total, "start": start,
+            "end": end, "stride": stride, "backend": engine.backend, "device": engine.device,
+            "input_size": list(engine.input_size), "mask_size": engine.mask_size,
+            "frame_size": [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))],
+            **(meta or {})}
+    done = 0
+    t_model = 0.0
+    t0 = time.perf_counter()
+    reader.start()
+    try:
+        with MaskWriter(out, meta=info) as writer:
+            finished = False
+            while not finished:
+                items = []
+                while len(items) < batch:
+                    item = q.get()
+                    if item is _END:
+                        finished = True
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    items.append(item)
+                if not items:
+                    break
+                t1 = time.perf_counter()
+                masks = engine.infer_masks([f for _, _, f in items])
+                t_model += time.perf_counter() - t1
+                for (n, pts, _), mask in zip(items, masks):
+                    writer.write(n, pts, mask)
+                done += len(items)
+                if progress is not None:
+                    progress(done, todo)
+            raw = writer.raw_bytes
+    finally:
+        stop.set()
+        try:
+            while True:
+                q.get_nowait()   # unblock the decoder if it waits on a full queue
+        except queue.Empty:
+            pass
+        reader.join(timeout=5.0)
+        cap.release()
+    wall = time.perf_counter() - t0
+    stored = os.path.getsize(out)
+    return {"frames": done, "seconds": wall, "fps": done / wall if wall > 0 else 0.0,
+            "model_ms_per_frame": t_model * 1000.0 / max(1, done),
+            "bytes": stored, "compression": raw / max(1, stored)}
+
+
+def make_engine(args) -> InferenceEngine:
+    engine = InferenceEngine(
+        ckpt_path=args.ckpt, attn_ckpt=args.attn_ckpt, unet_ckpt=args.unet_ckpt,
+        device=args.device, input_size=tuple(args.input_size), backend=args.backend,
+        quantized=args.quantized or None, mask_size=args.mask_size, warmup_iters=1,
+        log=(lambda s: print(s, file=sys.stderr)) if args.verbose else (lambda s: None),
+        on_error=lambda s: print(s, file=sys.stderr),
+    )
+    engine.load()
+    return engine
+
+
+def add_engine_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--batch", type=int, default=8, help="frames per forward pass")
+    ap.add_argument("--stride", type=int, default=1, help="infer every n-th frame")
+    ap.add_argument("--backend", default=None, help="torch | onnx (default: MODEL_BACKEND)")
+    ap.add_argument("--device", default=None, help="cuda | cpu (default: cuda if available)")
+    ap.add_argument("--quantized", action="store_true", help="INT8 ONNX graph")
+    ap.add_argument("--input-size", type=int, nargs=2, default=(512, 512), metavar=("W", "H"))
+    ap.add_argument("--mask-size", default=None, choices=("model", "frame"),
+                    help="resolution of the stored masks (default: MODEL_MASK_SIZE or model)")
+    ap.add_argument("--ckpt", default=None, help="default: MODEL_CKPT / MODEL_PATH")
+    ap.add_argument("--attn-ckpt", default=None)
+    ap.add_argument("--unet-ckpt", default=None)
+    ap.add_argument("--allow-dummy", action="store_true",
+                    help="run even if no model loads (edge-mask fallback; for testing)")
+    ap.add_argument("-v", "--verbose", action="store_true")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Run inference over a recorded video and store the masks")
+    ap.add_argument("--video", required=True)
+    ap.add_argument("--out", default=None, help="default: <video>.masks")
+    ap.add_argument("--start", type=int, default=0, help="first frame")
+    ap.add_argument("--end", type=int, default=None, help="stop before this frame")
+    add_engine_args(ap)
+    args = ap.parse_args(argv)
+
+    out = args.out or os.path.splitext(args.video)[0] + ".masks"
+    engine = make_engine(args)
+    if engine.dummy and not args.allow_dummy:
+        print("No model could be loaded — check the checkpoint env vars (or pass --allow-dummy).",
+              file=sys.stderr)
+        return 1
+
+    last = [0.0]
+
+    def progress(done: int, total: int) -> None:
+        now = time.perf_counter()
+        if now - last[0] >= 2.0:
+            last[0] = now
+            print(f"\r{done}/{total or '?'} frames", end="", file=sys.stderr, flush=True)
+
+    r = process_video(args.video, out, engine, batch=max(1, args.batch), stride=max(1, args.stride),
+                      start=args.start, end=args.end, progress=progress)
+    print(file=sys.stderr)
+    print(f"{r['frames']} frames in {r['seconds']:.1f}s ({r['fps']:.1f} frames/s, model "
+          f"{r['model_ms_per_frame']:.1f} ms/frame, {engine.backend} on {engine.device}) → {out} "
+          f"({r['bytes'] / 1e6:.1f} MB, {r['compression']:.0f}x smaller than raw masks)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# quant_eval.py — INT8 vs FP32: mask IoU and latency/throughput on a recorded video
+#
+#   python -m tools.quant_eval --video case.mp4 [--calib-video other.mp4] [--frames 200] [--json out.json]
+#
+# Checkpoints come from the same env vars as the GUI (MODEL_PATH/ATTN_PATH/UNET_PATH
+# or MODEL_CKPT/ATTN_CKPT/UNET_CKPT). Both variants run through ONNX Runtime with
+# identical session settings, so the latency numbers compare like with like.
+"""Compare the INT8 model with FP32 on a recorded video: mask IoU and latency/throughput."""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from src.gui.model_worker import OnnxBackend, load_hac_model, logits_to_mask, prepare_input
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean IoU over the foreground classes present in either class-index mask."""
+    ious = []
+    for c in np.union1d(np.unique(a), np.unique(b)):
+        if c == 0:
+            continue
+        union = np.logical_or(a == c, b == c).sum()
+        ious.append(np.logical_and(a == c, b == c).sum() / union)
+    return float(np.mean(ious)) if ious else 1.0
+
+
+def _latency(ms: list[float]) -> dict:
+    a = np.asarray(ms)
+    return {"mean_ms": float(a.mean()), "p50_ms": float(np.percentile(a, 50)),
+            "p95_ms": float(np.percentile(a, 95)), "fps": float(1000.0 / a.mean())}
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--video", required=True, help="evaluation video")
+    ap.add_argument("--calib-video", help="calibration video (default: --video)")
+    ap.add_argument("--frames", type=int, default=200, help="evaluation frames")
+    ap.add_argument("--calib-frames", type=int, default=64)
+    ap.add_argument("--input-size", type=int, nargs=2, default=(512, 512), metavar=("W", "H"))
+    ap.add_argument("--threads", type=int, default=None, help="ORT intra-op threads")
+    ap.add_argument("--ckpt", default=os.environ.get("MODEL_CKPT") or os.environ.get("MODEL_PATH"))
+    ap.add_argument("--attn-ckpt", default=os.environ.get("ATTN_CKPT") or os.environ.get("ATTN_PATH"))
+    ap.add_argument("--unet-ckpt", default=os.environ.get("UNET_CKPT") or os.environ.get("UNET_PATH"))
+    ap.add_argument("--json", help="write the report here as JSON")
+    args = ap.parse_args(argv)
+
+    size = tuple(args.input_size)
+    ckpts = (args.ckpt, args.attn_ckpt, args.unet_ckpt)
+    model = load_hac_model(*ckpts, device="cpu")
+    if model is None:
+        print("No model could be loaded — check the checkpoint env vars.", file=sys.stderr)
+        return 1
+
+    fp32 = OnnxBackend(model, "cpu", size, ckpts, intra_threads=args.threads)
+    int8 = OnnxBackend(model, "cpu", size, ckpts, intra_threads=args.threads, quantized=True,
+                       calib_video=args.calib_video or args.video, calib_frames=args.calib_frames)
+    if int8.name != "onnx-int8":
+        print("INT8 graph could not be produced.", file=sys.stderr)
+        return 1
+
+    cap = cv2.VideoCapture(args.video)
+    ious, t32, t8 = [], [], []
+    while len(ious) < args.frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        x = torch.from_numpy(prepare_input(frame, size))
+        t0 = time.perf_counter()
+        a = fp32.forward(x)
+        t1 = time.perf_counter()
+        b = int8.forward(x)
+        t2 = time.perf_counter()
+        t32.append((t1 - t0) * 1000.0)
+        t8.append((t2 - t1) * 1000.0)
+        ious.append(_iou(logits_to_mask(a), logits_to_mask(b)))   # the live overlay's rule
+    cap.release()
+    if not ious:
+        print(f"No frames read from {args.video}", file=sys.stderr)
+        return 1
+
+    iou = np.asarray(ious)
+    report = {
+        "video": os.path.abspath(args.video),
+        "frames": len(ious),
+        "input_size": list(size),
+        "iou": {"mean": float(iou.mean()), "p05": float(np.percentile(iou, 5)), "min": float(iou.min())},
+        "fp32": _latency(t32),
+        "int8": _latency(t8),
+    }
+    report["speedup"] = report["fp32"]["mean_ms"] / report["int8"]["mean_ms"]
+
+    print(f"frames: {report['frames']}   input: {size[0]}x{size[1]}")
+    print(f"mask IoU INT8 vs FP32: mean {report['iou']['mean']:.4f}  p05 {report['iou']['p05']:.4f}  "
+          f"min {report['iou']['min']:.4f}")
+    for k in ("fp32", "int8"):
+        r = report[k]
+        print(f"{k.upper():5s} latency mean {r['mean_ms']:7.2f} ms  p50 {r['p50_ms']:7.2f}  "
+              f"p95 {r['p95_ms']:7.2f}   {r['fps']:6.1f} frames/s")
+    print(f"speed-up: {report['speedup']:.2f}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
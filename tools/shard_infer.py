@@ -0,0 +1,270 @@
+# shard_infer.py — batch_infer over a long recording, split across a pool of worker processes
+#
+#   python -m tools.shard_infer --video case.mp4 [--out case.masks] [--jobs 8] [--threads 2]
+#                               [--segment-seconds 120] [--batch 8] [--keep-shards]
+#
+# The video is cut at keyframes (ffprobe; equal frame ranges if it is missing)
+# into segments of roughly --segment-seconds. Each worker process loads its own
+# InferenceEngine once with a --threads budget (torch / OpenMP / ONNX Runtime)
+# and runs tools.batch_infer.process_video on one segment at a time, writing
+# <out>.shards/seg_<n>.masks. Segments start on a keyframe, so a worker's seek
+# costs no decoding of frames that belong to another worker.
+#
+# Finished segments are published atomically (mask_store writes to .part first)
+# and listed in <out>.shards/plan.json, so re-running the same command after an
+# interruption only processes what is missing. The plan is keyed on the resolved
+# model (checkpoint content hash, backend, mask size — CLI or env), and segments
+# produced by the dummy fallback never count as done. At the end the segment stores are
+# merged in frame order into <out> (chunks copied, not re-compressed) and the
+# per-segment statistics into <out>.stats.json.
+from __future__ import annotations
+import argparse
+import concurrent.futures as cf
+import json
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+
+from src.gui.mask_store import MaskReader, MaskWriter
+from src.gui.model_worker import InferenceEngine, checkpoint_key
+from tools.batch_infer import add_engine_args
+
+_ENGINE = None   # one per worker process
+
+
+# ---------------- planning ----------------
+def probe(video: str) -> Tuple[float, int]:
+    cap = cv2.VideoCapture(video)
+    if not cap or not cap.isOpened():
+        raise IOError(f"cannot open {video}")
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+    return fps, total
+
+
+def keyframes(video: str, fps: float) -> List[int]:
+    """Frame indices of the video's keyframes ([] if ffprobe is unavailable or fails)."""
+    if shutil.which("ffprobe") is None:
+        return []
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+           "-show_entries", "frame=pts_time,best_effort_timestamp_time", "-of", "csv=p=0", video]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=600).stdout
+    except Exception:
+        return []
+    times = []
+    for line in out.splitlines():
+        for v in line.split(","):
+            try:
+                times.append(float(v))
+                break
+            except ValueError:
+                continue
+    if not times:
+        return []
+    t0 = min(times)
+    return sorted({int(round((t - t0) * fps)) for t in times})
+
+
+def plan_segments(total: int, fps: float, keys: List[int], segment_seconds: float,
+                  min_segments: int) -> List[Tuple[int, int]]:
+    """[start, end) frame ranges covering the video; starts snap to the nearest keyframe."""
+    n = max(min_segments, int(round(total / max(1.0, segment_seconds * fps))), 1)
+    n = min(n, max(1, total))
+    cuts = [round(i * total / n) for i in range(1, n)]
+    if keys:
+        import bisect
+        snapped = []
+        for c in cuts:
+            j = bisect.bisect_left(keys, c)
+            near = [k for k in keys[max(0, j - 1):j + 1] if 0 < k < total]
+            if near:
+                snapped.append(min(near, key=lambda k: abs(k - c)))
+        cuts = snapped
+    bounds = [0] + sorted(set(cuts)) + [total]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+# ---------------- workers ----------------
+def _init_worker(threads: int, engine_kwargs: dict) -> None:
+    # thread budget first: the libraries read these when they are imported
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "ORT_INTRA_OP_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["ORT_INTER_OP_THREADS"] = "1"
+    try:
+        cv2.setNumThreads(1)
+    except Exception:
+        pass
+    from src.gui.model_worker import InferenceEngine, import_torch
+    if import_torch():
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    global _ENGINE
+    _ENGINE = InferenceEngine(log=lambda s: None, on_error=lambda s: print(s, file=sys.stderr),
+                              warmup_iters=1, **engine_kwargs)
+    _ENGINE.load()
+
+
+def _run_segment(video: str, path: str, index: int, start: int, end: int, batch: int, stride: int) -> dict:
+    from tools.batch_infer import process_video
+    r = process_video(video, path, _ENGINE, batch=batch, stride=stride, start=start, end=end,
+                      meta={"segment": index})
+    r.update(segment=index, start=start, end=end, pid=os.getpid(), backend=_ENGINE.backend)
+    with open(path + ".json", "w") as f:
+        json.dump(r, f)
+    return r
+
+
+def _segment_done(path: str) -> Optional[dict]:
+    """Stats of a finished segment, None if it still has to be (re)computed."""
+    try:
+        with open(path + ".json") as f:
+            stats = json.load(f)
+        if stats.get("backend") == "dummy":
+            return None   # no model was loaded: not a result worth keeping
+        with MaskReader(path) as r:
+            if len(r) != stats.get("frames"):
+                return None
+        return stats
+    except Exception:
+        return None
+
+
+# ---------------- merge ----------------
+def merge(paths: List[str], out: str, meta: dict) -> int:
+    n = 0
+    with MaskWriter(out, meta=meta) as w:
+        for p in paths:
+            with MaskReader(p) as r:
+                for i in range(len(r)):
+                    frame, pts, h, wd = r.record(i)
+                    w.write_raw(frame, pts, h, wd, r.raw(i))
+                    n += 1
+    return n
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Sharded multi-process inference over a recorded video")
+    ap.add_argument("--video", required=True)
+    ap.add_argument("--out", default=None, help="default: <video>.masks")
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: cores // threads)")
+    ap.add_argument("--threads", type=int, default=None, help="threads per worker (default: 1, or cores // jobs)")
+    ap.add_argument("--segment-seconds", type=float, default=120.0)
+    ap.add_argument("--keep-shards", action="store_true", help="keep <out>.shards/ after merging")
+    add_engine_args(ap)
+    args = ap.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    if args.jobs is None:
+        threads = max(1, args.threads or 1)
+        jobs = max(1, cores // threads)
+    else:
+        jobs = max(1, args.jobs)
+        threads = max(1, args.threads or cores // jobs)
+    out = args.out or os.path.splitext(args.video)[0] + ".masks"
+    shard_dir = out + ".shards"
+    os.makedirs(shard_dir, exist_ok=True)
+
+    fps, total = probe(args.video)
+    if total <= 0:
+        print(f"{args.video}: unknown frame count — use tools.batch_infer instead.", file=sys.stderr)
+        return 1
+    plan_path = os.path.join(shard_dir, "plan.json")
+    engine_kwargs = {"ckpt_path": args.ckpt, "attn_ckpt": args.attn_ckpt, "unet_ckpt": args.unet_ckpt,
+                     "device": args.device, "input_size": tuple(args.input_size), "backend": args.backend,
+                     "quantized": args.quantized or None, "mask_size": args.mask_size}
+    # resolved like the workers will (CLI, then env) — nothing is loaded here
+    spec = InferenceEngine(log=lambda s: None, **engine_kwargs)
+    st = os.stat(args.video)
+    ident = {"video": os.path.abspath(args.video), "size": st.st_size, "mtime": int(st.st_mtime),
+             "stride": max(1, args.stride), "input_size": list(args.input_size),
+             "model": checkpoint_key(spec.ckpts, spec.quantized, spec.resize),
+             "ckpts": [os.path.abspath(p) if p else None for p in spec.ckpts],
+             "backend": spec.backend_name, "mask_size": spec.mask_size}
+    plan = None
+    try:
+        with open(plan_path) as f:
+            plan = json.load(f)
+        if plan.get("ident") != ident:
+            print("Existing shards were made with other settings — starting over.", file=sys.stderr)
+            shutil.rmtree(shard_dir)
+            os.makedirs(shard_dir)
+            plan = None
+    except (OSError, ValueError):
+        plan = None
+    if plan is None:
+        keys = keyframes(args.video, fps)
+        segs = plan_segments(total, fps, keys, args.segment_seconds, min_segments=jobs)
+        plan = {"ident": ident, "fps": fps, "frames": total, "keyframe_aligned": bool(keys), "segments": segs}
+        with open(plan_path, "w") as f:
+            json.dump(plan, f, indent=1)
+    segs = [tuple(s) for s in plan["segments"]]
+    paths = [os.path.join(shard_dir, f"seg_{i:05d}.masks") for i in range(len(segs))]
+
+    stats = {i: s for i, p in enumerate(paths) if (s := _segment_done(p)) is not None}
+    todo = [i for i in range(len(segs)) if i not in stats]
+    print(f"{total} frames, {len(segs)} segments ({'keyframe-aligned' if plan['keyframe_aligned'] else 'no keyframe info'})"
+          f", {len(stats)} already done; {jobs} workers × {threads} threads", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    if todo:
+        ctx = mp.get_context("spawn")
+        with cf.ProcessPoolExecutor(max_workers=min(jobs, len(todo)), mp_context=ctx,
+                                    initializer=_init_worker, initargs=(threads, engine_kwargs)) as pool:
+            futs = {pool.submit(_run_segment, args.video, paths[i], i, segs[i][0], segs[i][1],
+                                max(1, args.batch), max(1, args.stride)): i for i in todo}
+            try:
+                for fut in cf.as_completed(futs):
+                    r = fut.result()
+                    stats[r["segment"]] = r
+                    print(f"segment {r['segment'] + 1}/{len(segs)} [{r['start']}, {r['end']}): "
+                          f"{r['frames']} frames, {r['fps']:.1f} frames/s ({len(stats)}/{len(segs)} done)",
+                          file=sys.stderr)
+            except BaseException:
+                for f in futs:
+                    f.cancel()
+                raise
+    wall = time.perf_counter() - t0
+
+    if not args.allow_dummy and any(s.get("backend") == "dummy" for s in stats.values()):
+        print("No model could be loaded in the workers — check the checkpoint env vars "
+              "(or pass --allow-dummy).", file=sys.stderr)
+        return 1
+    meta = {"video": ident["video"], "fps": fps, "frame_count": total, "stride": ident["stride"],
+            "segments": len(segs), "backend": next(iter(stats.values()), {}).get("backend")}
+    n = merge(paths, out, meta)
+    per_seg = [stats[i] for i in range(len(segs))]
+    done_now = [stats[i] for i in todo]
+    report = {
+        "video": ident["video"], "out": out, "frames": n, "segments": per_seg,
+        "jobs": jobs, "threads_per_job": threads,
+        "wall_seconds": wall,
+        "fps": sum(s["frames"] for s in done_now) / wall if done_now and wall > 0 else None,
+        "parallel_efficiency": (sum(s["seconds"] for s in done_now) / (wall * min(jobs, len(done_now)))
+                                if done_now and wall > 0 else None),
+        "model_ms_per_frame": sum(s["model_ms_per_frame"] * s["frames"] for s in per_seg) / max(1, n),
+        "segment_seconds_total": sum(s["seconds"] for s in per_seg),
+    }
+    with open(out + ".stats.json", "w") as f:
+        json.dump(report, f, indent=2)
+    if not args.keep_shards:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+    fps_txt = f"{report['fps']:.1f} frames/s" if report["fps"] else "nothing left to compute"
+    print(f"{n} frames → {out} in {wall:.1f}s ({fps_txt}, {len(done_now)} segments computed, "
+          f"{len(segs) - len(done_now)} resumed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())